@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Feedback
+from .models import Feedback, FeedbackDigestSubscription
 
 @admin.register(Feedback)
 class FeedbackAdmin(admin.ModelAdmin):
@@ -22,4 +22,10 @@ class FeedbackAdmin(admin.ModelAdmin):
         qs = super().get_queryset(request)
         if request.user.user_type != 'ADMIN':
             return qs.filter(created_by=request.user)
-        return qs
\ No newline at end of file
+        return qs
+
+@admin.register(FeedbackDigestSubscription)
+class FeedbackDigestSubscriptionAdmin(admin.ModelAdmin):
+    list_display = ('user', 'enabled', 'cursor', 'pending_since')
+    list_filter = ('enabled',)
+    readonly_fields = ('cursor', 'pending_since')
@@ -12,6 +12,8 @@ class InvoicesConfig(AppConfig):
     name = 'invoices'
 
     def ready(self):
+        from . import signals  # noqa: F401
+
         font_path = os.path.normpath(os.path.join(settings.STATIC_ROOT, 'fonts', 'NotoSansDevanagari-Regular.ttf'))
         logger.debug(f"Attempting to register font at: {font_path}")
         if os.path.isfile(font_path):
@@ -0,0 +1,116 @@
+import hashlib
+import logging
+import os
+import posixpath
+from datetime import timedelta
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Unreferenced blobs are kept this long before collection, in case a new upload reuses them.
+BLOB_GC_GRACE = timedelta(seconds=getattr(settings, 'FEEDBACK_ATTACHMENT_GC_GRACE', 60 * 60))
+
+
+def content_digest(content):
+    """Streaming SHA-256 and size of a Django File."""
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in content.chunks():
+        digest.update(chunk)
+        size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def blob_name(directory, sha256, file_name):
+    extension = os.path.splitext(file_name)[1].lower()[:10]
+    return posixpath.join(directory, sha256[:2], f"{sha256}{extension}")
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Stores each distinct file once, named by the SHA-256 of its content.
+
+    Content that is already stored is not written again. The reference is counted by the Feedback
+    post_save signal (``acquire_blob``), inside the save's own transaction, so a failed or rolled
+    back save leaves no reference behind.
+    """
+
+    def _save(self, name, content):
+        AttachmentBlob = apps.get_model('invoices', 'AttachmentBlob')
+        sha256, size = content_digest(content)
+        with transaction.atomic():
+            blob, created = AttachmentBlob.objects.select_for_update().get_or_create(
+                sha256=sha256,
+                defaults={'name': blob_name(posixpath.dirname(name), sha256, name), 'size': size},
+            )
+            # Restarts the collection grace period, so an unreferenced blob survives until the save lands.
+            AttachmentBlob.objects.filter(pk=sha256).update(updated_at=timezone.now())
+        if self.exists(blob.name):
+            logger.debug(f"Reusing stored attachment {blob.name} for {name}")
+            return blob.name
+
+        saved = super()._save(blob.name, content)
+        if saved != blob.name:
+            # Another request stored the same content in the meantime.
+            self.delete(saved)
+        return blob.name
+
+
+blob_storage = ContentAddressedStorage()
+
+
+def attachment_storage():
+    return blob_storage
+
+
+def acquire_blob(name):
+    AttachmentBlob = apps.get_model('invoices', 'AttachmentBlob')
+    AttachmentBlob.objects.filter(name=name).update(ref_count=F('ref_count') + 1, updated_at=timezone.now())
+
+
+def release_blob(name):
+    """Drop one reference; the file stays until collect_blobs() finds it unreferenced."""
+    AttachmentBlob = apps.get_model('invoices', 'AttachmentBlob')
+    AttachmentBlob.objects.filter(name=name, ref_count__gt=0).update(
+        ref_count=F('ref_count') - 1, updated_at=timezone.now()
+    )
+
+
+def collect_blobs(grace=BLOB_GC_GRACE):
+    """Delete blobs that have had no references for longer than ``grace``."""
+    AttachmentBlob = apps.get_model('invoices', 'AttachmentBlob')
+    cutoff = timezone.now() - grace
+    count = 0
+    for sha256 in AttachmentBlob.objects.filter(ref_count=0, updated_at__lt=cutoff).values_list('sha256', flat=True):
+        with transaction.atomic():
+            # Re-check under the row lock: an upload may have picked the blob up again.
+            blob = AttachmentBlob.objects.select_for_update().filter(pk=sha256, ref_count=0, updated_at__lt=cutoff).first()
+            if blob is None:
+                continue
+            blob_storage.delete(blob.name)
+            blob.delete()
+        count += 1
+    if count:
+        logger.info(f"Collected {count} unreferenced attachment blobs")
+    return count
+
+
+def recount_blobs():
+    """Recompute reference counts from the feedback table; returns the number of corrected blobs."""
+    AttachmentBlob = apps.get_model('invoices', 'AttachmentBlob')
+    Feedback = apps.get_model('invoices', 'Feedback')
+    counts = dict(
+        Feedback.objects.exclude(attachment='').exclude(attachment__isnull=True)
+        .values_list('attachment').annotate(references=Count('pk')).order_by()
+    )
+    corrected = 0
+    for blob in AttachmentBlob.objects.iterator():
+        references = counts.get(blob.name, 0)
+        if blob.ref_count != references:
+            AttachmentBlob.objects.filter(pk=blob.pk).update(ref_count=references, updated_at=timezone.now())
+            corrected += 1
+    return corrected
@@ -0,0 +1,108 @@
+import logging
+import random
+from datetime import timedelta
+from captcha.conf import settings as captcha_settings
+from captcha.fields import CaptchaTextInput
+from captcha.models import CaptchaStore
+from captcha.views import captcha_image
+from django.conf import settings
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+from .models import CaptchaPoolEntry
+
+logger = logging.getLogger(__name__)
+
+# Unissued challenges kept ready by the job worker's maintenance loop.
+CAPTCHA_POOL_SIZE = getattr(settings, 'CAPTCHA_POOL_SIZE', 500)
+CAPTCHA_POOL_FILL_BATCH = 100
+# How long a challenge may wait in the pool; it gets the normal CAPTCHA_TIMEOUT once handed out.
+CAPTCHA_POOL_TTL = timedelta(hours=getattr(settings, 'CAPTCHA_POOL_TTL_HOURS', 24))
+CAPTCHA_SWEEP_BATCH_SIZE = 1000
+# Concurrent pops start from different rows near the head of the pool instead of all racing for one.
+POP_SPREAD = 20
+POP_ATTEMPTS = 5
+
+
+def render_captcha_png(hashkey):
+    # The library's view is the renderer; it doesn't use the request for 1x images.
+    return captcha_image(None, hashkey).content
+
+
+def create_pool_entries(count):
+    expiration = timezone.now() + CAPTCHA_POOL_TTL
+    get_challenge = captcha_settings.get_challenge()
+    entries = []
+    for _ in range(count):
+        challenge, response = get_challenge()
+        store = CaptchaStore.objects.create(challenge=challenge, response=response, expiration=expiration)
+        entries.append(CaptchaPoolEntry(store=store, hashkey=store.hashkey, image=render_captcha_png(store.hashkey)))
+    CaptchaPoolEntry.objects.bulk_create(entries)
+    return len(entries)
+
+
+def refill_captcha_pool(size=CAPTCHA_POOL_SIZE):
+    available = CaptchaPoolEntry.objects.filter(issued=False, store__expiration__gt=timezone.now() + timedelta(hours=1)).count()
+    created = 0
+    while available + created < size:
+        created += create_pool_entries(min(CAPTCHA_POOL_FILL_BATCH, size - available - created))
+    if created:
+        logger.info(f"Added {created} challenges to the CAPTCHA pool")
+    return created
+
+
+def pop_captcha():
+    """Hand out a pre-rendered challenge; falls back to generating one when the pool is empty."""
+    for _ in range(POP_ATTEMPTS):
+        candidates = list(
+            CaptchaPoolEntry.objects.filter(issued=False).order_by('id').values_list('id', 'store_id', 'hashkey')[:POP_SPREAD]
+        )
+        if not candidates:
+            break
+        entry_id, store_id, hashkey = random.choice(candidates)
+        with transaction.atomic():
+            if CaptchaPoolEntry.objects.filter(id=entry_id, issued=False).update(issued=True):
+                CaptchaStore.objects.filter(pk=store_id).update(
+                    expiration=timezone.now() + timedelta(minutes=int(captcha_settings.CAPTCHA_TIMEOUT))
+                )
+                return hashkey
+    logger.warning("CAPTCHA pool is empty, generating a challenge inline")
+    return CaptchaStore.generate_key()
+
+
+def pooled_image_url(hashkey):
+    return reverse('invoices:captcha_image', kwargs={'key': hashkey})
+
+
+class PooledCaptchaTextInput(CaptchaTextInput):
+    """CaptchaTextInput that takes its challenge from the pre-rendered pool."""
+
+    def fetch_captcha_store(self, name, value, attrs=None, generator=None):
+        key = pop_captcha()
+        self._value = [key, '']
+        self._key = key
+        self.id_ = self.build_attrs(attrs).get('id', None)
+
+    def image_url(self):
+        return pooled_image_url(self._key)
+
+
+def sweep_expired_captchas(batch_size=CAPTCHA_SWEEP_BATCH_SIZE):
+    """Delete expired challenges (and their pool images) in primary-key batches."""
+    now = timezone.now()
+    total = 0
+    while True:
+        ids = list(CaptchaStore.objects.filter(expiration__lte=now).values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            break
+        CaptchaPoolEntry.objects.filter(store_id__in=ids).delete()
+        CaptchaStore.objects.filter(pk__in=ids).delete()
+        total += len(ids)
+    if total:
+        logger.info(f"Swept {total} expired CAPTCHA challenges")
+    return total
+
+
+def captcha_maintenance():
+    sweep_expired_captchas()
+    refill_captcha_pool()
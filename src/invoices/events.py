@@ -0,0 +1,225 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils.module_loading import import_string
+from .models import Feedback
+
+logger = logging.getLogger(__name__)
+
+# CacheBroker reaches every process through the shared cache, which is what WSGI workers and the job
+# worker need. LocalBroker only reaches browsers connected to the process that saved the feedback, so it
+# suits a single ASGI process and nothing else.
+FEEDBACK_EVENTS_BACKEND = getattr(settings, 'FEEDBACK_EVENTS_BACKEND', 'invoices.events.CacheBroker')
+FEEDBACK_EVENTS_CACHE = getattr(settings, 'FEEDBACK_EVENTS_CACHE', 'default')
+FEEDBACK_EVENTS_QUEUE_SIZE = 100
+FEEDBACK_EVENTS_KEEPALIVE = 15
+# Streams end after this long and the browser reconnects, so a closed tab can't hold one forever.
+FEEDBACK_EVENTS_MAX_DURATION = 30 * 60
+# A bulk insert (kiosk batch, import) announces only its last few rows; a page shows five at a time.
+FEEDBACK_EVENTS_BULK_LIMIT = 10
+# How often the page asks for new events when it is served over WSGI and can't hold a stream open.
+FEEDBACK_EVENTS_POLL_INTERVAL = getattr(settings, 'FEEDBACK_EVENTS_POLL_INTERVAL', 10)
+
+
+class LocalBroker:
+    """In-process pub/sub; ``publish`` may be called from any thread, subscribers live on event loops."""
+
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def publish(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, event)
+            except RuntimeError:
+                # Its event loop has shut down without the stream being closed.
+                self.unsubscribe(subscription)
+
+    def subscribe(self):
+        subscription = LocalSubscription(self)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+
+class LocalSubscription:
+    def __init__(self, broker):
+        self.broker = broker
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=FEEDBACK_EVENTS_QUEUE_SIZE)
+
+    def put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            logger.warning("Feedback event subscriber is not keeping up, dropping an event")
+
+    async def get(self, timeout):
+        """Next event, or None once ``timeout`` seconds pass without one."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class CacheBroker:
+    """Pub/sub through a shared Django cache: events go into a numbered ring that subscribers poll."""
+
+    poll_interval = 1.0
+    event_ttl = 5 * 60
+
+    def __init__(self, alias=FEEDBACK_EVENTS_CACHE):
+        self.cache = caches[alias]
+
+    def publish(self, event):
+        self.cache.add('feedback_events:seq', 0, None)
+        seq = self.cache.incr('feedback_events:seq')
+        self.cache.set(f'feedback_events:{seq}', event, self.event_ttl)
+
+    def subscribe(self):
+        return CacheSubscription(self)
+
+    @staticmethod
+    def event_keys(after, seq):
+        # A reader that fell far behind only gets the newest events rather than the whole backlog.
+        start = max(after, seq - FEEDBACK_EVENTS_QUEUE_SIZE) + 1
+        return [f'feedback_events:{n}' for n in range(start, seq + 1)]
+
+    def events_since(self, after=None):
+        """``(seq, events)`` published after sequence number ``after``; pass ``seq`` back next time."""
+        seq = self.cache.get('feedback_events:seq') or 0
+        if after is None or after >= seq:
+            # A cursor ahead of the counter means the cache was cleared; start again from here.
+            return seq, []
+        keys = self.event_keys(after, seq)
+        found = self.cache.get_many(keys)
+        return seq, [found[key] for key in keys if key in found]
+
+
+class CacheSubscription:
+    def __init__(self, broker):
+        self.broker = broker
+        self.cache = broker.cache
+        self.last_seq = None
+        self.pending = []
+
+    async def get(self, timeout):
+        deadline = time.monotonic() + timeout
+        while not self.pending:
+            seq = await self.cache.aget('feedback_events:seq') or 0
+            if self.last_seq is None:
+                self.last_seq = seq
+            elif seq > self.last_seq:
+                keys = self.broker.event_keys(self.last_seq, seq)
+                found = await self.cache.aget_many(keys)
+                self.pending = [found[key] for key in keys if key in found]
+                self.last_seq = seq
+                continue
+            if time.monotonic() >= deadline:
+                return None
+            await asyncio.sleep(min(self.broker.poll_interval, max(0, deadline - time.monotonic())))
+        return self.pending.pop(0)
+
+    def close(self):
+        pass
+
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        _broker = import_string(FEEDBACK_EVENTS_BACKEND)()
+    return _broker
+
+
+def live_updates_mode(request):
+    """How the manage-feedbacks page follows changes: 'stream' over ASGI, 'poll' over WSGI, or None."""
+    if isinstance(request, ASGIRequest):
+        return 'stream'
+    if hasattr(get_broker(), 'events_since'):
+        return 'poll'
+    return None
+
+
+def publish_feedback_event(feedback, kind):
+    """Announce a created or changed feedback to connected consoles once the transaction commits."""
+    event = {'type': kind, 'uuid': str(feedback.uuid), 'status': feedback.status}
+    transaction.on_commit(lambda: get_broker().publish(event))
+
+
+def publish_feedback_events(feedbacks, kind, limit=FEEDBACK_EVENTS_BULK_LIMIT):
+    """``publish_feedback_event`` for a bulk insert, collapsed to its last ``limit`` feedbacks."""
+    events = [{'type': kind, 'uuid': str(feedback.uuid), 'status': feedback.status} for feedback in feedbacks[-limit:]]
+
+    def publish():
+        broker = get_broker()
+        for event in events:
+            broker.publish(event)
+
+    transaction.on_commit(publish)
+
+
+def render_feedback_row(feedback, request=None):
+    """The manage-feedbacks table row for ``feedback``, as the page itself renders it."""
+    return render_to_string('invoices/feedback_row.html', {'feedback': feedback}, request=request)
+
+
+def _event_row(event, request):
+    feedback = Feedback.objects.filter(uuid=event['uuid']).first()
+    return render_feedback_row(feedback, request) if feedback else None
+
+
+def _event_data(event, html):
+    return {'uuid': event['uuid'], 'status': event['status'], 'html': html}
+
+
+def feedback_event_updates(request, after=None):
+    """Polling counterpart of the stream: ``{'cursor': ..., 'events': [...]}`` since ``after``."""
+    cursor, events = get_broker().events_since(after)
+    updates = []
+    for event in events:
+        html = _event_row(event, request)
+        if html is not None:
+            updates.append({'type': event['type'], **_event_data(event, html)})
+    return {'cursor': cursor, 'events': updates}
+
+
+async def feedback_event_stream(request):
+    """``text/event-stream`` body: each event carries the feedback's re-rendered table row."""
+    subscription = get_broker().subscribe()
+    deadline = time.monotonic() + FEEDBACK_EVENTS_MAX_DURATION
+    try:
+        yield 'retry: 5000\n\n'
+        while time.monotonic() < deadline:
+            event = await subscription.get(FEEDBACK_EVENTS_KEEPALIVE)
+            if event is None:
+                # Keeps proxies from timing out the idle connection.
+                yield ': keepalive\n\n'
+                continue
+            html = await sync_to_async(_event_row)(event, request)
+            if html is None:
+                continue
+            data = json.dumps(_event_data(event, html))
+            yield f"event: {event['type']}\ndata: {data}\n\n"
+    finally:
+        subscription.close()
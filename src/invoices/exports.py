@@ -0,0 +1,276 @@
+import csv
+import hashlib
+import io
+import json
+import logging
+import os
+import tempfile
+import zlib
+from datetime import timedelta
+import openpyxl
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Count, Max
+from django.utils import timezone
+from users.models import UserType
+from .jobs import enqueue_job
+from .models import BackgroundJob, Feedback
+from .search import search_feedbacks, SEARCH_ORDERING
+from .visibility import visible_feedbacks
+
+logger = logging.getLogger(__name__)
+
+EXPORT_CHUNK_SIZE = getattr(settings, 'FEEDBACK_EXPORT_CHUNK_SIZE', 2000)
+# Finished workbooks smaller than this stay in memory; larger ones spill to a temp file.
+EXPORT_SPOOL_MAX_SIZE = 10 * 1024 * 1024
+EXPORT_DIR = getattr(settings, 'FEEDBACK_EXPORT_DIR', os.path.join(settings.BASE_DIR, 'cache', 'exports'))
+EXPORT_TTL = timedelta(seconds=getattr(settings, 'FEEDBACK_EXPORT_TTL', 24 * 60 * 60))
+# XLSX exports bigger than this are handed to the job worker instead of built in the request.
+EXPORT_ASYNC_THRESHOLD = getattr(settings, 'FEEDBACK_EXPORT_ASYNC_THRESHOLD', 20000)
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+EXPORT_FILTERS = ['search', 'start_date', 'end_date', 'status']
+# Part of the export cache key; bump when the row format changes so stale exports aren't reused.
+EXPORT_FORMAT_VERSION = 2
+
+EXPORT_HEADERS = ['Serial Number', 'Name', 'Email', 'Mobile', 'Address', 'Rating', 'Feedback Text', 'Status', 'Created At']
+EXPORT_FIELDS = [
+    'serial_number', 'anonymous', 'name', 'email', 'mobile', 'address',
+    'rating', 'feedback_text', 'status', 'created_at',
+]
+
+# Spreadsheet apps evaluate cells starting with these as formulas.
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+RATING_LABELS = dict(Feedback._meta.get_field('rating').choices)
+STATUS_LABELS = dict(Feedback._meta.get_field('status').choices)
+
+
+def filtered_feedbacks(user, search='', start_date='', end_date='', status=''):
+    if user.user_type == UserType.ADMIN:
+        queryset = Feedback.objects.all()
+    else:
+        queryset = visible_feedbacks(user)
+
+    if search:
+        queryset = search_feedbacks(queryset, search)
+
+    if start_date:
+        queryset = queryset.filter(created_at__gte=start_date)
+    if end_date:
+        queryset = queryset.filter(created_at__lte=end_date)
+    if status:
+        queryset = queryset.filter(status=status)
+
+    return queryset.order_by(*SEARCH_ORDERING) if search else queryset.order_by('-created_at')
+
+
+def _reporting(rows, every, progress):
+    count = 0
+    for row in rows:
+        yield row
+        count += 1
+        if count % every == 0:
+            progress(count)
+    progress(count)
+
+
+def export_values(queryset, chunk_size=EXPORT_CHUNK_SIZE, progress=None):
+    rows = queryset.values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+    if progress is None:
+        return rows
+    return _reporting(rows, chunk_size, progress)
+
+
+def spreadsheet_safe(value):
+    """Quote user-submitted text that a spreadsheet would otherwise run as a formula."""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return f"'{value}"
+    return value
+
+
+def export_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE, progress=None):
+    """Yield one formatted row per feedback, reading the queryset in chunks of plain tuples."""
+    for serial_number, anonymous, name, email, mobile, address, rating, feedback_text, status, created_at \
+            in export_values(queryset, chunk_size, progress):
+        yield [
+            serial_number,
+            "Anonymous" if anonymous else spreadsheet_safe(name) or "N/A",
+            spreadsheet_safe(email) or "N/A",
+            spreadsheet_safe(mobile) or "N/A",
+            spreadsheet_safe(address) or "N/A",
+            str(RATING_LABELS.get(rating, rating)),
+            spreadsheet_safe(feedback_text),
+            str(STATUS_LABELS.get(status, status)),
+            created_at.strftime('%Y-%m-%d %H:%M:%S'),
+        ]
+
+
+def _batched(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def csv_chunks(queryset, chunk_size=EXPORT_CHUNK_SIZE, progress=None):
+    """Encoded CSV, one yielded chunk per database chunk rather than per row."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_HEADERS)
+    for batch in _batched(export_rows(queryset, chunk_size, progress), chunk_size):
+        writer.writerows(batch)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # Header of an empty export.
+        yield buffer.getvalue().encode('utf-8')
+
+
+def ndjson_chunks(queryset, chunk_size=EXPORT_CHUNK_SIZE, progress=None):
+    """One JSON object per line with raw field values (choice codes, ISO timestamps, nulls)."""
+    for batch in _batched(export_values(queryset, chunk_size, progress), chunk_size):
+        lines = []
+        for serial_number, anonymous, name, email, mobile, address, rating, feedback_text, status, created_at in batch:
+            lines.append(json.dumps({
+                'serial_number': serial_number,
+                'anonymous': anonymous,
+                'name': None if anonymous else name,
+                'email': email,
+                'mobile': mobile,
+                'address': address,
+                'rating': rating,
+                'feedback_text': feedback_text,
+                'status': status,
+                'created_at': created_at.isoformat(),
+            }, ensure_ascii=False))
+        lines.append('')
+        yield '\n'.join(lines).encode('utf-8')
+
+
+def gzip_chunks(chunks, level=6):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+EXPORT_FORMATS = {
+    'csv': (csv_chunks, 'text/csv; charset=utf-8', 'feedbacks.csv'),
+    'ndjson': (ndjson_chunks, 'application/x-ndjson; charset=utf-8', 'feedbacks.ndjson'),
+}
+
+
+def write_xlsx(rows, target):
+    # Write-only workbooks flush each row to a temp file, so memory doesn't grow with the row count.
+    workbook = openpyxl.Workbook(write_only=True)
+    worksheet = workbook.create_sheet('Feedbacks')
+    worksheet.append(EXPORT_HEADERS)
+    count = 0
+    for row in rows:
+        worksheet.append(row)
+        count += 1
+    workbook.save(target)
+    return count
+
+
+def spooled_xlsx(queryset):
+    spool = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX_SIZE, suffix='.xlsx')
+    count = write_xlsx(export_rows(queryset), spool)
+    spool.seek(0)
+    logger.debug(f"Exported {count} feedbacks to XLSX")
+    return spool
+
+
+def export_filters(params):
+    return {name: params.get(name, '') for name in EXPORT_FILTERS}
+
+
+def export_watermark(queryset):
+    """Changes whenever a matching feedback is added, edited or deleted."""
+    watermark = queryset.order_by().aggregate(rows=Count('pk'), updated=Max('updated_at'))
+    updated = watermark['updated'].isoformat() if watermark['updated'] else ''
+    return f"{watermark['rows']}@{updated}"
+
+
+def export_key(user, export_format, filters, compress=False, watermark=''):
+    # Admins all see the same rows, so their exports are shared; everyone else gets their own.
+    scope = 'admin' if user.user_type == UserType.ADMIN else str(user.pk)
+    parts = [f'v{EXPORT_FORMAT_VERSION}', scope, export_format, '1' if compress else '0', watermark] + [f"{name}={filters.get(name, '')}" for name in EXPORT_FILTERS]
+    return hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()
+
+
+def export_artifact_name(job):
+    name = 'feedbacks.xlsx' if job.params['format'] == 'xlsx' else EXPORT_FORMATS[job.params['format']][2]
+    return f'{name}.gz' if job.params.get('gzip') else name
+
+
+def export_artifact_path(job):
+    return os.path.join(str(EXPORT_DIR), f"{job.uuid}-{export_artifact_name(job)}")
+
+
+def submit_export_job(user, export_format, filters, compress=False):
+    """Queue an export, reusing a recent unexpired artifact built from the same filters and data."""
+    compress = compress and export_format != 'xlsx'
+    key = export_key(user, export_format, filters, compress, export_watermark(filtered_feedbacks(user, **filters)))
+    recent = BackgroundJob.objects.filter(
+        kind='feedback_export', result_key=key, status=BackgroundJob.DONE, expires_at__gt=timezone.now()
+    ).order_by('-finished_at').first()
+    if recent and os.path.exists(export_artifact_path(recent)):
+        return recent
+    params = {'user': str(user.pk), 'format': export_format, 'filters': filters, 'gzip': compress}
+    return enqueue_job('feedback_export', params, result_key=key, user=user)
+
+
+def run_export_job(job):
+    """Background job handler: write the export file in chunks, recording row progress on the job."""
+    user = get_user_model().objects.get(pk=job.params['user'])
+    queryset = filtered_feedbacks(user, **job.params['filters'])
+    jobs = BackgroundJob.objects.filter(pk=job.pk)
+    jobs.update(total=queryset.count())
+
+    def progress(count):
+        jobs.update(progress=count, updated_at=timezone.now())
+
+    path = export_artifact_path(job)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial_path = f'{path}.part'
+    try:
+        with open(partial_path, 'wb') as f:
+            if job.params['format'] == 'xlsx':
+                write_xlsx(export_rows(queryset, progress=progress), f)
+            else:
+                chunks = EXPORT_FORMATS[job.params['format']][0](queryset, progress=progress)
+                if job.params.get('gzip'):
+                    chunks = gzip_chunks(chunks)
+                for chunk in chunks:
+                    f.write(chunk)
+        os.replace(partial_path, path)
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+    jobs.update(expires_at=timezone.now() + EXPORT_TTL)
+    return job.result_key
+
+
+def purge_expired_exports():
+    expired = BackgroundJob.objects.filter(kind='feedback_export', expires_at__lt=timezone.now())
+    count = 0
+    for job in expired:
+        try:
+            os.remove(export_artifact_path(job))
+        except FileNotFoundError:
+            pass
+        job.delete()
+        count += 1
+    if count:
+        logger.info(f"Purged {count} expired feedback exports")
+    return count
@@ -1,6 +1,8 @@
 from django import forms
-from .models import Feedback
+from .models import Feedback, UploadSession
+from .uploads import attachment_size_limit, owns_upload, size_limit_message
 from captcha.fields import CaptchaField
+from .captchas import PooledCaptchaTextInput
 
 class FeedbackForm(forms.ModelForm):
     RATING_CHOICES = (
@@ -10,7 +12,9 @@ class FeedbackForm(forms.ModelForm):
     )
 
     rating = forms.ChoiceField(choices=RATING_CHOICES, widget=forms.RadioSelect(attrs={'class': 'radio-group'}))
-    captcha = CaptchaField()
+    captcha = CaptchaField(widget=PooledCaptchaTextInput)
+    # Set by the page script when the attachment was sent through the resumable upload endpoint.
+    upload_id = forms.UUIDField(required=False, widget=forms.HiddenInput)
 
     class Meta:
         model = Feedback
@@ -30,6 +34,9 @@ class FeedbackForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         user = kwargs.pop('user', None)
+        self.upload_errors = kwargs.pop('upload_errors', None) or {}
+        self.session = kwargs.pop('session', None)
+        self.user = user
         super().__init__(*args, **kwargs)
         if user and user.is_authenticated:
             self.fields['name'].initial = user.full_name
@@ -46,12 +53,40 @@ class FeedbackForm(forms.ModelForm):
             self.fields['mobile'].required = True
             self.fields['email'].required = False
 
+    def clean_attachment(self):
+        attachment = self.cleaned_data.get('attachment')
+        if attachment and getattr(attachment, 'size', 0) > attachment_size_limit(attachment.name):
+            raise forms.ValidationError(size_limit_message(attachment.name))
+        return attachment
+
+    def clean_upload_id(self):
+        upload_id = self.cleaned_data.get('upload_id')
+        if not upload_id:
+            return None
+        upload = UploadSession.objects.filter(uuid=upload_id).first()
+        if upload is None or not owns_upload(upload, self.user, self.session):
+            raise forms.ValidationError("The uploaded file has expired, please attach it again.")
+        if not upload.complete:
+            raise forms.ValidationError("The file upload has not finished yet.")
+        return upload
+
     def clean(self):
         cleaned_data = super().clean()
+        for field, message in self.upload_errors.items():
+            if field in self.fields:
+                self.add_error(field, message)
         anonymous = cleaned_data.get('anonymous')
         if anonymous:
             cleaned_data['name'] = None
             cleaned_data['address'] = None
             cleaned_data['mobile'] = None
             cleaned_data['email'] = None
-        return cleaned_data
\ No newline at end of file
+        return cleaned_data
+
+class FeedbackIngestForm(FeedbackForm):
+    """FeedbackForm rules for authenticated batch ingestion, which has no CAPTCHA or file upload."""
+    captcha = None
+    upload_id = None
+
+    class Meta(FeedbackForm.Meta):
+        fields = ['name', 'address', 'mobile', 'email', 'rating', 'feedback_text', 'anonymous']
@@ -0,0 +1,279 @@
+import csv
+import hashlib
+import io
+import logging
+import os
+from datetime import date, datetime, time
+import openpyxl
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from .exports import EXPORT_HEADERS
+from .forms import FeedbackForm
+from .ingest import bulk_insert_feedbacks
+from .models import Feedback, FeedbackImport, FeedbackImportError
+from .serials import claim_serial_numbers
+
+logger = logging.getLogger(__name__)
+
+IMPORT_BATCH_SIZE = getattr(settings, 'FEEDBACK_IMPORT_BATCH_SIZE', 1000)
+IMPORT_DIR = getattr(settings, 'FEEDBACK_IMPORT_DIR', os.path.join(settings.BASE_DIR, 'cache', 'imports'))
+IMPORT_EXTENSIONS = ['.xlsx', '.csv']
+
+IMPORT_FIELDS = [
+    'serial_number', 'name', 'email', 'mobile', 'address', 'rating', 'feedback_text', 'status', 'created_at',
+]
+# Accept both our own export headers and plain field names.
+COLUMN_ALIASES = {header.lower(): field for header, field in zip(EXPORT_HEADERS, IMPORT_FIELDS)}
+COLUMN_ALIASES.update({field: field for field in IMPORT_FIELDS + ['anonymous']})
+
+EMPTY_VALUES = {'', 'n/a', 'na', 'none', '-'}
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 'हो'}
+
+
+def _choice_lookup(*choice_lists):
+    lookup = {}
+    for choices in choice_lists:
+        for code, label in choices:
+            lookup[code.lower()] = code
+            lookup[str(label).lower()] = code
+    return lookup
+
+
+RATING_LOOKUP = _choice_lookup(Feedback._meta.get_field('rating').choices, FeedbackForm.RATING_CHOICES)
+STATUS_LOOKUP = _choice_lookup(Feedback._meta.get_field('status').choices)
+
+
+class ImportFormatError(Exception):
+    pass
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_rows(path):
+    """Yield raw rows from an XLSX (read-only mode) or CSV file without loading it whole."""
+    if path.lower().endswith('.xlsx'):
+        workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+        try:
+            yield from workbook.worksheets[0].iter_rows(values_only=True)
+        finally:
+            workbook.close()
+    else:
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            yield from csv.reader(f)
+
+
+def iter_records(path):
+    """Yield ``(row_number, {field: value})`` for every non-empty data row; row 1 is the header."""
+    rows = read_rows(path)
+    header = next(rows, None)
+    if header is None:
+        raise ImportFormatError("The file is empty.")
+    columns = [COLUMN_ALIASES.get(str(cell).strip().lower()) if cell is not None else None for cell in header]
+    missing = {'rating', 'feedback_text'} - set(columns)
+    if missing:
+        raise ImportFormatError(f"Missing required columns: {', '.join(sorted(missing))}")
+
+    for row_number, row in enumerate(rows, start=2):
+        if all(cell is None or str(cell).strip() == '' for cell in row):
+            continue
+        yield row_number, {field: cell for field, cell in zip(columns, row) if field}
+
+
+def _text(value):
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        # Spreadsheets store mobile numbers as floats.
+        value = int(value)
+    value = str(value).strip()
+    return None if value.lower() in EMPTY_VALUES else value
+
+
+def _created_at(value):
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return None
+    if isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, date):
+        parsed = datetime.combine(value, time.min)
+    else:
+        value = str(value).strip()
+        parsed = parse_datetime(value)
+        if parsed is None:
+            try:
+                parsed_date = parse_date(value)
+            except ValueError:
+                parsed_date = None
+            if parsed_date is None:
+                raise ValidationError("Enter a valid date/time.")
+            parsed = datetime.combine(parsed_date, time.min)
+    return timezone.make_aware(parsed) if timezone.is_naive(parsed) else parsed
+
+
+def build_feedback(values):
+    """Turn one source row into an unsaved Feedback; returns ``(feedback, errors)``."""
+    errors = {}
+    data = {field: _text(values.get(field)) for field in IMPORT_FIELDS if field != 'created_at'}
+
+    rating = RATING_LOOKUP.get((data['rating'] or '').lower())
+    if rating is None:
+        errors['rating'] = [f"Unknown rating: {data['rating']}"]
+    status = STATUS_LOOKUP.get((data['status'] or 'pending').lower())
+    if status is None:
+        errors['status'] = [f"Unknown status: {data['status']}"]
+
+    anonymous = values.get('anonymous')
+    if isinstance(anonymous, bool):
+        pass
+    elif anonymous is not None:
+        anonymous = str(anonymous).strip().lower() in TRUE_VALUES
+    else:
+        # Our own exports write "Anonymous" in the name column instead of a flag.
+        anonymous = data['name'] == 'Anonymous'
+
+    try:
+        created_at = _created_at(values.get('created_at'))
+    except ValidationError as e:
+        created_at = None
+        errors['created_at'] = e.messages
+
+    feedback = Feedback(
+        serial_number=data['serial_number'] or '',
+        name=None if anonymous else data['name'],
+        email=None if anonymous else data['email'],
+        mobile=None if anonymous else data['mobile'],
+        address=None if anonymous else data['address'],
+        rating=rating or '',
+        feedback_text=data['feedback_text'] or '',
+        status=status or 'pending',
+        anonymous=anonymous,
+        created_at=created_at,
+    )
+    exclude = [field for field in ['rating', 'status'] if field in errors]
+    if not feedback.serial_number:
+        exclude.append('serial_number')
+    try:
+        feedback.full_clean(exclude=exclude, validate_unique=False)
+    except ValidationError as e:
+        errors.update(e.message_dict)
+    return feedback, errors
+
+
+def _json_values(values):
+    return {field: value.isoformat() if isinstance(value, (date, datetime)) else value for field, value in values.items()}
+
+
+def _commit_batch(feedback_import, batch, row_errors, last_row):
+    serial_numbers = [feedback.serial_number for _, feedback, _ in batch if feedback.serial_number]
+    taken = set(Feedback.objects.filter(serial_number__in=serial_numbers).values_list('serial_number', flat=True))
+    feedbacks = []
+    for row_number, feedback, values in batch:
+        if feedback.serial_number and feedback.serial_number in taken:
+            row_errors.append((row_number, {'serial_number': ['Feedback with this Serial Number already exists.']}, values))
+            continue
+        if feedback.serial_number:
+            taken.add(feedback.serial_number)
+        feedbacks.append(feedback)
+
+    with transaction.atomic():
+        claim_serial_numbers(serial_numbers)
+        bulk_insert_feedbacks(feedbacks)
+        FeedbackImportError.objects.bulk_create([
+            FeedbackImportError(feedback_import=feedback_import, row_number=row_number, errors=errors, values=_json_values(values))
+            for row_number, errors, values in row_errors
+        ])
+        FeedbackImport.objects.filter(pk=feedback_import.pk).update(
+            last_row=last_row,
+            imported=F('imported') + len(feedbacks),
+            failed=F('failed') + len(row_errors),
+            updated_at=timezone.now(),
+        )
+    feedback_import.last_row = last_row
+
+
+def run_import(feedback_import):
+    """Import the file in committed batches, resuming after ``feedback_import.last_row``."""
+    FeedbackImport.objects.filter(pk=feedback_import.pk).update(status=FeedbackImport.RUNNING, error='')
+    if feedback_import.last_row:
+        logger.info(f"Resuming import {feedback_import.uuid} after row {feedback_import.last_row}")
+
+    batch = []
+    row_errors = []
+    last_row = feedback_import.last_row
+    try:
+        for row_number, values in iter_records(feedback_import.path):
+            if row_number <= feedback_import.last_row:
+                continue
+            feedback, errors = build_feedback(values)
+            if errors:
+                row_errors.append((row_number, errors, values))
+            else:
+                batch.append((row_number, feedback, values))
+            last_row = row_number
+            if len(batch) + len(row_errors) >= feedback_import.batch_size:
+                _commit_batch(feedback_import, batch, row_errors, last_row)
+                batch, row_errors = [], []
+        _commit_batch(feedback_import, batch, row_errors, last_row)
+    except Exception as e:
+        logger.exception(f"Import {feedback_import.uuid} failed after row {feedback_import.last_row}")
+        FeedbackImport.objects.filter(pk=feedback_import.pk).update(status=FeedbackImport.FAILED, error=str(e))
+        raise
+
+    FeedbackImport.objects.filter(pk=feedback_import.pk).update(status=FeedbackImport.DONE)
+    feedback_import.refresh_from_db()
+    logger.info(f"Import {feedback_import.uuid}: {feedback_import.imported} imported, {feedback_import.failed} failed")
+    return feedback_import
+
+
+def resumable_import(sha256):
+    return FeedbackImport.objects.filter(sha256=sha256).exclude(status=FeedbackImport.DONE).first()
+
+
+def run_import_job(job):
+    """Background job handler for imports uploaded through the admin view."""
+    feedback_import = FeedbackImport.objects.get(pk=job.params['import'])
+    run_import(feedback_import)
+    return str(feedback_import.uuid)
+
+
+def save_upload(uploaded_file):
+    """Copy an uploaded file into IMPORT_DIR chunk by chunk; returns ``(path, sha256)``."""
+    extension = os.path.splitext(uploaded_file.name)[1].lower()
+    os.makedirs(str(IMPORT_DIR), exist_ok=True)
+    path = os.path.join(str(IMPORT_DIR), f"{hashlib.sha256(os.urandom(16)).hexdigest()[:16]}{extension}")
+    digest = hashlib.sha256()
+    with open(path, 'wb') as f:
+        for chunk in uploaded_file.chunks():
+            digest.update(chunk)
+            f.write(chunk)
+    return path, digest.hexdigest()
+
+
+def import_error_rows(feedback_import):
+    """Error report rows: source row number, messages, then the original values."""
+    yield ['Row', 'Errors'] + IMPORT_FIELDS
+    for row_error in feedback_import.row_errors.iterator(chunk_size=2000):
+        messages = '; '.join(f"{field}: {' '.join(errors)}" for field, errors in row_error.errors.items())
+        yield [row_error.row_number, messages] + [row_error.values.get(field, '') for field in IMPORT_FIELDS]
+
+
+def import_error_csv(feedback_import, chunk_size=1000):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for index, row in enumerate(import_error_rows(feedback_import), start=1):
+        writer.writerow(row)
+        if index % chunk_size == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
@@ -0,0 +1,143 @@
+import logging
+from collections import Counter
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .events import publish_feedback_events
+from .forms import FeedbackIngestForm
+from .models import Feedback, FeedbackIngestKey
+from .notifications import mark_digests_pending
+from .serials import reserve_serial_numbers
+from .statistics import apply_statistic_deltas
+from .visibility import add_feedback_visibility
+
+logger = logging.getLogger(__name__)
+
+INGEST_BATCH_SIZE = getattr(settings, 'FEEDBACK_INGEST_BATCH_SIZE', 1000)
+INGEST_MAX_RECORDS = getattr(settings, 'FEEDBACK_INGEST_MAX_RECORDS', 1000)
+# Kiosk clocks drift; submissions a little in the future are accepted as-is.
+SUBMITTED_AT_TOLERANCE = timedelta(minutes=5)
+
+
+@transaction.atomic
+def bulk_insert_feedbacks(feedbacks, batch_size=INGEST_BATCH_SIZE):
+    """``bulk_create`` plus the bookkeeping ``Feedback.save()`` signals would have done.
+
+    Assigns serial numbers to feedbacks without one, keeps an explicitly set ``created_at``
+    (``auto_now_add`` would overwrite it), updates visibility rows and statistic counters, marks
+    admin digests pending and tells open admin consoles. Rollups pick the rows up through their
+    ``updated_at`` on the next run.
+    """
+    if not feedbacks:
+        return feedbacks
+
+    missing_serials = [feedback for feedback in feedbacks if not feedback.serial_number]
+    for feedback, serial_number in zip(missing_serials, reserve_serial_numbers(len(missing_serials))):
+        feedback.serial_number = serial_number
+
+    backdated = [(feedback, feedback.created_at) for feedback in feedbacks if feedback.created_at]
+    Feedback.objects.bulk_create(feedbacks, batch_size=batch_size)
+    if backdated:
+        for feedback, created_at in backdated:
+            feedback.created_at = created_at
+        Feedback.objects.bulk_update([feedback for feedback, _ in backdated], ['created_at'], batch_size=batch_size)
+
+    deltas = add_feedback_visibility(feedbacks, batch_size=batch_size)
+    deltas.update(Counter((None, feedback.status, feedback.rating) for feedback in feedbacks))
+    apply_statistic_deltas(deltas)
+    mark_digests_pending()
+    publish_feedback_events(feedbacks, 'created')
+    logger.debug(f"Bulk inserted {len(feedbacks)} feedbacks")
+    return feedbacks
+
+
+def _form_data(record):
+    data = {field: record[field] for field in FeedbackIngestForm._meta.fields if record.get(field) is not None}
+    if isinstance(data.get('anonymous'), bool):
+        # FeedbackForm switches its required fields on the posted string value.
+        data['anonymous'] = str(data['anonymous'])
+    return data
+
+
+def _submitted_at(value):
+    if value in (None, ''):
+        return None, None
+    submitted_at = parse_datetime(value) if isinstance(value, str) else None
+    if submitted_at is None:
+        return None, 'Enter a valid ISO 8601 date/time.'
+    if timezone.is_naive(submitted_at):
+        submitted_at = timezone.make_aware(submitted_at)
+    if submitted_at > timezone.now() + SUBMITTED_AT_TOLERANCE:
+        return None, 'Submission time is in the future.'
+    return submitted_at, None
+
+
+def _created(key, feedback, status='created'):
+    return {'key': key, 'status': status, 'uuid': str(feedback.uuid), 'serial_number': feedback.serial_number}
+
+
+def _ingest(user, records):
+    results = [None] * len(records)
+    keys = [record.get('key') for record in records if isinstance(record.get('key'), str)]
+    existing = {
+        ingest_key.key: ingest_key.feedback
+        for ingest_key in FeedbackIngestKey.objects.filter(user=user, key__in=keys).select_related('feedback')
+    }
+    pending = {}
+    duplicates = []
+
+    for index, record in enumerate(records):
+        key = record.get('key')
+        if not isinstance(key, str) or not key or len(key) > 100:
+            results[index] = {'key': key, 'status': 'invalid', 'errors': {'key': ['A key of up to 100 characters is required.']}}
+            continue
+        if key in existing:
+            results[index] = _created(key, existing[key], 'duplicate')
+            continue
+        if key in pending:
+            duplicates.append((index, key))
+            continue
+
+        form = FeedbackIngestForm(data=_form_data(record), user=user)
+        submitted_at, submitted_at_error = _submitted_at(record.get('submitted_at'))
+        if not form.is_valid() or submitted_at_error:
+            errors = {field: list(messages) for field, messages in form.errors.items()}
+            if submitted_at_error:
+                errors['submitted_at'] = [submitted_at_error]
+            results[index] = {'key': key, 'status': 'invalid', 'errors': errors}
+            continue
+
+        feedback = form.save(commit=False)
+        feedback.created_by = user
+        feedback.created_at = submitted_at
+        pending[key] = (index, feedback)
+
+    with transaction.atomic():
+        feedbacks = bulk_insert_feedbacks([feedback for _, feedback in pending.values()])
+        FeedbackIngestKey.objects.bulk_create(
+            [FeedbackIngestKey(user=user, key=key, feedback=feedback) for key, (_, feedback) in pending.items()],
+            batch_size=INGEST_BATCH_SIZE,
+        )
+
+    for key, (index, feedback) in pending.items():
+        results[index] = _created(key, feedback)
+    for index, key in duplicates:
+        results[index] = _created(key, pending[key][1], 'duplicate')
+    logger.info(f"Ingested {len(feedbacks)} of {len(records)} feedback records for {user}")
+    return results
+
+
+def ingest_feedback_records(user, records):
+    """Validate and insert a batch of kiosk records; returns one result dict per record, in order.
+
+    Records are keyed by a client idempotency key, so a replayed batch reports the earlier
+    feedbacks as duplicates instead of inserting them twice.
+    """
+    try:
+        return _ingest(user, records)
+    except IntegrityError:
+        # A concurrent replay of the same batch inserted some keys first; they are duplicates now.
+        logger.debug(f"Retrying feedback ingest for {user} after an idempotency key conflict")
+        return _ingest(user, records)
@@ -0,0 +1,184 @@
+import logging
+import multiprocessing
+import os
+import socket
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from .models import BackgroundJob, BackgroundWorker
+from .worker import execute_job, init_process
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKER_PROCESSES = getattr(settings, 'JOB_WORKER_PROCESSES', 2)
+JOB_QUEUE_MAX_DEPTH = getattr(settings, 'JOB_QUEUE_MAX_DEPTH', 50)
+# Recycle pool processes now and then so WeasyPrint's memory growth is returned to the OS.
+JOB_MAX_TASKS_PER_CHILD = getattr(settings, 'JOB_MAX_TASKS_PER_CHILD', 50)
+WORKER_HEARTBEAT_TIMEOUT = timedelta(seconds=30)
+# A running job whose worker hasn't sent a heartbeat for this long is queued again: the worker died.
+# However long the job itself takes, its worker keeps beating while it runs.
+JOB_STALE_AFTER = timedelta(seconds=getattr(settings, 'JOB_STALE_AFTER', 120))
+
+JOB_HANDLERS = {
+    'feedback_pdf': 'invoices.pdf.run_pdf_job',
+    'feedback_export': 'invoices.exports.run_export_job',
+    'feedback_import': 'invoices.imports.run_import_job',
+}
+# Housekeeping the worker runs every MAINTENANCE_INTERVAL.
+MAINTENANCE_TASKS = [
+    'invoices.exports.purge_expired_exports',
+    'invoices.pdf.evict_pdf_cache',
+    'invoices.uploads.purge_stale_uploads',
+    'invoices.blobs.collect_blobs',
+    'invoices.captchas.captcha_maintenance',
+    'users.outbox.purge_sent_emails',
+    'invoices.notifications.send_feedback_digests',
+]
+MAINTENANCE_INTERVAL = 60
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+def enqueue_job(kind, params, result_key='', user=None, max_depth=JOB_QUEUE_MAX_DEPTH):
+    """Queue a job, or return the active job already producing ``result_key``.
+
+    Raises ``JobQueueFull`` once ``max_depth`` jobs of this kind are waiting, so a burst of one
+    job kind is refused up front instead of piling up behind the worker.
+    """
+    if result_key:
+        existing = BackgroundJob.objects.filter(
+            kind=kind, result_key=result_key, status__in=BackgroundJob.ACTIVE_STATUSES
+        ).first()
+        if existing:
+            return existing
+
+    depth = BackgroundJob.objects.filter(kind=kind, status__in=BackgroundJob.ACTIVE_STATUSES).count()
+    if depth >= max_depth:
+        raise JobQueueFull(f"{depth} {kind} jobs are already queued")
+
+    return BackgroundJob.objects.create(
+        kind=kind,
+        params=params,
+        result_key=result_key,
+        requested_by=user if user is not None and user.is_authenticated else None,
+    )
+
+
+def claim_next_job(worker=''):
+    for job in BackgroundJob.objects.filter(status=BackgroundJob.QUEUED).order_by('created_at')[:10]:
+        # Conditional update so two workers never run the same job, on backends without SKIP LOCKED too.
+        claimed = BackgroundJob.objects.filter(pk=job.pk, status=BackgroundJob.QUEUED).update(
+            status=BackgroundJob.RUNNING, started_at=timezone.now(), worker=worker, updated_at=timezone.now()
+        )
+        if claimed:
+            return job
+    return None
+
+
+def requeue_stale_jobs():
+    live_workers = BackgroundWorker.objects.filter(heartbeat_at__gte=timezone.now() - JOB_STALE_AFTER).values('name')
+    requeued = BackgroundJob.objects.filter(status=BackgroundJob.RUNNING).exclude(worker__in=live_workers).update(
+        status=BackgroundJob.QUEUED, started_at=None, worker='', updated_at=timezone.now()
+    )
+    if requeued:
+        logger.warning(f"Requeued {requeued} background jobs left running by a dead worker")
+    return requeued
+
+
+def run_job(job_id):
+    """Runs inside a pool process (via ``worker.execute_job``)."""
+    job = BackgroundJob.objects.get(pk=job_id)
+    try:
+        handler = import_string(JOB_HANDLERS[job.kind])
+        job.result_key = handler(job) or job.result_key
+        job.status = BackgroundJob.DONE
+    except Exception as e:
+        logger.exception(f"Background job {job.uuid} failed")
+        job.status = BackgroundJob.FAILED
+        job.error = str(e)
+    job.finished_at = timezone.now()
+    job.save(update_fields=['result_key', 'status', 'error', 'finished_at', 'updated_at'])
+    return job.status
+
+
+def worker_available():
+    return BackgroundWorker.objects.filter(heartbeat_at__gte=timezone.now() - WORKER_HEARTBEAT_TIMEOUT).exists()
+
+
+def _heartbeat(name):
+    BackgroundWorker.objects.update_or_create(name=name, defaults={'heartbeat_at': timezone.now()})
+
+
+def run_maintenance():
+    for task in MAINTENANCE_TASKS:
+        try:
+            import_string(task)()
+        except Exception as e:
+            logger.error(f"Job maintenance task {task} failed: {str(e)}")
+
+
+def _new_pool(processes):
+    # The parent's DB connections must not be shared with pool processes.
+    connections.close_all()
+    return ProcessPoolExecutor(
+        max_workers=processes,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=init_process,
+        max_tasks_per_child=JOB_MAX_TASKS_PER_CHILD,
+    )
+
+
+def run_worker(processes=JOB_WORKER_PROCESSES, poll_interval=1.0, once=False):
+    name = f"{socket.gethostname()}:{os.getpid()}"
+    pool = _new_pool(processes)
+    running = {}
+    last_maintenance = 0
+    logger.info(f"Job worker {name} started with {processes} processes")
+    try:
+        while True:
+            _heartbeat(name)
+            requeue_stale_jobs()
+            if time.monotonic() - last_maintenance >= MAINTENANCE_INTERVAL:
+                run_maintenance()
+                last_maintenance = time.monotonic()
+
+            while len(running) < processes:
+                job = claim_next_job(name)
+                if job is None:
+                    break
+                running[pool.submit(execute_job, job.pk)] = job.pk
+
+            if once and not running:
+                break
+            if not running:
+                time.sleep(poll_interval)
+                continue
+
+            done, _ = wait(running, timeout=poll_interval, return_when=FIRST_COMPLETED)
+            broken = False
+            for future in done:
+                job_id = running.pop(future)
+                try:
+                    logger.debug(f"Background job {job_id} finished: {future.result()}")
+                except Exception as e:
+                    # The pool process died mid-job (e.g. killed for memory); don't retry it forever.
+                    logger.error(f"Background job {job_id} crashed its worker process: {str(e)}")
+                    BackgroundJob.objects.filter(pk=job_id, status=BackgroundJob.RUNNING).update(
+                        status=BackgroundJob.FAILED, error=str(e) or 'Worker process crashed',
+                        finished_at=timezone.now(), updated_at=timezone.now()
+                    )
+                    broken = broken or isinstance(e, BrokenProcessPool)
+            if broken:
+                pool.shutdown(wait=False, cancel_futures=True)
+                pool = _new_pool(processes)
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        BackgroundWorker.objects.filter(name=name).delete()
+        logger.info(f"Job worker {name} stopped")
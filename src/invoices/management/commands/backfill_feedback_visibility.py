@@ -0,0 +1,26 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from invoices.models import FeedbackVisibility
+from invoices.visibility import sync_user_visibility
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-user feedback visibility index from existing feedback and users.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clear', action='store_true', help='Delete all visibility rows before rebuilding.')
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            deleted, _ = FeedbackVisibility.objects.all().delete()
+            self.stdout.write(f"Deleted {deleted} visibility rows.")
+
+        User = get_user_model()
+        processed = 0
+        for user in User.objects.only('pk', 'email', 'mobile').iterator(chunk_size=options['chunk_size']):
+            sync_user_visibility(user)
+            processed += 1
+
+        total = FeedbackVisibility.objects.count()
+        self.stdout.write(self.style.SUCCESS(f"Synced visibility for {processed} users ({total} rows)."))
@@ -0,0 +1,39 @@
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from invoices.blobs import blob_storage, collect_blobs, recount_blobs
+from invoices.models import AttachmentBlob, Feedback
+
+
+class Command(BaseCommand):
+    help = 'Move attachments saved before content-addressed storage into shared blobs, then recount blob references.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--collect', action='store_true', help='Also delete unreferenced blobs past their grace period.')
+
+    def handle(self, *args, **options):
+        blob_names = set(AttachmentBlob.objects.values_list('name', flat=True))
+        legacy = Feedback.objects.exclude(attachment='').exclude(attachment__isnull=True).exclude(attachment__in=blob_names)
+        moved = missing = 0
+        old_names = set()
+        for pk, name in legacy.values_list('pk', 'attachment').iterator():
+            if not blob_storage.exists(name):
+                self.stderr.write(f"Missing attachment file {name} (feedback {pk})")
+                missing += 1
+                continue
+            with blob_storage.open(name, 'rb') as f:
+                new_name = blob_storage.save(name, File(f, name=name))
+            # update() rather than save(): recount_blobs() below sets every blob's reference count.
+            Feedback.objects.filter(pk=pk).update(attachment=new_name)
+            old_names.add(name)
+            moved += 1
+
+        for name in old_names:
+            blob_storage.delete(name)
+
+        corrected = recount_blobs()
+        self.stdout.write(self.style.SUCCESS(
+            f"Moved {moved} attachments into {AttachmentBlob.objects.count()} blobs "
+            f"({missing} missing files, {corrected} reference counts corrected)."
+        ))
+        if options['collect']:
+            self.stdout.write(f"Collected {collect_blobs()} unreferenced blobs.")
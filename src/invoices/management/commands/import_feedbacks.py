@@ -0,0 +1,45 @@
+import os
+from django.core.management.base import BaseCommand, CommandError
+from invoices.imports import IMPORT_BATCH_SIZE, IMPORT_EXTENSIONS, ImportFormatError, file_sha256, resumable_import, run_import
+from invoices.models import FeedbackImport
+
+
+class Command(BaseCommand):
+    help = 'Import historical feedbacks from an XLSX or CSV file; re-running an interrupted import resumes it.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='XLSX or CSV file with a header row.')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE, help='Rows committed per batch.')
+        parser.add_argument('--restart', action='store_true', help='Start from the first row even if an earlier run was interrupted.')
+
+    def handle(self, *args, **options):
+        path = os.path.abspath(options['path'])
+        if not os.path.exists(path):
+            raise CommandError(f"{path} does not exist.")
+        if os.path.splitext(path)[1].lower() not in IMPORT_EXTENSIONS:
+            raise CommandError("Only .xlsx and .csv files can be imported.")
+
+        sha256 = file_sha256(path)
+        feedback_import = None if options['restart'] else resumable_import(sha256)
+        if feedback_import:
+            self.stdout.write(f"Resuming import {feedback_import.uuid} after row {feedback_import.last_row}.")
+            feedback_import.path = path
+            feedback_import.batch_size = options['batch_size']
+            feedback_import.save(update_fields=['path', 'batch_size', 'updated_at'])
+        else:
+            feedback_import = FeedbackImport.objects.create(
+                file_name=os.path.basename(path),
+                path=path,
+                sha256=sha256,
+                batch_size=options['batch_size'],
+            )
+
+        try:
+            feedback_import = run_import(feedback_import)
+        except ImportFormatError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {feedback_import.imported} feedbacks, {feedback_import.failed} rows failed."
+        ))
+        if feedback_import.failed:
+            self.stdout.write(f"Error report: {feedback_import.row_errors.count()} rows recorded on import {feedback_import.uuid}.")
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from invoices.statistics import rebuild_statistics
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the pre-aggregated feedback statistics table from the feedback and visibility tables.'
+
+    def handle(self, *args, **options):
+        rows = rebuild_statistics()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} feedback statistic rows."))
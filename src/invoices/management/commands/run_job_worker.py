@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from invoices.jobs import JOB_WORKER_PROCESSES, run_worker
+
+
+class Command(BaseCommand):
+    help = (
+        'Run queued background jobs (PDF rendering, exports, imports) in a local process pool, plus the '
+        'periodic maintenance: feedback digests, CAPTCHA pool, blob collection and export, upload, PDF cache '
+        'and sent-email cleanup. Required in every deployment.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=JOB_WORKER_PROCESSES, help='Size of the process pool.')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds between queue polls.')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty.')
+
+    def handle(self, *args, **options):
+        try:
+            run_worker(processes=options['processes'], poll_interval=options['poll_interval'], once=options['once'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS("Job worker stopped."))
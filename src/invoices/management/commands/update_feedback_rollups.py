@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from invoices.rollups import update_rollups
+
+
+class Command(BaseCommand):
+    help = 'Incrementally rebuild daily feedback rollups for days changed since the last run.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Ignore the watermark and rebuild every day.')
+
+    def handle(self, *args, **options):
+        days = update_rollups(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt rollups for {days} days."))
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invoices', '0005_alter_feedback_options_alter_feedback_anonymous_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedbackVisibility',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('feedback', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='visibilities', to='invoices.feedback')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feedback_visibilities', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Feedback Visibility',
+                'verbose_name_plural': 'Feedback Visibilities',
+                'constraints': [models.UniqueConstraint(fields=('user', 'feedback'), name='unique_user_feedback_visibility')],
+            },
+        ),
+    ]
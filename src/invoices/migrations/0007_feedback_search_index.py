@@ -0,0 +1,21 @@
+from django.db import migrations
+from invoices.search import install_search_index, uninstall_search_index
+
+
+def forwards(apps, schema_editor):
+    install_search_index(schema_editor.connection)
+
+
+def backwards(apps, schema_editor):
+    uninstall_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invoices', '0006_feedbackvisibility'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
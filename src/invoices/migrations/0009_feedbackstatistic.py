@@ -0,0 +1,31 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invoices', '0008_feedback_created_uuid_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedbackStatistic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(max_length=20)),
+                ('rating', models.CharField(max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='feedback_statistics', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Feedback Statistic',
+                'verbose_name_plural': 'Feedback Statistics',
+                'constraints': [models.UniqueConstraint(condition=models.Q(('user__isnull', True)), fields=('status', 'rating'), name='unique_global_feedback_statistic'), models.UniqueConstraint(fields=('user', 'status', 'rating'), name='unique_user_feedback_statistic')],
+            },
+        ),
+    ]
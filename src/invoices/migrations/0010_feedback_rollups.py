@@ -0,0 +1,63 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invoices', '0009_feedbackstatistic'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedbackDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(max_length=20)),
+                ('rating', models.CharField(max_length=20)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Feedback Daily Rollup',
+                'verbose_name_plural': 'Feedback Daily Rollups',
+                'ordering': ['day'],
+            },
+        ),
+        migrations.CreateModel(
+            name='FeedbackRollupDirtyDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='FeedbackRollupState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('watermark', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='feedback',
+            index=models.Index(fields=['updated_at'], name='feedback_updated_at_idx'),
+        ),
+        migrations.AddField(
+            model_name='feedbackdailyrollup',
+            name='created_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='feedback_daily_rollups', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='feedbackdailyrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('created_by__isnull', True)), fields=('day', 'status', 'rating'), name='unique_anonymous_feedback_daily_rollup'),
+        ),
+        migrations.AddConstraint(
+            model_name='feedbackdailyrollup',
+            constraint=models.UniqueConstraint(fields=('day', 'status', 'rating', 'created_by'), name='unique_feedback_daily_rollup'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invoices', '0012_background_job_progress'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedbackSerialCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('next_value', models.PositiveIntegerField(default=1)),
+            ],
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:35
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invoices', '0014_feedbackingestkey'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='backgroundjob',
+            name='kind',
+            field=models.CharField(choices=[('feedback_pdf', 'Feedback PDF'), ('feedback_export', 'Feedback Export'), ('feedback_import', 'Feedback Import')], max_length=50),
+        ),
+        migrations.CreateModel(
+            name='FeedbackImport',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('uuid', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False, unique=True)),
+                ('file_name', models.CharField(max_length=255)),
+                ('path', models.CharField(max_length=500)),
+                ('sha256', models.CharField(db_index=True, max_length=64)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('batch_size', models.PositiveIntegerField(default=1000)),
+                ('last_row', models.PositiveIntegerField(default=0)),
+                ('imported', models.PositiveIntegerField(default=0)),
+                ('failed', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='feedback_imports', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Feedback Import',
+                'verbose_name_plural': 'Feedback Imports',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='FeedbackImportError',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('row_number', models.PositiveIntegerField()),
+                ('errors', models.JSONField(default=dict)),
+                ('values', models.JSONField(default=dict)),
+                ('feedback_import', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='row_errors', to='invoices.feedbackimport')),
+            ],
+            options={
+                'ordering': ['row_number'],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:43
+
+import django.utils.timezone
+import invoices.blobs
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invoices', '0016_upload_sessions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttachmentBlob',
+            fields=[
+                ('sha256', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('size', models.PositiveBigIntegerField()),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='feedback',
+            name='attachment',
+            field=models.FileField(blank=True, null=True, storage=invoices.blobs.attachment_storage, upload_to='feedback_attachments/', verbose_name='Attachment'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('captcha', '0002_alter_captchastore_id'),
+        ('invoices', '0017_attachment_blobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CaptchaPoolEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hashkey', models.CharField(max_length=40, unique=True)),
+                ('image', models.BinaryField()),
+                ('issued', models.BooleanField(default=False)),
+                ('store', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='pool_entry', to='captcha.captchastore')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['issued', 'id'], name='invoices_ca_issued_98f5f3_idx')],
+            },
+        ),
+        # The expiry sweeper filters captcha_captchastore on expiration, which the library leaves unindexed.
+        migrations.RunSQL(
+            'CREATE INDEX IF NOT EXISTS captcha_captchastore_expiration_idx ON captcha_captchastore (expiration)',
+            'DROP INDEX IF EXISTS captcha_captchastore_expiration_idx',
+        ),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations, models
+from django.db.models import F
+import django.utils.timezone
+
+
+def copy_created_at(apps, schema_editor):
+    # Existing rows count as received when they were created, so current digest cursors stay valid.
+    Feedback = apps.get_model('invoices', 'Feedback')
+    Feedback.objects.update(received_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invoices', '0020_backgroundjob_worker'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feedback',
+            name='received_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copy_created_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='feedback',
+            index=models.Index(fields=['received_at'], name='feedback_received_at_idx'),
+        ),
+    ]
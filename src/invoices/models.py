@@ -1,7 +1,9 @@
 import uuid
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
+from .blobs import attachment_storage
 
 User = settings.AUTH_USER_MODEL
 
@@ -62,8 +64,10 @@ class Feedback(TimestampMixin):
         verbose_name=_('Feedback')
     )
 
+    # Content-addressed: identical files share one AttachmentBlob.
     attachment = models.FileField(
         upload_to='feedback_attachments/',
+        storage=attachment_storage,
         blank=True,
         null=True,
         verbose_name=_('Attachment')
@@ -93,6 +97,12 @@ class Feedback(TimestampMixin):
         related_name='feedbacks'
     )
 
+    # When the row was inserted. Imports and kiosk uploads backdate created_at, this only moves forward,
+    # so digests use it to find the feedback added since they last ran.
+    received_at = models.DateTimeField(
+        auto_now_add=True
+    )
+
     def __str__(self):
         if self.anonymous:
             return f"Anonymous Feedback {self.serial_number}"
@@ -101,4 +111,525 @@ class Feedback(TimestampMixin):
     class Meta:
         verbose_name = 'Feedback'
         verbose_name_plural = 'Feedbacks'
-        ordering = ['-created_at']
\ No newline at end of file
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at', 'uuid'], name='feedback_created_uuid_idx'),
+            models.Index(fields=['updated_at'], name='feedback_updated_at_idx'),
+            models.Index(fields=['received_at'], name='feedback_received_at_idx'),
+        ]
+
+class FeedbackVisibility(models.Model):
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='feedback_visibilities'
+    )
+
+    feedback = models.ForeignKey(
+        Feedback,
+        on_delete=models.CASCADE,
+        related_name='visibilities'
+    )
+
+    def __str__(self):
+        return f"{self.user} -> {self.feedback.serial_number}"
+
+    class Meta:
+        verbose_name = 'Feedback Visibility'
+        verbose_name_plural = 'Feedback Visibilities'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'feedback'], name='unique_user_feedback_visibility'),
+        ]
+
+
+class FeedbackStatistic(models.Model):
+    # user is NULL for the global counters shown on the admin dashboard.
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='feedback_statistics'
+    )
+
+    status = models.CharField(
+        max_length=20
+    )
+
+    rating = models.CharField(
+        max_length=20
+    )
+
+    count = models.IntegerField(
+        default=0
+    )
+
+    def __str__(self):
+        return f"{self.user or 'Global'}: {self.status}/{self.rating} = {self.count}"
+
+    class Meta:
+        verbose_name = 'Feedback Statistic'
+        verbose_name_plural = 'Feedback Statistics'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['status', 'rating'],
+                condition=models.Q(user__isnull=True),
+                name='unique_global_feedback_statistic'
+            ),
+            models.UniqueConstraint(fields=['user', 'status', 'rating'], name='unique_user_feedback_statistic'),
+        ]
+
+
+class FeedbackDailyRollup(models.Model):
+    day = models.DateField()
+
+    status = models.CharField(
+        max_length=20
+    )
+
+    rating = models.CharField(
+        max_length=20
+    )
+
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='feedback_daily_rollups'
+    )
+
+    count = models.PositiveIntegerField(
+        default=0
+    )
+
+    def __str__(self):
+        return f"{self.day} {self.status}/{self.rating}: {self.count}"
+
+    class Meta:
+        verbose_name = 'Feedback Daily Rollup'
+        verbose_name_plural = 'Feedback Daily Rollups'
+        ordering = ['day']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'status', 'rating'],
+                condition=models.Q(created_by__isnull=True),
+                name='unique_anonymous_feedback_daily_rollup'
+            ),
+            models.UniqueConstraint(
+                fields=['day', 'status', 'rating', 'created_by'],
+                name='unique_feedback_daily_rollup'
+            ),
+        ]
+
+
+class FeedbackRollupState(models.Model):
+    name = models.CharField(
+        max_length=50,
+        unique=True
+    )
+
+    watermark = models.DateTimeField(
+        null=True,
+        blank=True
+    )
+
+    def __str__(self):
+        return f"{self.name} @ {self.watermark}"
+
+
+class FeedbackRollupDirtyDay(models.Model):
+    # Deleted feedback leaves no updated_at behind, so its day is queued here for the next rollup run.
+    day = models.DateField(
+        unique=True
+    )
+
+    def __str__(self):
+        return str(self.day)
+
+
+class BackgroundJob(TimestampMixin):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    ACTIVE_STATUSES = [QUEUED, RUNNING]
+
+    uuid = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False,
+        unique=True
+    )
+
+    kind = models.CharField(
+        max_length=50,
+        choices=[
+            ('feedback_pdf', 'Feedback PDF'),
+            ('feedback_export', 'Feedback Export'),
+            ('feedback_import', 'Feedback Import'),
+        ]
+    )
+
+    params = models.JSONField(
+        default=dict,
+        blank=True
+    )
+
+    status = models.CharField(
+        max_length=20,
+        choices=[
+            (QUEUED, 'Queued'),
+            (RUNNING, 'Running'),
+            (DONE, 'Done'),
+            (FAILED, 'Failed'),
+        ],
+        default=QUEUED
+    )
+
+    # Identifies the produced artifact (for PDFs, the PDF cache key).
+    result_key = models.CharField(
+        max_length=128,
+        blank=True,
+        default=''
+    )
+
+    error = models.TextField(
+        blank=True,
+        default=''
+    )
+
+    progress = models.PositiveIntegerField(
+        default=0
+    )
+
+    total = models.PositiveIntegerField(
+        null=True,
+        blank=True
+    )
+
+    # Artifacts past this time are deleted by the job worker.
+    expires_at = models.DateTimeField(
+        null=True,
+        blank=True
+    )
+
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='background_jobs'
+    )
+
+    started_at = models.DateTimeField(
+        null=True,
+        blank=True
+    )
+
+    # Name of the BackgroundWorker running the job; its heartbeat tells whether the job is still alive.
+    worker = models.CharField(
+        max_length=100,
+        blank=True,
+        default=''
+    )
+
+    finished_at = models.DateTimeField(
+        null=True,
+        blank=True
+    )
+
+    def __str__(self):
+        return f"{self.get_kind_display()} job {self.uuid} ({self.status})"
+
+    class Meta:
+        verbose_name = 'Background Job'
+        verbose_name_plural = 'Background Jobs'
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='background_job_queue_idx'),
+            models.Index(fields=['kind', 'result_key'], name='background_job_result_idx'),
+        ]
+
+
+class BackgroundWorker(models.Model):
+    name = models.CharField(
+        max_length=100,
+        unique=True
+    )
+
+    heartbeat_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name} @ {self.heartbeat_at}"
+
+
+class FeedbackSerialCounter(models.Model):
+    day = models.DateField(
+        unique=True
+    )
+
+    # Next sequence number not yet reserved by any process.
+    next_value = models.PositiveIntegerField(
+        default=1
+    )
+
+    def __str__(self):
+        return f"{self.day}: {self.next_value}"
+
+
+class FeedbackIngestKey(models.Model):
+    # Client-supplied idempotency key of a batch-ingested feedback, unique per submitting account.
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='feedback_ingest_keys'
+    )
+
+    key = models.CharField(
+        max_length=100
+    )
+
+    feedback = models.ForeignKey(
+        Feedback,
+        on_delete=models.CASCADE,
+        related_name='ingest_keys'
+    )
+
+    created_at = models.DateTimeField(
+        auto_now_add=True
+    )
+
+    def __str__(self):
+        return f"{self.user} {self.key} -> {self.feedback.serial_number}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_feedback_ingest_key'),
+        ]
+
+
+class FeedbackImport(TimestampMixin):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    uuid = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False,
+        unique=True
+    )
+
+    file_name = models.CharField(
+        max_length=255
+    )
+
+    path = models.CharField(
+        max_length=500
+    )
+
+    # Identifies the source file, so re-running an interrupted import resumes it.
+    sha256 = models.CharField(
+        max_length=64,
+        db_index=True
+    )
+
+    status = models.CharField(
+        max_length=20,
+        choices=[
+            (QUEUED, 'Queued'),
+            (RUNNING, 'Running'),
+            (DONE, 'Done'),
+            (FAILED, 'Failed'),
+        ],
+        default=QUEUED
+    )
+
+    batch_size = models.PositiveIntegerField(
+        default=1000
+    )
+
+    # Last source row whose batch has been committed; a resumed import continues after it.
+    last_row = models.PositiveIntegerField(
+        default=0
+    )
+
+    imported = models.PositiveIntegerField(
+        default=0
+    )
+
+    failed = models.PositiveIntegerField(
+        default=0
+    )
+
+    error = models.TextField(
+        blank=True,
+        default=''
+    )
+
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='feedback_imports'
+    )
+
+    def __str__(self):
+        return f"Import {self.file_name} ({self.status})"
+
+    class Meta:
+        verbose_name = 'Feedback Import'
+        verbose_name_plural = 'Feedback Imports'
+        ordering = ['-created_at']
+
+
+class FeedbackImportError(models.Model):
+    feedback_import = models.ForeignKey(
+        FeedbackImport,
+        on_delete=models.CASCADE,
+        related_name='row_errors'
+    )
+
+    row_number = models.PositiveIntegerField()
+
+    errors = models.JSONField(
+        default=dict
+    )
+
+    values = models.JSONField(
+        default=dict
+    )
+
+    def __str__(self):
+        return f"Row {self.row_number}: {self.errors}"
+
+    class Meta:
+        ordering = ['row_number']
+
+
+class UploadSession(TimestampMixin):
+    """A resumable attachment upload; chunks are appended to ``path`` until ``received`` reaches ``size``."""
+    uuid = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False,
+        unique=True
+    )
+
+    file_name = models.CharField(
+        max_length=255
+    )
+
+    size = models.PositiveBigIntegerField()
+
+    received = models.PositiveBigIntegerField(
+        default=0
+    )
+
+    path = models.CharField(
+        max_length=500
+    )
+
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='upload_sessions'
+    )
+
+    @property
+    def complete(self):
+        return self.received >= self.size
+
+    def __str__(self):
+        return f"Upload {self.file_name} ({self.received}/{self.size})"
+
+
+class AttachmentBlob(models.Model):
+    """One stored attachment file, shared by every feedback whose attachment has the same content."""
+    sha256 = models.CharField(
+        max_length=64,
+        primary_key=True
+    )
+
+    name = models.CharField(
+        max_length=255,
+        unique=True
+    )
+
+    size = models.PositiveBigIntegerField()
+
+    ref_count = models.PositiveIntegerField(
+        default=0
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    # Last reference change; unreferenced blobs are collected a grace period after this.
+    updated_at = models.DateTimeField(
+        default=timezone.now
+    )
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} references)"
+
+
+class CaptchaPoolEntry(models.Model):
+    """A pre-rendered CAPTCHA challenge; handing one out just flips ``issued`` on the oldest free entry."""
+    store = models.OneToOneField(
+        'captcha.CaptchaStore',
+        on_delete=models.CASCADE,
+        related_name='pool_entry'
+    )
+
+    hashkey = models.CharField(
+        max_length=40,
+        unique=True
+    )
+
+    image = models.BinaryField()
+
+    issued = models.BooleanField(
+        default=False
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['issued', 'id']),
+        ]
+
+
+class FeedbackDigestSubscription(TimestampMixin):
+    """An admin's feedback digest: new feedback after ``cursor`` goes out in one email per window."""
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='feedback_digest'
+    )
+
+    enabled = models.BooleanField(
+        default=True
+    )
+
+    # Feedback received after this (Feedback.received_at) has not been included in a digest yet.
+    cursor = models.DateTimeField(
+        default=timezone.now
+    )
+
+    # Set by the first new feedback after a digest; the next digest is due a window later.
+    pending_since = models.DateTimeField(
+        null=True,
+        blank=True
+    )
+
+    def __str__(self):
+        return f"Feedback digest for {self.user}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['enabled', 'pending_since']),
+        ]
@@ -0,0 +1,83 @@
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+from users.models import UserType
+from users.outbox import queue_email
+from .models import Feedback, FeedbackDigestSubscription
+
+logger = logging.getLogger(__name__)
+
+# At most one digest per admin per window; the job worker checks for due digests every minute.
+FEEDBACK_DIGEST_WINDOW = timedelta(minutes=getattr(settings, 'FEEDBACK_DIGEST_WINDOW_MINUTES', 60))
+FEEDBACK_DIGEST_MAX_ITEMS = getattr(settings, 'FEEDBACK_DIGEST_MAX_ITEMS', 20)
+# Feedback received more recently than this is left for the next digest, so rows whose transaction
+# (a whole import batch, say) is still being committed aren't skipped.
+FEEDBACK_DIGEST_SETTLE = timedelta(seconds=30)
+
+
+def mark_digests_pending():
+    """Called for each new feedback or bulk insert; only the first one after a digest actually writes."""
+    FeedbackDigestSubscription.objects.filter(enabled=True, pending_since__isnull=True).update(
+        pending_since=timezone.now(), updated_at=timezone.now()
+    )
+
+
+def ensure_admin_subscriptions():
+    """Subscribe active admins who have no digest yet, starting from now rather than the whole history."""
+    User = get_user_model()
+    missing = User.objects.filter(user_type=UserType.ADMIN, is_active=True, feedback_digest__isnull=True)
+    FeedbackDigestSubscription.objects.bulk_create(
+        [FeedbackDigestSubscription(user=user) for user in missing], ignore_conflicts=True
+    )
+
+
+def digest_message(feedbacks, total):
+    lines = [
+        f"{total} new feedback{'s' if total != 1 else ''} since the last digest:",
+        '',
+    ]
+    for feedback in feedbacks:
+        name = 'Anonymous' if feedback.anonymous else (feedback.name or 'Unknown')
+        lines.append(f"- {feedback.serial_number} | {feedback.get_rating_display()} | {name} | {feedback.created_at:%Y-%m-%d %H:%M}")
+    if total > len(feedbacks):
+        lines.append(f"... and {total - len(feedbacks)} more.")
+    lines += ['', f"Review them at {settings.SITE_URL}{reverse('invoices:manage_feedbacks')}"]
+    return '\n'.join(lines)
+
+
+def send_feedback_digests(window=FEEDBACK_DIGEST_WINDOW):
+    ensure_admin_subscriptions()
+    now = timezone.now()
+    until = now - FEEDBACK_DIGEST_SETTLE
+    due = FeedbackDigestSubscription.objects.filter(
+        enabled=True, pending_since__lte=now - window, user__is_active=True
+    ).select_related('user')
+
+    # Admins digested together share a cursor, so each distinct range is read once.
+    ranges = {}
+    more_pending = Feedback.objects.filter(received_at__gt=until).exists()
+    sent = 0
+    for subscription in due:
+        if subscription.cursor not in ranges:
+            feedbacks = Feedback.objects.filter(received_at__gt=subscription.cursor, received_at__lte=until)
+            ranges[subscription.cursor] = (
+                list(feedbacks.order_by('-received_at')[:FEEDBACK_DIGEST_MAX_ITEMS]),
+                feedbacks.count(),
+            )
+        feedbacks, total = ranges[subscription.cursor]
+
+        with transaction.atomic():
+            # Conditional on the cursor so two workers never send the same digest.
+            advanced = FeedbackDigestSubscription.objects.filter(pk=subscription.pk, cursor=subscription.cursor).update(
+                cursor=until, pending_since=now if more_pending else None, updated_at=now
+            )
+            if advanced and total:
+                queue_email(f"FeedBox: {total} new feedback{'s' if total != 1 else ''}", digest_message(feedbacks, total), [subscription.user.email])
+                sent += 1
+    if sent:
+        logger.info(f"Queued {sent} feedback digests")
+    return sent
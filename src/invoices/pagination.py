@@ -0,0 +1,120 @@
+import logging
+from datetime import datetime
+from urllib.parse import urlencode
+from uuid import UUID
+from django.core import signing
+from django.db.models import Q
+
+logger = logging.getLogger(__name__)
+
+CURSOR_SALT = 'invoices.pagination.cursor'
+
+
+def encode_cursor(obj, direction):
+    return signing.dumps({'c': obj.created_at.isoformat(), 'u': obj.uuid.hex, 'd': direction}, salt=CURSOR_SALT)
+
+
+def decode_cursor(token):
+    try:
+        data = signing.loads(token, salt=CURSOR_SALT)
+        return datetime.fromisoformat(data['c']), UUID(data['u']), data['d']
+    except (signing.BadSignature, KeyError, TypeError, ValueError):
+        logger.debug(f"Ignoring invalid pagination cursor: {token}")
+        return None
+
+
+class CursorPage:
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Keyset pagination over ``(created_at, uuid)``, newest first; no COUNT and no OFFSET."""
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset
+        self.per_page = per_page
+
+    def page(self, token=None):
+        cursor = decode_cursor(token) if token else None
+        if cursor is None:
+            rows = list(self.queryset.order_by('-created_at', '-uuid')[:self.per_page + 1])
+            return self._page(rows, more=len(rows) > self.per_page, backwards=False, from_cursor=False)
+
+        created_at, uuid, direction = cursor
+        if direction == 'prev':
+            rows = list(
+                self.queryset.filter(created_at__gte=created_at)
+                .filter(Q(created_at__gt=created_at) | Q(uuid__gt=uuid))
+                .order_by('created_at', 'uuid')[:self.per_page + 1]
+            )
+            return self._page(rows, more=len(rows) > self.per_page, backwards=True, from_cursor=True)
+
+        rows = list(
+            self.queryset.filter(created_at__lte=created_at)
+            .filter(Q(created_at__lt=created_at) | Q(uuid__lt=uuid))
+            .order_by('-created_at', '-uuid')[:self.per_page + 1]
+        )
+        return self._page(rows, more=len(rows) > self.per_page, backwards=False, from_cursor=True)
+
+    def _page(self, rows, more, backwards, from_cursor):
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+        if not rows:
+            return CursorPage(rows)
+        has_next = from_cursor if backwards else more
+        has_previous = more if backwards else from_cursor
+        return CursorPage(
+            rows,
+            next_cursor=encode_cursor(rows[-1], 'next') if has_next else None,
+            previous_cursor=encode_cursor(rows[0], 'prev') if has_previous else None,
+        )
+
+
+class CursorPaginationMixin:
+    """ListView mixin that pages with opaque cursors unless the view opts out for the current request."""
+    cursor_kwarg = 'cursor'
+
+    def use_cursor_pagination(self):
+        return True
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.use_cursor_pagination():
+            return super().paginate_queryset(queryset, page_size)
+        page = CursorPaginator(queryset, page_size).page(self.request.GET.get(self.cursor_kwarg))
+        return (None, page, page.object_list, page.has_other_pages())
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        page = context.get('page_obj')
+        context['previous_page_query'] = ''
+        context['next_page_query'] = ''
+        if isinstance(page, CursorPage):
+            if page.has_previous():
+                context['previous_page_query'] = urlencode({self.cursor_kwarg: page.previous_cursor})
+            if page.has_next():
+                context['next_page_query'] = urlencode({self.cursor_kwarg: page.next_cursor})
+        elif page is not None:
+            if page.has_previous():
+                context['previous_page_query'] = urlencode({self.page_kwarg: page.previous_page_number()})
+            if page.has_next():
+                context['next_page_query'] = urlencode({self.page_kwarg: page.next_page_number()})
+        return context
@@ -0,0 +1,240 @@
+import base64
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from datetime import datetime
+from functools import lru_cache
+from io import BytesIO
+from django.conf import settings
+from django.template.loader import get_template, render_to_string
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+from weasyprint import HTML, CSS
+from users.cache import get_system_logo
+from users.images import variant_bytes, variant_spec
+from .jobs import enqueue_job
+from .models import BackgroundJob, Feedback
+
+logger = logging.getLogger(__name__)
+
+PDF_TEMPLATE = 'invoices/feedback_pdf.html'
+PDF_CACHE_DIR = getattr(settings, 'FEEDBACK_PDF_CACHE_DIR', os.path.join(settings.BASE_DIR, 'cache', 'feedback_pdfs'))
+PDF_CACHE_MAX_BYTES = getattr(settings, 'FEEDBACK_PDF_CACHE_MAX_BYTES', 256 * 1024 * 1024)
+
+
+@lru_cache(maxsize=1)
+def _cached_template_hash():
+    return hashlib.sha256(get_template(PDF_TEMPLATE).template.source.encode('utf-8')).hexdigest()
+
+
+def template_hash():
+    # Templates are reloaded on every request in DEBUG, so only trust the memoized hash in production.
+    if settings.DEBUG:
+        _cached_template_hash.cache_clear()
+    return _cached_template_hash()
+
+
+def pdf_creator(feedback, user):
+    if feedback.created_by:
+        return feedback.created_by
+    if user.is_authenticated:
+        return user
+    return None
+
+
+def pdf_office_name(user):
+    return user.full_name if user.is_authenticated else "Your Office"
+
+
+def feedback_pdf_key(feedback, creator, office_name):
+    """Digest of everything the rendered PDF depends on; used as cache file name and ETag."""
+    logo = get_system_logo()
+    parts = [
+        feedback.uuid.hex,
+        feedback.updated_at.isoformat(),
+        str(creator.pk) if creator else '',
+        creator.profile_picture.name if creator and creator.profile_picture else '',
+        f"{logo.pk}:{logo.updated_at.isoformat()}:{logo.logo.name}" if logo and logo.logo else '',
+        office_name,
+        template_hash(),
+        variant_spec('pdf'),
+    ]
+    return hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()
+
+
+def render_feedback_pdf(feedback, creator, office_name):
+    logo = get_system_logo()
+    logo_base64 = None
+    profile_picture_base64 = None
+
+    # Embed the downsized PDF variant rather than the original upload, which may be a multi-MB photo.
+    if creator and hasattr(creator, 'profile_picture') and creator.profile_picture:
+        try:
+            data = variant_bytes(creator.profile_picture, 'pdf')
+            if data:
+                profile_picture_base64 = base64.b64encode(data).decode('utf-8')
+        except Exception as e:
+            logger.error(f"Error encoding profile picture to base64: {str(e)}")
+
+    # Fallback to system logo if profile picture is not available
+    if not profile_picture_base64:
+        if logo and hasattr(logo, 'logo') and logo.logo:
+            try:
+                data = variant_bytes(logo.logo, 'pdf')
+                if data:
+                    logo_base64 = base64.b64encode(data).decode('utf-8')
+            except Exception as e:
+                logger.error(f"Error encoding logo to base64: {str(e)}")
+        else:
+            try:
+                with open(os.path.join(settings.STATIC_ROOT, 'images/logo.jpeg'), 'rb') as f:
+                    logo_base64 = base64.b64encode(f.read()).decode('utf-8')
+            except FileNotFoundError:
+                logger.error("Static logo file (images/logo.jpeg) not found")
+
+    html_string = render_to_string(PDF_TEMPLATE, {
+        'feedback': feedback,
+        'logo_base64': logo_base64,
+        'profile_picture_base64': profile_picture_base64,
+        'generated_date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'office_name': office_name,
+        'creator': creator,
+    })
+
+    pdf_buffer = BytesIO()
+    HTML(string=html_string).write_pdf(
+        target=pdf_buffer,
+        stylesheets=[CSS(string='''
+            body { font-family: Arial, sans-serif; }
+        ''')]
+    )
+    return pdf_buffer.getvalue()
+
+
+class PdfCache:
+    """Content-addressed PDF files on disk, evicted least-recently-used first once over ``max_bytes``.
+
+    Eviction walks the whole directory, so the job worker runs it as maintenance rather than on every
+    write; a process only evicts by itself once it has written a tenth of ``max_bytes`` since its
+    last pass, which keeps the cache bounded when no worker is running.
+    """
+
+    def __init__(self, directory=PDF_CACHE_DIR, max_bytes=PDF_CACHE_MAX_BYTES):
+        self.directory = str(directory)
+        self.max_bytes = max_bytes
+        self._written = 0
+        self._written_lock = threading.Lock()
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], f'{key}.pdf')
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            # mtime doubles as the last-access time for eviction
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def open(self, key):
+        path = self.get(key)
+        if path is None:
+            return None
+        try:
+            return open(path, 'rb')
+        except FileNotFoundError:
+            # Evicted between the lookup and the open.
+            return None
+
+    def put(self, key, data):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        with self._written_lock:
+            self._written += len(data)
+            due = self._written >= self.max_bytes // 10
+            if due:
+                self._written = 0
+        if due:
+            self.evict(keep=path)
+        return path
+
+    def evict(self, keep=None):
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith('.pdf'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+            except FileNotFoundError:
+                pass
+        logger.debug(f"Feedback PDF cache holds {total} bytes")
+
+
+pdf_cache = PdfCache()
+
+
+def evict_pdf_cache():
+    pdf_cache.evict()
+
+
+def run_pdf_job(job):
+    """Background job handler: render into the PDF cache and return the cache key."""
+    feedback = Feedback.objects.select_related('created_by').get(uuid=job.params['feedback'])
+    creator = feedback.created_by
+    if creator is None and job.params.get('creator'):
+        creator = get_user_model().objects.filter(pk=job.params['creator']).first()
+    office_name = job.params['office_name']
+    # Recomputed because the feedback may have changed while the job was queued.
+    key = feedback_pdf_key(feedback, creator, office_name)
+    if not pdf_cache.get(key):
+        pdf_cache.put(key, render_feedback_pdf(feedback, creator, office_name))
+    return key
+
+
+def submit_pdf_job(feedback, user):
+    """Queue a background render of ``feedback`` for ``user``; already-cached PDFs get a finished job."""
+    creator = pdf_creator(feedback, user)
+    office_name = pdf_office_name(user)
+    key = feedback_pdf_key(feedback, creator, office_name)
+    params = {
+        'feedback': str(feedback.uuid),
+        'creator': str(creator.pk) if creator else None,
+        'office_name': office_name,
+    }
+    if pdf_cache.get(key):
+        return BackgroundJob.objects.create(
+            kind='feedback_pdf',
+            params=params,
+            result_key=key,
+            status=BackgroundJob.DONE,
+            finished_at=timezone.now(),
+            requested_by=user if user.is_authenticated else None,
+        )
+    return enqueue_job('feedback_pdf', params, result_key=key, user=user)
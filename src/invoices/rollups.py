@@ -0,0 +1,107 @@
+import logging
+from datetime import date, datetime, time, timedelta
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+from django.utils import timezone
+from .models import Feedback, FeedbackDailyRollup, FeedbackRollupDirtyDay, FeedbackRollupState
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_STATE_NAME = 'feedback_daily'
+# Rows committed by slow transactions can carry an updated_at slightly older than the last run.
+WATERMARK_OVERLAP = timedelta(minutes=5)
+
+TREND_GROUPS = {'status': ['pending', 'solved', 'closed'], 'rating': ['excellent', 'good', 'poor']}
+TREND_INTERVALS = ['day', 'month']
+
+
+def _day_bounds(day):
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    end = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+    return start, end
+
+
+def mark_day_dirty(created_at):
+    FeedbackRollupDirtyDay.objects.bulk_create(
+        [FeedbackRollupDirtyDay(day=timezone.localdate(created_at))],
+        ignore_conflicts=True,
+    )
+
+
+@transaction.atomic
+def rebuild_day(day):
+    start, end = _day_bounds(day)
+    FeedbackDailyRollup.objects.filter(day=day).delete()
+    FeedbackDailyRollup.objects.bulk_create([
+        FeedbackDailyRollup(
+            day=day,
+            status=item['status'],
+            rating=item['rating'],
+            created_by_id=item['created_by'],
+            count=item['count'],
+        )
+        for item in Feedback.objects.filter(created_at__gte=start, created_at__lt=end)
+        .values('status', 'rating', 'created_by').annotate(count=Count('pk')).order_by()
+    ])
+
+
+def update_rollups(full=False):
+    """Recompute the rollup rows of every day touched since the last run; returns the number of days rebuilt."""
+    started = timezone.now()
+    state, _ = FeedbackRollupState.objects.get_or_create(name=ROLLUP_STATE_NAME)
+
+    changed = Feedback.objects.all()
+    if full:
+        FeedbackDailyRollup.objects.all().delete()
+    elif state.watermark is not None:
+        changed = changed.filter(updated_at__gt=state.watermark - WATERMARK_OVERLAP)
+
+    days = set(changed.annotate(day=TruncDate('created_at')).values_list('day', flat=True).order_by().distinct())
+    dirty_days = list(FeedbackRollupDirtyDay.objects.values_list('day', flat=True))
+    days.update(dirty_days)
+
+    for day in sorted(days):
+        rebuild_day(day)
+
+    FeedbackRollupDirtyDay.objects.filter(day__in=dirty_days).delete()
+    state.watermark = started
+    state.save(update_fields=['watermark'])
+    logger.debug(f"Rebuilt feedback rollups for {len(days)} days, watermark={started}")
+    return len(days)
+
+
+def _periods(start, end, interval):
+    periods = []
+    current = start if interval == 'day' else start.replace(day=1)
+    while current <= end:
+        periods.append(current)
+        if interval == 'day':
+            current += timedelta(days=1)
+        else:
+            current = date(current.year + current.month // 12, current.month % 12 + 1, 1)
+    return periods
+
+
+def feedback_trends(start, end, group='status', interval='month', created_by=None):
+    """Chart series built from the rollup table; a 12-month range reads at most a few hundred rows."""
+    rollups = FeedbackDailyRollup.objects.filter(day__gte=start, day__lte=end)
+    if created_by is not None:
+        rollups = rollups.filter(created_by=created_by)
+
+    if interval == 'month':
+        rollups = rollups.annotate(bucket=TruncMonth('day'))
+    else:
+        rollups = rollups.annotate(bucket=F('day'))
+    totals = {
+        (item['bucket'], item[group]): item['total']
+        for item in rollups.values('bucket', group).annotate(total=Sum('count')).order_by()
+    }
+
+    periods = _periods(start, end, interval)
+    return {
+        'interval': interval,
+        'group': group,
+        'labels': [p.isoformat() if interval == 'day' else p.strftime('%Y-%m') for p in periods],
+        'series': {key: [totals.get((p, key), 0) for p in periods] for key in TREND_GROUPS[group]},
+    }
@@ -0,0 +1,171 @@
+import logging
+import re
+from django.db import connection
+from django.db.models import Q
+
+logger = logging.getLogger(__name__)
+
+SEARCH_FIELDS = ['serial_number', 'name', 'email', 'mobile', 'address', 'feedback_text']
+SEARCH_ORDERING = ['-search_rank', '-created_at']
+# A term made only of digits and the separators people type into phone numbers.
+PHONE_LIKE = re.compile(r'^\+?[\d().-]*\d[\d().-]*$')
+
+FTS_TABLE = 'invoices_feedback_fts'
+FTS_MAP_TABLE = 'invoices_feedback_fts_map'
+
+# Devanagari vowel signs, viramas and nasalisation marks are Unicode "Mn"/"Mc" characters, which the
+# unicode61 tokenizer treats as separators by default and would split every Nepali word apart.
+DEVANAGARI_MARKS = ''.join(
+    chr(code)
+    for start, end in [(0x0900, 0x0903), (0x093A, 0x093C), (0x093E, 0x094F), (0x0951, 0x0957), (0x0962, 0x0963)]
+    for code in range(start, end + 1)
+)
+
+# FTS5 needs an integer rowid, and the rowid of invoices_feedback itself is not stable across VACUUM,
+# so the map table hands out one per feedback uuid.
+SQLITE_TABLES = [
+    f'CREATE TABLE IF NOT EXISTS {FTS_MAP_TABLE} (id INTEGER PRIMARY KEY, feedback_uuid char(32) NOT NULL UNIQUE)',
+    f'''CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        {', '.join(SEARCH_FIELDS)},
+        tokenize="unicode61 remove_diacritics 0 tokenchars '{DEVANAGARI_MARKS}'"
+    )''',
+]
+
+SQLITE_TRIGGERS = [
+    f'''CREATE TRIGGER IF NOT EXISTS invoices_feedback_fts_insert AFTER INSERT ON invoices_feedback BEGIN
+        INSERT INTO {FTS_MAP_TABLE} (feedback_uuid) VALUES (NEW.uuid);
+        INSERT INTO {FTS_TABLE} (rowid, {', '.join(SEARCH_FIELDS)})
+        VALUES ((SELECT id FROM {FTS_MAP_TABLE} WHERE feedback_uuid = NEW.uuid),
+                {', '.join('NEW.' + field for field in SEARCH_FIELDS)});
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS invoices_feedback_fts_update AFTER UPDATE OF {', '.join(SEARCH_FIELDS)}
+    ON invoices_feedback WHEN {' OR '.join(f'OLD.{field} IS NOT NEW.{field}' for field in SEARCH_FIELDS)} BEGIN
+        UPDATE {FTS_TABLE} SET {', '.join(f'{field} = NEW.{field}' for field in SEARCH_FIELDS)}
+        WHERE rowid = (SELECT id FROM {FTS_MAP_TABLE} WHERE feedback_uuid = NEW.uuid);
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS invoices_feedback_fts_delete AFTER DELETE ON invoices_feedback BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = (SELECT id FROM {FTS_MAP_TABLE} WHERE feedback_uuid = OLD.uuid);
+        DELETE FROM {FTS_MAP_TABLE} WHERE feedback_uuid = OLD.uuid;
+    END''',
+]
+
+SQLITE_REBUILD = [
+    f'DELETE FROM {FTS_TABLE}',
+    f'DELETE FROM {FTS_MAP_TABLE}',
+    f'INSERT INTO {FTS_MAP_TABLE} (feedback_uuid) SELECT uuid FROM invoices_feedback',
+    f'''INSERT INTO {FTS_TABLE} (rowid, {', '.join(SEARCH_FIELDS)})
+        SELECT m.id, {', '.join('f.' + field for field in SEARCH_FIELDS)}
+        FROM invoices_feedback f JOIN {FTS_MAP_TABLE} m ON m.feedback_uuid = f.uuid''',
+]
+
+SQLITE_DROP = [
+    'DROP TRIGGER IF EXISTS invoices_feedback_fts_insert',
+    'DROP TRIGGER IF EXISTS invoices_feedback_fts_update',
+    'DROP TRIGGER IF EXISTS invoices_feedback_fts_delete',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+    f'DROP TABLE IF EXISTS {FTS_MAP_TABLE}',
+]
+
+# The 'simple' configuration lowercases without stemming, so Devanagari words are indexed as written.
+# A generated column keeps itself in sync, so PostgreSQL needs no triggers.
+POSTGRESQL_CREATE = [
+    f'''ALTER TABLE invoices_feedback ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        to_tsvector('simple', {" || ' ' || ".join(f"coalesce({field}, '')" for field in SEARCH_FIELDS)})
+    ) STORED''',
+    'CREATE INDEX IF NOT EXISTS invoices_feedback_search_vector_idx ON invoices_feedback USING GIN (search_vector)',
+]
+
+POSTGRESQL_DROP = [
+    'DROP INDEX IF EXISTS invoices_feedback_search_vector_idx',
+    'ALTER TABLE invoices_feedback DROP COLUMN IF EXISTS search_vector',
+]
+
+
+def _execute(db_connection, statements):
+    with db_connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def install_search_index(db_connection):
+    if db_connection.vendor == 'sqlite':
+        _execute(db_connection, SQLITE_DROP + SQLITE_TABLES + SQLITE_TRIGGERS + SQLITE_REBUILD)
+    elif db_connection.vendor == 'postgresql':
+        _execute(db_connection, POSTGRESQL_CREATE)
+
+
+def uninstall_search_index(db_connection):
+    if db_connection.vendor == 'sqlite':
+        _execute(db_connection, SQLITE_DROP)
+    elif db_connection.vendor == 'postgresql':
+        _execute(db_connection, POSTGRESQL_DROP)
+
+
+def ensure_search_triggers(db_connection):
+    # SQLite migrations that alter invoices_feedback rebuild the table and silently drop its triggers.
+    if db_connection.vendor != 'sqlite' or FTS_MAP_TABLE not in db_connection.introspection.table_names():
+        return
+    with db_connection.cursor() as cursor:
+        cursor.execute("SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'invoices_feedback_fts_%'")
+        if cursor.fetchone()[0] == len(SQLITE_TRIGGERS):
+            return
+    logger.warning("Feedback full-text search triggers missing, rebuilding the search index")
+    _execute(db_connection, SQLITE_TABLES + SQLITE_TRIGGERS + SQLITE_REBUILD)
+
+
+def _term(term):
+    # "981-234-5678" or "(981)2345678" are typed with separators; mobiles are stored as plain digits.
+    if PHONE_LIKE.match(term):
+        return re.sub(r'\D', '', term)
+    return term
+
+
+def _terms(search):
+    return [_term(term) for term in search.split() if term.strip('"\'')]
+
+
+def _sqlite_query(terms):
+    # Each term becomes a quoted prefix phrase so user input never reaches the FTS5 query syntax.
+    return ' AND '.join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+
+
+def _postgresql_query(terms):
+    return ' & '.join("'{}':*".format(term.replace('\\', '\\\\').replace("'", "''")) for term in terms)
+
+
+def search_feedbacks(queryset, search):
+    """Filter a Feedback queryset by full-text search and annotate it with ``search_rank`` (higher is better).
+
+    Identifiers are indexed alongside the text, so a serial number, mobile or email matches from its
+    start (or an email from any of its words) through the same index lookup.
+    """
+    terms = _terms(search)
+    vendor = connection.vendor
+
+    if terms and vendor == 'sqlite':
+        # One MATCH joined through the map table; bm25 comes from that same lookup, not once per row.
+        return queryset.extra(
+            select={'search_rank': f'-bm25({FTS_TABLE})'},
+            tables=[FTS_MAP_TABLE, FTS_TABLE],
+            where=[
+                f'{FTS_TABLE} MATCH %s',
+                f'{FTS_TABLE}.rowid = {FTS_MAP_TABLE}.id',
+                f'{FTS_MAP_TABLE}.feedback_uuid = invoices_feedback.uuid',
+            ],
+            params=[_sqlite_query(terms)],
+        )
+
+    if terms and vendor == 'postgresql':
+        query = _postgresql_query(terms)
+        return queryset.extra(
+            select={'search_rank': "ts_rank(invoices_feedback.search_vector, to_tsquery('simple', %s))"},
+            select_params=[query],
+            where=["invoices_feedback.search_vector @@ to_tsquery('simple', %s)"],
+            params=[query],
+        )
+
+    logger.debug(f"Full-text search unavailable for vendor={vendor}, falling back to icontains")
+    match = Q()
+    for field in SEARCH_FIELDS:
+        match |= Q(**{f'{field}__icontains': search})
+    return queryset.filter(match).extra(select={'search_rank': '0'})
@@ -0,0 +1,105 @@
+import logging
+import re
+import threading
+from collections import defaultdict
+from datetime import datetime
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from .models import FeedbackSerialCounter
+
+logger = logging.getLogger(__name__)
+
+# Each process reserves this many numbers per database round-trip. Numbers left in a block when a
+# process exits are skipped, so serials are unique and ordered within a day but not gap-free.
+SERIAL_BLOCK_SIZE = getattr(settings, 'FEEDBACK_SERIAL_BLOCK_SIZE', 20)
+SERIAL_DIGITS = 6
+SERIAL_PATTERN = re.compile(rf'^(\d{{8}})(\d{{{SERIAL_DIGITS}}})$')
+
+
+def format_serial(day, value):
+    # Fixed-width sequence after the date prefix, so serials sort by day and then by allocation order.
+    return f"{day:%Y%m%d}{value:0{SERIAL_DIGITS}d}"
+
+
+def reserve_range(day, size):
+    """Reserve ``size`` consecutive values for ``day`` and return the first one."""
+    with transaction.atomic():
+        # UPDATE first: it takes the row (or database) write lock before we read the new value back.
+        counters = FeedbackSerialCounter.objects.filter(day=day)
+        if not counters.update(next_value=F('next_value') + size):
+            try:
+                with transaction.atomic():
+                    FeedbackSerialCounter.objects.create(day=day, next_value=1 + size)
+                return 1
+            except IntegrityError:
+                # Another process created today's counter first.
+                counters.update(next_value=F('next_value') + size)
+        return counters.values_list('next_value', flat=True).get() - size
+
+
+def claim_serial_numbers(serial_numbers):
+    """Move day counters past imported serials that use the allocator's own format."""
+    highest = defaultdict(int)
+    for serial_number in serial_numbers:
+        match = SERIAL_PATTERN.match(serial_number or '')
+        if not match:
+            continue
+        try:
+            day = datetime.strptime(match.group(1), '%Y%m%d').date()
+        except ValueError:
+            continue
+        highest[day] = max(highest[day], int(match.group(2)))
+
+    for day, value in highest.items():
+        counter, created = FeedbackSerialCounter.objects.get_or_create(day=day, defaults={'next_value': value + 1})
+        if not created:
+            FeedbackSerialCounter.objects.filter(pk=counter.pk).update(next_value=Greatest(F('next_value'), value + 1))
+
+
+class SerialAllocator:
+    def __init__(self, block_size=SERIAL_BLOCK_SIZE):
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._block = None
+
+    def allocate(self, count=1):
+        day = timezone.localdate()
+        with self._lock:
+            if self._block and self._block[0] == day and self._block[2] - self._block[1] >= count:
+                _, start, end = self._block
+                self._block = (day, start + count, end)
+                return [format_serial(day, value) for value in range(start, start + count)]
+
+            size = max(count, self.block_size)
+            start = reserve_range(day, size)
+            remainder = (day, start + count, start + size)
+            if connection.in_atomic_block:
+                # If the caller's transaction rolls back, so does the reservation; only keep the rest
+                # of the block once it is durable, or it would be handed out again.
+                transaction.on_commit(lambda: self._keep(remainder))
+            else:
+                self._block = remainder
+            logger.debug(f"Reserved feedback serials {start}-{start + size - 1} for {day}")
+            return [format_serial(day, value) for value in range(start, start + count)]
+
+    def _keep(self, block):
+        with self._lock:
+            self._block = block
+
+    def reset(self):
+        with self._lock:
+            self._block = None
+
+
+serial_allocator = SerialAllocator()
+
+
+def next_serial_number():
+    return serial_allocator.allocate()[0]
+
+
+def reserve_serial_numbers(count):
+    return serial_allocator.allocate(count)
@@ -0,0 +1,90 @@
+from collections import Counter
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from .blobs import acquire_blob, release_blob
+from .events import publish_feedback_event
+from .models import Feedback, FeedbackVisibility
+from .notifications import mark_digests_pending
+from .rollups import mark_day_dirty
+from .search import ensure_search_triggers
+from .statistics import apply_statistic_deltas, feedback_changed_deltas
+from .visibility import sync_feedback_visibility, sync_user_visibility
+
+VISIBILITY_FEEDBACK_FIELDS = {'email', 'mobile', 'created_by'}
+VISIBILITY_USER_FIELDS = {'email', 'mobile'}
+
+
+@receiver(pre_save, sender=Feedback)
+def remember_feedback_statistics_key(sender, instance, **kwargs):
+    # Read the stored values rather than trusting the instance, which may be stale or partially loaded.
+    instance._statistics_key = None
+    instance._stored_attachment = None
+    # An uncommitted file is stored during this save and needs its own reference, even when it has the
+    # same content, and so the same name, as the attachment it replaces.
+    instance._attachment_uploaded = bool(instance.attachment) and not instance.attachment._committed
+    if not instance._state.adding:
+        stored = Feedback.objects.filter(pk=instance.pk).values_list('status', 'rating', 'attachment').first()
+        if stored:
+            instance._statistics_key = stored[:2]
+            instance._stored_attachment = stored[2]
+
+
+@receiver(post_save, sender=Feedback)
+def update_feedback_indexes(sender, instance, created, update_fields=None, **kwargs):
+    key = (instance.status, instance.rating)
+    old_key = getattr(instance, '_statistics_key', None)
+    with transaction.atomic():
+        # Counters move to the new key for users who can already see the feedback; the visibility sync
+        # below then adds or removes users at the new key.
+        if created:
+            apply_statistic_deltas(Counter({(None, *key): 1}))
+        elif old_key and old_key != key:
+            user_ids = FeedbackVisibility.objects.filter(feedback=instance).values_list('user_id', flat=True)
+            apply_statistic_deltas(feedback_changed_deltas(old_key, key, user_ids))
+        if created or update_fields is None or VISIBILITY_FEEDBACK_FIELDS & set(update_fields):
+            sync_feedback_visibility(instance)
+        # Blob references follow the row, in this transaction, so a rolled back save changes none.
+        old_attachment = getattr(instance, '_stored_attachment', None) or None
+        new_attachment = instance.attachment.name or None
+        if old_attachment != new_attachment or getattr(instance, '_attachment_uploaded', False):
+            if new_attachment:
+                acquire_blob(new_attachment)
+            if old_attachment:
+                release_blob(old_attachment)
+
+
+@receiver(post_save, sender=Feedback)
+def notify_feedback_change(sender, instance, created, **kwargs):
+    old_key = getattr(instance, '_statistics_key', None)
+    if created:
+        mark_digests_pending()
+        publish_feedback_event(instance, 'created')
+    elif old_key and old_key[0] != instance.status:
+        publish_feedback_event(instance, 'status')
+
+
+@receiver(pre_delete, sender=Feedback)
+def remove_feedback_aggregates(sender, instance, **kwargs):
+    user_ids = FeedbackVisibility.objects.filter(feedback=instance).values_list('user_id', flat=True)
+    apply_statistic_deltas(Counter({(user_id, instance.status, instance.rating): -1 for user_id in [None, *user_ids]}))
+    mark_day_dirty(instance.created_at)
+
+
+@receiver(post_delete, sender=Feedback)
+def release_feedback_attachment(sender, instance, **kwargs):
+    if instance.attachment:
+        release_blob(instance.attachment.name)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def update_user_visibility(sender, instance, created, update_fields=None, **kwargs):
+    if created or update_fields is None or VISIBILITY_USER_FIELDS & set(update_fields):
+        sync_user_visibility(instance)
+
+
+@receiver(post_migrate)
+def restore_search_triggers(sender, app_config, using, **kwargs):
+    if app_config.label == 'invoices':
+        ensure_search_triggers(connections[using])
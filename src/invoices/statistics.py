@@ -0,0 +1,99 @@
+import logging
+from collections import Counter
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from .models import Feedback, FeedbackStatistic, FeedbackVisibility
+
+logger = logging.getLogger(__name__)
+
+REVIEWED_STATUSES = ['solved', 'closed']
+REVIEWED_CACHE_TIMEOUT = getattr(settings, 'REVIEWED_FEEDBACKS_CACHE_TIMEOUT', 60)
+
+
+def _reviewed_cache_key(user_id):
+    return f'invoices:reviewed_feedbacks:{user_id}'
+
+
+def apply_statistic_deltas(deltas):
+    """Apply a Counter of ``(user_id or None, status, rating) -> delta`` to the counters table."""
+    for (user_id, status, rating), delta in deltas.items():
+        if not delta:
+            continue
+        counters = FeedbackStatistic.objects.filter(user_id=user_id, status=status, rating=rating)
+        if counters.update(count=F('count') + delta):
+            continue
+        try:
+            with transaction.atomic():
+                FeedbackStatistic.objects.create(user_id=user_id, status=status, rating=rating, count=delta)
+        except IntegrityError:
+            # Another request created the row between our update and insert.
+            counters.update(count=F('count') + delta)
+
+    user_ids = {user_id for (user_id, _, _), delta in deltas.items() if delta and user_id is not None}
+    if user_ids:
+        keys = [_reviewed_cache_key(user_id) for user_id in user_ids]
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def feedback_changed_deltas(old_key, new_key, user_ids):
+    deltas = Counter()
+    if old_key == new_key:
+        return deltas
+    for user_id in [None, *user_ids]:
+        deltas[(user_id, *old_key)] -= 1
+        deltas[(user_id, *new_key)] += 1
+    return deltas
+
+
+def feedback_statistics(user=None):
+    """Dashboard figures for one user (or globally when ``user`` is None) from a single indexed read."""
+    counts = Counter()
+    for status, rating, count in FeedbackStatistic.objects.filter(user=user).values_list('status', 'rating', 'count'):
+        counts[status] += count
+        counts[rating] += count
+        counts['total'] += count
+    return {
+        'total': counts['total'],
+        'pending': counts['pending'],
+        'solved': counts['solved'],
+        'closed': counts['closed'],
+        'reviewed': sum(counts[status] for status in REVIEWED_STATUSES),
+        'excellent': counts['excellent'],
+        'good': counts['good'],
+        'poor': counts['poor'],
+    }
+
+
+def reviewed_feedback_count(user):
+    """Solved plus closed feedbacks visible to ``user``, cached briefly per user."""
+    key = _reviewed_cache_key(user.pk)
+    count = cache.get(key)
+    if count is None:
+        count = FeedbackStatistic.objects.filter(user=user, status__in=REVIEWED_STATUSES) \
+            .aggregate(total=Sum('count'))['total'] or 0
+        cache.set(key, count, REVIEWED_CACHE_TIMEOUT)
+    return count
+
+
+@transaction.atomic
+def rebuild_statistics():
+    FeedbackStatistic.objects.all().delete()
+    rows = [
+        FeedbackStatistic(user_id=None, status=item['status'], rating=item['rating'], count=item['count'])
+        for item in Feedback.objects.values('status', 'rating').annotate(count=Count('pk')).order_by()
+    ]
+    rows += [
+        FeedbackStatistic(
+            user_id=item['user_id'],
+            status=item['feedback__status'],
+            rating=item['feedback__rating'],
+            count=item['count'],
+        )
+        for item in FeedbackVisibility.objects.values('user_id', 'feedback__status', 'feedback__rating')
+        .annotate(count=Count('pk')).order_by()
+    ]
+    FeedbackStatistic.objects.bulk_create(rows, batch_size=1000)
+    logger.debug(f"Rebuilt {len(rows)} feedback statistic rows")
+    return len(rows)
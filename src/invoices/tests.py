@@ -1,3 +1,77 @@
-from django.test import TestCase
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from django.db import connection
+from django.contrib.auth import get_user_model
+from django.test import Client, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+from .models import Feedback
+from .serials import serial_allocator
 
-# Create your tests here.
+
+class FeedbackSerialNumberTests(TransactionTestCase):
+    threads = 8
+    posts_per_thread = 10
+
+    def setUp(self):
+        serial_allocator.reset()
+
+    def submit_feedbacks(self, index):
+        # One address per thread keeps each client within the per-IP rate limit.
+        client = Client(REMOTE_ADDR=f'10.0.0.{index}')
+        statuses = []
+        try:
+            for n in range(self.posts_per_thread):
+                response = client.post(reverse('invoices:create_feedback'), {
+                    'name': f'User {index}',
+                    'address': 'Kathmandu',
+                    'mobile': f'98{index:04d}{n:04d}',
+                    'rating': 'good',
+                    'feedback_text': 'Concurrent feedback',
+                    'anonymous': 'False',
+                    'captcha_0': 'test',
+                    'captcha_1': 'PASSED',
+                })
+                statuses.append(response.status_code)
+        finally:
+            connection.close()
+        return statuses
+
+    @mock.patch('captcha.conf.settings.CAPTCHA_TEST_MODE', True)
+    def test_concurrent_submissions_get_unique_serial_numbers(self):
+        total = self.threads * self.posts_per_thread
+        with ThreadPoolExecutor(max_workers=self.threads) as pool:
+            statuses = [status for result in pool.map(self.submit_feedbacks, range(self.threads)) for status in result]
+
+        self.assertEqual(statuses, [302] * total)
+        serials = list(Feedback.objects.values_list('serial_number', flat=True))
+        self.assertEqual(len(serials), total)
+        self.assertEqual(len(set(serials)), total)
+        prefix = timezone.localdate().strftime('%Y%m%d')
+        self.assertTrue(all(serial.startswith(prefix) and len(serial) == 14 for serial in serials))
+
+
+class RateLimitTests(TransactionTestCase):
+    def test_captcha_refresh_is_throttled_per_ip(self):
+        client = Client(REMOTE_ADDR='10.1.0.1', HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        statuses = [client.get(reverse('invoices:captcha-refresh')).status_code for _ in range(31)]
+
+        self.assertEqual(statuses, [200] * 30 + [429])
+        response = client.get(reverse('invoices:captcha-refresh'))
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(int(response['Retry-After']) >= 1)
+        other = Client(REMOTE_ADDR='10.1.0.2', HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(other.get(reverse('invoices:captcha-refresh')).status_code, 200)
+
+    def test_only_failed_logins_count_against_an_account(self):
+        get_user_model().objects.create_user(email='owner@example.com', password='correct-horse', full_name='Owner')
+        login = reverse('users:login')
+        for _ in range(12):
+            response = Client(REMOTE_ADDR='10.2.0.1').post(login, {'username': 'owner@example.com', 'password': 'correct-horse'})
+            self.assertEqual(response.status_code, 302)
+
+        statuses = [
+            Client(REMOTE_ADDR=f'10.3.0.{n}').post(login, {'username': 'owner@example.com', 'password': 'wrong'}).status_code
+            for n in range(11)
+        ]
+        self.assertEqual(statuses, [200] * 10 + [429])
@@ -0,0 +1,170 @@
+import logging
+import os
+from datetime import timedelta
+from django.conf import settings
+from django.core.files import File
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+from django.template.defaultfilters import filesizeformat
+from django.utils import timezone
+from .models import UploadSession
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+# Per-type attachment limits; extensions not listed fall back to 'default'.
+ATTACHMENT_SIZE_LIMITS = getattr(settings, 'FEEDBACK_ATTACHMENT_SIZE_LIMITS', {
+    'image': 10 * MB,
+    'document': 20 * MB,
+    'media': 100 * MB,
+    'default': 10 * MB,
+})
+ATTACHMENT_TYPES = {
+    'image': ['.jpg', '.jpeg', '.png', '.gif', '.webp', '.heic'],
+    'document': ['.pdf', '.doc', '.docx', '.xls', '.xlsx', '.txt'],
+    'media': ['.mp3', '.m4a', '.wav', '.mp4', '.mov', '.3gp'],
+}
+ATTACHMENT_FIELDS = ['attachment']
+
+UPLOAD_DIR = getattr(settings, 'FEEDBACK_UPLOAD_DIR', os.path.join(settings.BASE_DIR, 'cache', 'uploads'))
+# Largest single chunk accepted by the resumable upload endpoint.
+UPLOAD_CHUNK_MAX_SIZE = getattr(settings, 'FEEDBACK_UPLOAD_CHUNK_MAX_SIZE', 8 * MB)
+UPLOAD_CHUNK_SIZE = getattr(settings, 'FEEDBACK_UPLOAD_CHUNK_SIZE', 1 * MB)
+UPLOAD_SESSION_TTL = timedelta(seconds=getattr(settings, 'FEEDBACK_UPLOAD_SESSION_TTL', 24 * 60 * 60))
+# Browser-session key listing the anonymous uploads this browser started.
+UPLOAD_SESSION_KEY = 'attachment_uploads'
+UPLOAD_SESSION_MAX_REMEMBERED = 20
+UPLOAD_READ_SIZE = 64 * 1024
+
+
+def attachment_type(file_name):
+    extension = os.path.splitext(file_name or '')[1].lower()
+    for kind, extensions in ATTACHMENT_TYPES.items():
+        if extension in extensions:
+            return kind
+    return 'default'
+
+
+def attachment_size_limit(file_name):
+    return ATTACHMENT_SIZE_LIMITS.get(attachment_type(file_name), ATTACHMENT_SIZE_LIMITS['default'])
+
+
+def size_limit_message(file_name):
+    return f"{os.path.basename(file_name)} is too large; the limit for this type of file is {filesizeformat(attachment_size_limit(file_name))}."
+
+
+class AttachmentSizeLimitHandler(FileUploadHandler):
+    """Counts attachment bytes as they arrive and drops the file once it passes its type's limit.
+
+    Runs in front of the memory and temp-file handlers and hands every chunk on to them, so
+    an oversized file is discarded mid-stream instead of being written out in full first.
+    Rejections are recorded on ``request.upload_errors`` for the form to report.
+    """
+
+    def new_file(self, field_name, file_name, *args, **kwargs):
+        super().new_file(field_name, file_name, *args, **kwargs)
+        self.limit = attachment_size_limit(file_name) if field_name in ATTACHMENT_FIELDS else None
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.limit is not None:
+            self.received += len(raw_data)
+            if self.received > self.limit:
+                if not hasattr(self.request, 'upload_errors'):
+                    self.request.upload_errors = {}
+                self.request.upload_errors[self.field_name] = size_limit_message(self.file_name)
+                logger.warning(f"Skipped oversized upload {self.file_name} ({self.received} bytes so far, limit {self.limit})")
+                raise SkipFile()
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+
+def upload_session_path(upload):
+    return os.path.join(str(UPLOAD_DIR), f"{upload.uuid}.part")
+
+
+def remember_upload(session, upload):
+    """Tie an anonymous upload to the browser session that started it."""
+    uploads = [upload_id for upload_id in session.get(UPLOAD_SESSION_KEY, []) if upload_id != str(upload.uuid)]
+    session[UPLOAD_SESSION_KEY] = (uploads + [str(upload.uuid)])[-UPLOAD_SESSION_MAX_REMEMBERED:]
+
+
+def owns_upload(upload, user, session):
+    """Uploads belong to the user who started them, or to the browser session for anonymous ones."""
+    if upload.created_by_id:
+        return user is not None and user.is_authenticated and user.pk == upload.created_by_id
+    return session is not None and str(upload.uuid) in session.get(UPLOAD_SESSION_KEY, [])
+
+
+def create_upload_session(file_name, size, user=None):
+    upload = UploadSession(file_name=os.path.basename(file_name)[:255], size=size)
+    if user is not None and user.is_authenticated:
+        upload.created_by = user
+    os.makedirs(str(UPLOAD_DIR), exist_ok=True)
+    upload.path = upload_session_path(upload)
+    open(upload.path, 'wb').close()
+    upload.save()
+    return upload
+
+
+def write_upload_chunk(upload, offset, stream, length):
+    """Append ``length`` bytes from ``stream`` at ``offset``; returns the new offset.
+
+    Whatever arrived before a dropped connection is kept, so the client resumes from there.
+    """
+    written = 0
+    try:
+        with open(upload.path, 'r+b') as f:
+            f.seek(offset)
+            f.truncate()
+            while written < length:
+                block = stream.read(min(UPLOAD_READ_SIZE, length - written))
+                if not block:
+                    break
+                f.write(block)
+                written += len(block)
+    except OSError as e:
+        # Includes UnreadablePostError from a client that went away mid-chunk.
+        logger.warning(f"Upload {upload.uuid} interrupted at {offset + written}: {str(e)}")
+    # Conditional on the offset so two racing requests can't both advance the session.
+    updated = UploadSession.objects.filter(pk=upload.pk, received=offset).update(
+        received=offset + written, updated_at=timezone.now()
+    )
+    if updated:
+        upload.received = offset + written
+    else:
+        upload.refresh_from_db()
+    return upload.received
+
+
+class UploadedPartFile(File):
+    # Lets FileSystemStorage move the finished upload into MEDIA_ROOT instead of copying it.
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def attach_upload(feedback, upload):
+    """Move a completed upload session's file onto ``feedback.attachment`` (saved with the feedback)."""
+    with open(upload.path, 'rb') as f:
+        feedback.attachment.save(upload.file_name, UploadedPartFile(f, name=upload.file_name), save=False)
+    upload.delete()
+    if os.path.exists(upload.path):
+        os.remove(upload.path)
+
+
+def delete_upload_session(upload):
+    if os.path.exists(upload.path):
+        os.remove(upload.path)
+    upload.delete()
+
+
+def purge_stale_uploads():
+    stale = UploadSession.objects.filter(updated_at__lt=timezone.now() - UPLOAD_SESSION_TTL)
+    count = 0
+    for upload in stale:
+        delete_upload_session(upload)
+        count += 1
+    if count:
+        logger.info(f"Purged {count} abandoned attachment uploads")
+    return count
@@ -6,14 +6,27 @@ app_name = 'invoices'
 
 urlpatterns = [
     path('create-feedback/', views.FeedbackCreateView.as_view(), name='create_feedback'),
+    path('api/feedbacks/batch/', views.FeedbackIngestView.as_view(), name='ingest_feedbacks'),
+    path('uploads/', views.AttachmentUploadView.as_view(), name='attachment_uploads'),
+    path('uploads/<uuid:upload_uuid>/', views.AttachmentUploadChunkView.as_view(), name='attachment_upload'),
     path('create-feedback/<uuid:user_id>/', views.FeedbackCreateView.as_view(), name='create_feedback_with_user'),
     path('view-feedbacks/', views.FeedbackListView.as_view(), name='view_feedbacks'),
     path('manage-feedbacks/', views.ManageFeedbacksView.as_view(), name='manage_feedbacks'),
+    path('manage-feedbacks/events/', views.feedback_events, name='feedback_events'),
+    path('manage-feedbacks/events/poll/', views.feedback_event_poll, name='feedback_event_poll'),
     path('captcha/refresh/', custom_captcha_refresh, name='captcha-refresh'),
+    path('captcha/pool/<str:key>/', views.pooled_captcha_image, name='captcha_image'),
     path('feedback/<uuid:feedback_uuid>/', views.FeedbackDetailView.as_view(), name='feedback_detail'),
     path('feedback/<uuid:feedback_uuid>/download/', views.download_feedback_pdf, name='download_feedback'),
+    path('feedback/<uuid:feedback_uuid>/pdf-job/', views.FeedbackPdfJobView.as_view(), name='feedback_pdf_job'),
+    path('jobs/<uuid:job_uuid>/', views.JobStatusView.as_view(), name='job_status'),
+    path('exports/<uuid:job_uuid>/', views.ExportJobView.as_view(), name='export_job'),
+    path('jobs/<uuid:job_uuid>/artifact/', views.JobArtifactView.as_view(), name='job_artifact'),
     path('feedback/<uuid:feedback_uuid>/update-status/', views.update_status, name='update_status'),
     path('feedback/<uuid:feedback_uuid>/delete/', views.DeleteFeedbackView.as_view(), name='delete_feedback'),
     path('feedback/<uuid:feedback_uuid>/claim/', views.ClaimFeedbackView.as_view(), name='claim_feedback'),
     path('download-feedbacks/', views.FeedbackDownloadView.as_view(), name='download_feedbacks'),
+    path('import-feedbacks/', views.FeedbackImportView.as_view(), name='import_feedbacks'),
+    path('import-feedbacks/<uuid:import_uuid>/errors/', views.FeedbackImportErrorsView.as_view(), name='feedback_import_errors'),
+    path('feedback-trends/', views.FeedbackTrendsView.as_view(), name='feedback_trends'),
 ]
\ No newline at end of file
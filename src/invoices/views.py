@@ -1,62 +1,84 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views import View
-from django.http import HttpResponse, JsonResponse
-from users.views import get_system_logo
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from users.cache import get_system_logo, get_contact
 from django.views.generic import ListView, DetailView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.decorators import login_required
 from django.utils.decorators import method_decorator
-from django.template.loader import render_to_string
-from django.db.models import Q
 from django.contrib import messages
-from .models import Feedback
+from .captchas import pooled_image_url, pop_captcha
+from .events import FEEDBACK_EVENTS_POLL_INTERVAL, feedback_event_stream, feedback_event_updates, get_broker, live_updates_mode
+from .exports import (
+    EXPORT_ASYNC_THRESHOLD, EXPORT_FORMATS, XLSX_CONTENT_TYPE, export_artifact_name, export_artifact_path,
+    export_filters, filtered_feedbacks, gzip_chunks, spooled_xlsx, submit_export_job,
+)
+from .ingest import INGEST_MAX_RECORDS, ingest_feedback_records
+from .imports import IMPORT_BATCH_SIZE, IMPORT_EXTENSIONS, import_error_csv, resumable_import, save_upload
+from .jobs import JobQueueFull, enqueue_job, worker_available
+from .models import BackgroundJob, CaptchaPoolEntry, Feedback, FeedbackImport, UploadSession
 from .forms import FeedbackForm
-from users.models import UserType, User, Contact
+from .pagination import CursorPaginationMixin
+from .pdf import feedback_pdf_key, pdf_cache, pdf_creator, pdf_office_name, render_feedback_pdf, submit_pdf_job
+from .rollups import feedback_trends, TREND_GROUPS, TREND_INTERVALS
+from .search import search_feedbacks, SEARCH_ORDERING
+from .statistics import reviewed_feedback_count
+from .serials import next_serial_number
+from .uploads import (
+    UPLOAD_CHUNK_MAX_SIZE, UPLOAD_CHUNK_SIZE, attach_upload, attachment_size_limit, create_upload_session,
+    delete_upload_session, owns_upload, remember_upload, size_limit_message, write_upload_chunk,
+)
+from .visibility import visible_feedbacks
+from users.models import UserType, User
+from users.utils import basic_auth_user
 from django.conf import settings
+from django.core.exceptions import PermissionDenied
 from django.views.decorators.http import require_POST
 from django.urls import reverse, reverse_lazy
 from django.views.decorators.csrf import csrf_exempt
-from captcha.views import captcha_refresh
-from captcha.models import CaptchaStore
-from captcha.helpers import captcha_image_url
-import os
+from django.middleware.csrf import CsrfViewMiddleware
+from captcha.views import captcha_image
+import json
 import logging
-import base64
-from django.core.files.storage import default_storage
-from io import BytesIO
-from weasyprint import HTML, CSS
+import os
+from collections import Counter
 from django.contrib.auth.mixins import UserPassesTestMixin
-from datetime import datetime
-import random
+from datetime import date
+from django.utils import timezone
+from django.utils.http import parse_etags
 import uuid
-import openpyxl
 
 logger = logging.getLogger(__name__)
 
+PDF_RENDER_ASYNC = getattr(settings, 'FEEDBACK_PDF_RENDER_ASYNC', True)
+# Seconds a client should wait before asking about an unfinished job again.
+JOB_POLL_INTERVAL = 2
+
 @csrf_exempt
 def custom_captcha_refresh(request):
+    if not request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        logger.error("Non-AJAX request to captcha refresh")
+        return JsonResponse({'error': 'AJAX request required'}, status=400)
     try:
-        if not request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-            logger.error("Non-AJAX request to captcha refresh")
-            return JsonResponse({'error': 'AJAX request required'}, status=400)
-        if CaptchaStore.objects.count() == 0:
-            logger.warning("No CAPTCHA entries found, generating new one")
-            key = CaptchaStore.generate_key()
-            logger.debug(f"Generated new CAPTCHA key: {key}")
-        response = captcha_refresh(request)
-        logger.debug(f"CAPTCHA refresh response: {response}")
-        return response
+        key = pop_captcha()
     except Exception as e:
         logger.error(f"Error in custom_captcha_refresh: {str(e)}", exc_info=True)
         return JsonResponse({'error': 'Failed to refresh CAPTCHA'}, status=500)
+    return JsonResponse({'key': key, 'image_url': pooled_image_url(key), 'audio_url': None})
+
+def pooled_captcha_image(request, key):
+    image = CaptchaPoolEntry.objects.filter(hashkey=key).values_list('image', flat=True).first()
+    if image is None:
+        # Generated inline while the pool was empty; render it the library's way.
+        return captcha_image(request, key)
+    response = HttpResponse(bytes(image), content_type='image/png')
+    response['Cache-Control'] = 'no-store'
+    return response
 
 def custom_404(request, exception):
     logger.debug(f"Rendering 404.html for request: {request.path}, exception: {str(exception)}")
     return render(request, '404.html', status=404)
 
-def get_feedback_serial_number():
-    return ''.join(random.choices(datetime.now().strftime("%Y%m%d") + str(random.randint(1000, 9999)), k=10))
-
 class FeedbackCreateView(View):
     def get(self, request, user_id=None, *args, **kwargs):
         logger.debug(f"FeedbackCreateView.get: path={request.path}, user_id={user_id}, is_authenticated={request.user.is_authenticated}, user_uuid={request.user.uuid if request.user.is_authenticated else None}")
@@ -80,11 +102,7 @@ class FeedbackCreateView(View):
                 creator = User.objects.get(uuid=user_id)
                 creator_profile_picture = creator.profile_picture.url if hasattr(creator, 'profile_picture') and creator.profile_picture else None
                 creator_name = creator.full_name or creator.email
-                feedback_queryset = Feedback.objects.filter(
-                    Q(created_by=creator) |
-                    Q(uuid__in=creator.feedbacks.values_list('uuid', flat=True))
-                ).distinct()
-                reviewed_feedbacks = feedback_queryset.filter(status__in=['solved', 'closed']).count()
+                reviewed_feedbacks = reviewed_feedback_count(creator)
             except User.DoesNotExist:
                 logger.error(f"User with uuid={user_id} not found")
                 messages.error(request, "Invalid user ID in the shared link.", extra_tags='create_feedback')
@@ -99,13 +117,18 @@ class FeedbackCreateView(View):
             'creator': creator,
             'success_message': None,
             'reviewed_feedbacks': reviewed_feedbacks,
-            'contact': Contact.objects.first(),
+            'contact': get_contact(),
         }
         logger.debug(f"Rendering create_invoice.html with context: {context}")
         return render(request, 'invoices/create_invoice.html', context)
 
     def post(self, request, user_id=None, *args, **kwargs):
-        form = FeedbackForm(request.POST, request.FILES, user=request.user if request.user.is_authenticated else None)
+        form = FeedbackForm(
+            request.POST, request.FILES,
+            user=request.user if request.user.is_authenticated else None,
+            upload_errors=getattr(request, 'upload_errors', None),
+            session=request.session,
+        )
         creator = None
         creator_profile_picture = None
         creator_name = None
@@ -116,11 +139,7 @@ class FeedbackCreateView(View):
                 creator = User.objects.get(uuid=user_id)
                 creator_profile_picture = creator.profile_picture.url if hasattr(creator, 'profile_picture') and creator.profile_picture else None
                 creator_name = creator.full_name or creator.email
-                feedback_queryset = Feedback.objects.filter(
-                    Q(created_by=creator) |
-                    Q(uuid__in=creator.feedbacks.values_list('uuid', flat=True))
-                ).distinct()
-                reviewed_feedbacks = feedback_queryset.filter(status__in=['solved', 'closed']).count()
+                reviewed_feedbacks = reviewed_feedback_count(creator)
             except User.DoesNotExist:
                 logger.error(f"User with uuid={user_id} not found")
                 messages.error(request, "Invalid user ID in the shared link.", extra_tags='create_feedback')
@@ -128,11 +147,14 @@ class FeedbackCreateView(View):
 
         if form.is_valid():
             feedback = form.save(commit=False)
-            feedback.serial_number = get_feedback_serial_number()
+            feedback.serial_number = next_serial_number()
             if creator:
                 feedback.created_by = creator
             if request.user.is_authenticated and not user_id:
                 feedback.created_by = request.user
+            upload = form.cleaned_data.get('upload_id')
+            if upload and not feedback.attachment:
+                attach_upload(feedback, upload)
             feedback.save()
 
             messages.success(request, "तपाईको अमुल्य सुझावको लागि धन्यबाद । सुझावको बिवरण जाँच गरी आवस्यक प्रकृयामा जानेछौ ।", extra_tags='create_feedback success')
@@ -151,11 +173,11 @@ class FeedbackCreateView(View):
             'creator': creator,
             'success_message': messages.get_messages(request),
             'reviewed_feedbacks': reviewed_feedbacks,
-            'contact': Contact.objects.first(),
+            'contact': get_contact(),
         }
         return render(request, 'invoices/create_invoice.html', context)
 
-class FeedbackListView(LoginRequiredMixin, ListView):
+class FeedbackListView(LoginRequiredMixin, CursorPaginationMixin, ListView):
     model = Feedback
     context_object_name = 'feedbacks'
     paginate_by = 5
@@ -171,22 +193,10 @@ class FeedbackListView(LoginRequiredMixin, ListView):
         if self.request.user.user_type == UserType.ADMIN:
             queryset = Feedback.objects.all()
         else:
-            queryset = Feedback.objects.filter(
-                Q(email=self.request.user.email) |
-                Q(mobile=self.request.user.mobile) |
-                Q(created_by=self.request.user) |
-                Q(uuid__in=self.request.user.feedbacks.values_list('uuid', flat=True))
-            ).distinct()
+            queryset = visible_feedbacks(self.request.user)
 
         if search:
-            queryset = queryset.filter(
-                Q(name__icontains=search) |
-                Q(email__icontains=search) |
-                Q(mobile__icontains=search) |
-                Q(address__icontains=search) |
-                Q(feedback_text__icontains=search) |
-                Q(serial_number__icontains=search)
-            ).distinct()
+            queryset = search_feedbacks(queryset, search)
 
         if start_date:
             queryset = queryset.filter(created_at__gte=start_date)
@@ -195,7 +205,11 @@ class FeedbackListView(LoginRequiredMixin, ListView):
         if status:
             queryset = queryset.filter(status=status)
 
-        return queryset.order_by('-created_at')
+        return queryset.order_by(*SEARCH_ORDERING) if search else queryset.order_by('-created_at')
+
+    def use_cursor_pagination(self):
+        # Ranked search results keep numbered pages; a created_at cursor would discard the relevance order.
+        return not self.request.GET.get('search')
 
     def get_template_names(self):
         if self.request.user.user_type == UserType.ADMIN:
@@ -210,10 +224,10 @@ class FeedbackListView(LoginRequiredMixin, ListView):
         context['start_date'] = self.request.GET.get('start_date', '')
         context['end_date'] = self.request.GET.get('end_date', '')
         context['status'] = self.request.GET.get('status', '')
-        context['contact'] = Contact.objects.first()
+        context['contact'] = get_contact()
         return context
 
-class ManageFeedbacksView(LoginRequiredMixin, ListView):
+class ManageFeedbacksView(LoginRequiredMixin, CursorPaginationMixin, ListView):
     model = Feedback
     template_name = 'invoices/manage_feedbacks.html'
     context_object_name = 'feedbacks'
@@ -229,22 +243,10 @@ class ManageFeedbacksView(LoginRequiredMixin, ListView):
         if self.request.user.user_type == UserType.ADMIN:
             queryset = Feedback.objects.all()
         else:
-            queryset = Feedback.objects.filter(
-                Q(email=self.request.user.email) |
-                Q(mobile=self.request.user.mobile) |
-                Q(created_by=self.request.user) |
-                Q(uuid__in=self.request.user.feedbacks.values_list('uuid', flat=True))
-            ).distinct()
+            queryset = visible_feedbacks(self.request.user)
 
         if search:
-            queryset = queryset.filter(
-                Q(name__icontains=search) |
-                Q(email__icontains=search) |
-                Q(mobile__icontains=search) |
-                Q(address__icontains=search) |
-                Q(feedback_text__icontains=search) |
-                Q(serial_number__icontains=search)
-            ).distinct()
+            queryset = search_feedbacks(queryset, search)
 
         if start_date:
             queryset = queryset.filter(created_at__gte=start_date)
@@ -253,7 +255,10 @@ class ManageFeedbacksView(LoginRequiredMixin, ListView):
         if status:
             queryset = queryset.filter(status=status)
 
-        return queryset.order_by('-created_at')
+        return queryset.order_by(*SEARCH_ORDERING) if search else queryset.order_by('-created_at')
+
+    def use_cursor_pagination(self):
+        return not self.request.GET.get('search')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -263,77 +268,63 @@ class ManageFeedbacksView(LoginRequiredMixin, ListView):
         context['start_date'] = self.request.GET.get('start_date', '')
         context['end_date'] = self.request.GET.get('end_date', '')
         context['status'] = self.request.GET.get('status', '')
-        context['contact'] = Contact.objects.first()
+        context['contact'] = get_contact()
+        if self.request.user.user_type == UserType.ADMIN:
+            context['live_updates'] = live_updates_mode(self.request)
+            if context['live_updates'] == 'poll':
+                context['events_cursor'] = get_broker().events_since()[0]
+                context['events_poll_interval'] = FEEDBACK_EVENTS_POLL_INTERVAL * 1000
         return context
 
 class FeedbackDownloadView(LoginRequiredMixin, View):
     def get(self, request, *args, **kwargs):
+        export_format = request.GET.get('format', 'xlsx')
+        if export_format != 'xlsx' and export_format not in EXPORT_FORMATS:
+            return HttpResponse('Unsupported export format', status=400)
+
         feedbacks = self.get_queryset()
-        if not feedbacks:
+        if not feedbacks.exists():
             messages.error(request, "No feedbacks found for the given criteria.")
             return redirect('invoices:view_feedbacks')
 
-        response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-        response['Content-Disposition'] = 'attachment; filename="feedbacks.xlsx"'
-
-        workbook = openpyxl.Workbook()
-        worksheet = workbook.active
-        worksheet.title = 'Feedbacks'
-
-        headers = ['Serial Number', 'Name', 'Email', 'Mobile', 'Address', 'Rating', 'Feedback Text', 'Status', 'Created At']
-        worksheet.append(headers)
-
-        for feedback in feedbacks:
-            name = "Anonymous" if feedback.anonymous else feedback.name or "N/A"
-            worksheet.append([
-                feedback.serial_number,
-                name,
-                feedback.email or "N/A",
-                feedback.mobile or "N/A",
-                feedback.address or "N/A",
-                feedback.get_rating_display(),
-                feedback.feedback_text,
-                feedback.get_status_display(),
-                feedback.created_at.strftime('%Y-%m-%d %H:%M:%S')
-            ])
-
-        workbook.save(response)
-        return response
-
-    def get_queryset(self):
-        search = self.request.GET.get('search', '')
-        start_date = self.request.GET.get('start_date', '')
-        end_date = self.request.GET.get('end_date', '')
-        status = self.request.GET.get('status', '')
-
-        if self.request.user.user_type == UserType.ADMIN:
-            queryset = Feedback.objects.all()
-        else:
-            queryset = Feedback.objects.filter(
-                Q(email=self.request.user.email) |
-                Q(mobile=self.request.user.mobile) |
-                Q(created_by=self.request.user) |
-                Q(uuid__in=self.request.user.feedbacks.values_list('uuid', flat=True))
-            ).distinct()
-
-        if search:
-            queryset = queryset.filter(
-                Q(name__icontains=search) |
-                Q(email__icontains=search) |
-                Q(mobile__icontains=search) |
-                Q(address__icontains=search) |
-                Q(feedback_text__icontains=search) |
-                Q(serial_number__icontains=search)
-            ).distinct()
+        if self.use_export_job(export_format, feedbacks):
+            try:
+                job = submit_export_job(request.user, export_format, export_filters(request.GET), request.GET.get('gzip') == '1')
+            except JobQueueFull:
+                messages.error(request, "Too many exports are running, please try again in a few minutes.")
+                return redirect('invoices:view_feedbacks')
+            return redirect('invoices:export_job', job_uuid=job.uuid)
+
+        if export_format in EXPORT_FORMATS:
+            chunks, content_type, filename = EXPORT_FORMATS[export_format]
+            stream = chunks(feedbacks)
+            if request.GET.get('gzip') == '1':
+                stream = gzip_chunks(stream)
+                content_type, filename = 'application/gzip', f'{filename}.gz'
+            response = StreamingHttpResponse(stream, content_type=content_type)
+            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+            return response
+
+        return FileResponse(
+            spooled_xlsx(feedbacks),
+            as_attachment=True,
+            filename='feedbacks.xlsx',
+            content_type=XLSX_CONTENT_TYPE,
+        )
 
-        if start_date:
-            queryset = queryset.filter(created_at__gte=start_date)
-        if end_date:
-            queryset = queryset.filter(created_at__lte=end_date)
-        if status:
-            queryset = queryset.filter(status=status)
+    def use_export_job(self, export_format, feedbacks):
+        # async=0 always streams; async=1 queues (scripts rely on that) whenever a worker is alive to
+        # run the job. Otherwise only big XLSX exports, which hold the request longest, go to the worker.
+        requested = self.request.GET.get('async')
+        if requested == '0' or not worker_available():
+            return False
+        if requested == '1':
+            return True
+        # Only needs to know whether the threshold is passed, not the full count.
+        return export_format == 'xlsx' and feedbacks.order_by()[EXPORT_ASYNC_THRESHOLD:EXPORT_ASYNC_THRESHOLD + 1].exists()
 
-        return queryset.order_by('-created_at')
+    def get_queryset(self):
+        return filtered_feedbacks(self.request.user, **export_filters(self.request.GET))
 
 class FeedbackDetailView(DetailView):
     model = Feedback
@@ -346,12 +337,7 @@ class FeedbackDetailView(DetailView):
             if self.request.user.user_type == UserType.ADMIN:
                 return Feedback.objects.all()
             else:
-                return Feedback.objects.filter(
-                    Q(email=self.request.user.email) |
-                    Q(mobile=self.request.user.mobile) |
-                    Q(created_by=self.request.user) |
-                    Q(uuid__in=self.request.user.feedbacks.values_list('uuid', flat=True))
-                ).distinct()
+                return visible_feedbacks(self.request.user)
         else:
             return Feedback.objects.filter(uuid=self.kwargs['feedback_uuid'])
 
@@ -368,77 +354,282 @@ class FeedbackDetailView(DetailView):
         context['pdf_url'] = self.request.build_absolute_uri(
             reverse_lazy('invoices:download_feedback', kwargs={'feedback_uuid': feedback.uuid})
         )
-        context['contact'] = Contact.objects.first()
+        context['contact'] = get_contact()
         return context
 
+def _pdf_response(pdf_file, feedback, etag):
+    response = FileResponse(pdf_file, content_type='application/pdf', filename=f"feedback_{feedback.serial_number}.pdf")
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
 def download_feedback_pdf(request, feedback_uuid):
     try:
-        feedback = get_object_or_404(Feedback, uuid=feedback_uuid)
-        generated_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        logo = get_system_logo()
-        logo_base64 = None
-        profile_picture_base64 = None
-        creator = None
+        feedback = get_object_or_404(Feedback.objects.select_related('created_by'), uuid=feedback_uuid)
+        creator = pdf_creator(feedback, request.user)
+        office_name = pdf_office_name(request.user)
+
+        # The key covers every input of the rendered PDF, so it doubles as a strong ETag
+        key = feedback_pdf_key(feedback, creator, office_name)
+        etag = f'"{key}"'
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            return response
+
+        pdf_file = pdf_cache.open(key)
+        if pdf_file is None:
+            if PDF_RENDER_ASYNC and worker_available():
+                # Keep WeasyPrint off the request worker; the page polls the job and fetches the artifact.
+                try:
+                    job = submit_pdf_job(feedback, request.user)
+                except JobQueueFull:
+                    response = HttpResponse('PDF rendering is busy, please try again shortly.', status=503)
+                    response['Retry-After'] = '30'
+                    return response
+                return render(request, 'invoices/feedback_pdf_job.html', {'job': job, 'feedback': feedback}, status=202)
+            path = pdf_cache.put(key, render_feedback_pdf(feedback, creator, office_name))
+            pdf_file = open(path, 'rb')
+
+        return _pdf_response(pdf_file, feedback, etag)
+    except Exception as e:
+        logger.error(f"Exception in download_feedback_pdf: {str(e)}")
+        return HttpResponse(f'Exception occurred: {str(e)}')
+
+def job_payload(job):
+    payload = {
+        'job': str(job.uuid),
+        'kind': job.kind,
+        'status': job.status,
+        'error': job.error,
+        'progress': job.progress,
+        'total': job.total,
+        'created_at': job.created_at.isoformat(),
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        'status_url': reverse('invoices:job_status', kwargs={'job_uuid': job.uuid}),
+    }
+    if job.status == BackgroundJob.DONE:
+        payload['artifact_url'] = reverse('invoices:job_artifact', kwargs={'job_uuid': job.uuid})
+    return payload
+
+class FeedbackPdfJobView(View):
+    def post(self, request, feedback_uuid):
+        feedback = get_object_or_404(Feedback.objects.select_related('created_by'), uuid=feedback_uuid)
+        try:
+            job = submit_pdf_job(feedback, request.user)
+        except JobQueueFull:
+            response = JsonResponse({'error': 'PDF queue is full'}, status=503)
+            response['Retry-After'] = '30'
+            return response
+        return JsonResponse(job_payload(job), status=202)
+
+class JobAccessMixin:
+    def get_job(self, request, job_uuid):
+        job = get_object_or_404(BackgroundJob, uuid=job_uuid)
+        if job.requested_by_id and not (
+            request.user.is_authenticated
+            and (request.user.pk == job.requested_by_id or request.user.user_type == UserType.ADMIN)
+        ):
+            raise Http404
+        return job
+
+class JobStatusView(JobAccessMixin, View):
+    def get(self, request, job_uuid):
+        job = self.get_job(request, job_uuid)
+        # Answered straight away: waiting here for the job would hold a WSGI worker thread per client.
+        response = JsonResponse(job_payload(job))
+        if job.status in BackgroundJob.ACTIVE_STATUSES:
+            response['Retry-After'] = str(JOB_POLL_INTERVAL)
+        return response
 
-        # Fetch creator if user_id exists or use authenticated user
-        if feedback.created_by:
-            creator = feedback.created_by
-        elif request.user.is_authenticated:
-            creator = request.user
+class JobArtifactView(JobAccessMixin, View):
+    def get(self, request, job_uuid):
+        job = self.get_job(request, job_uuid)
+        if job.status != BackgroundJob.DONE:
+            return JsonResponse({'error': f'Job is {job.status}'}, status=409)
 
-        # Handle profile picture as base64
-        if creator and hasattr(creator, 'profile_picture') and creator.profile_picture:
+        if job.kind == 'feedback_export':
             try:
-                with default_storage.open(creator.profile_picture.name, 'rb') as f:
-                    profile_picture_data = f.read()
-                    profile_picture_base64 = base64.b64encode(profile_picture_data).decode('utf-8')
-            except Exception as e:
-                logger.error(f"Error encoding profile picture to base64: {str(e)}")
-
-        # Fallback to system logo if profile picture is not available
-        if not profile_picture_base64:
-            if logo and hasattr(logo, 'logo') and logo.logo:
-                try:
-                    with default_storage.open(logo.logo.name, 'rb') as f:
-                        logo_data = f.read()
-                        logo_base64 = base64.b64encode(logo_data).decode('utf-8')
-                except Exception as e:
-                    logger.error(f"Error encoding logo to base64: {str(e)}")
-            else:
-                try:
-                    with open(os.path.join(settings.STATIC_ROOT, 'images/logo.jpeg'), 'rb') as f:
-                        logo_data = f.read()
-                        logo_base64 = base64.b64encode(logo_data).decode('utf-8')
-                except FileNotFoundError:
-                    logger.error("Static logo file (images/logo.jpeg) not found")
-
-        html_string = render_to_string('invoices/feedback_pdf.html', {
-            'feedback': feedback,
-            'logo_base64': logo_base64,
-            'profile_picture_base64': profile_picture_base64,
-            'generated_date': generated_date,
-            'office_name': request.user.full_name if request.user.is_authenticated else "Your Office",
-            'contact': Contact.objects.first(),
-            'creator': creator,
+                artifact = open(export_artifact_path(job), 'rb')
+            except FileNotFoundError:
+                return JsonResponse({'error': 'Artifact has expired'}, status=410)
+            return FileResponse(artifact, as_attachment=True, filename=export_artifact_name(job))
+
+        pdf_file = pdf_cache.open(job.result_key)
+        if pdf_file is None:
+            return JsonResponse({'error': 'Artifact has expired'}, status=410)
+        feedback = get_object_or_404(Feedback, uuid=job.params['feedback'])
+        return _pdf_response(pdf_file, feedback, f'"{job.result_key}"')
+
+class ExportJobView(LoginRequiredMixin, JobAccessMixin, View):
+    def get(self, request, job_uuid):
+        job = self.get_job(request, job_uuid)
+        recent_exports = BackgroundJob.objects.filter(
+            kind='feedback_export',
+            requested_by=request.user,
+            status=BackgroundJob.DONE,
+            expires_at__gt=timezone.now(),
+        ).order_by('-finished_at')[:10]
+        return render(request, 'invoices/export_job.html', {
+            'job': job,
+            'recent_exports': recent_exports,
+            'base_template': 'admin_dashboard.html' if request.user.user_type == UserType.ADMIN else 'user_dashboard.html',
         })
 
-        pdf_buffer = BytesIO()
-        HTML(string=html_string).write_pdf(
-            target=pdf_buffer,
-            stylesheets=[CSS(string='''
-                body { font-family: Arial, sans-serif; }
-            ''')]
-        )
-        pdf_buffer.seek(0)
-        pdf_data = pdf_buffer.getvalue()
-        pdf_buffer.close()
+@method_decorator(csrf_exempt, name='dispatch')
+class FeedbackIngestView(View):
+    """JSON batch submission for kiosks: HTTP Basic credentials, or a session with the usual CSRF token."""
+
+    def post(self, request):
+        user = basic_auth_user(request)
+        if user is None:
+            if not request.user.is_authenticated:
+                response = JsonResponse({'error': 'Authentication required'}, status=401)
+                response['WWW-Authenticate'] = 'Basic realm="feedback-ingest"'
+                return response
+            # Only Basic-authenticated requests may skip CSRF; session requests are checked as usual.
+            if CsrfViewMiddleware(lambda req: None).process_view(request, None, (), {}) is not None:
+                return JsonResponse({'error': 'CSRF verification failed'}, status=403)
+            user = request.user
+
+        try:
+            records = json.loads(request.body).get('records')
+        except (ValueError, AttributeError):
+            return JsonResponse({'error': 'Invalid JSON body'}, status=400)
+        if not isinstance(records, list) or not all(isinstance(record, dict) for record in records):
+            return JsonResponse({'error': 'records must be a list of objects'}, status=400)
+        if len(records) > INGEST_MAX_RECORDS:
+            return JsonResponse({'error': f'At most {INGEST_MAX_RECORDS} records per batch'}, status=400)
+
+        results = ingest_feedback_records(user, records)
+        counts = Counter(result['status'] for result in results)
+        return JsonResponse({
+            'created': counts['created'],
+            'duplicates': counts['duplicate'],
+            'invalid': counts['invalid'],
+            'results': results,
+        })
+
+def upload_payload(upload):
+    return {
+        'upload_id': str(upload.uuid),
+        'file_name': upload.file_name,
+        'size': upload.size,
+        'offset': upload.received,
+        'complete': upload.complete,
+        'chunk_size': UPLOAD_CHUNK_SIZE,
+        'url': reverse('invoices:attachment_upload', kwargs={'upload_uuid': upload.uuid}),
+    }
+
+def upload_response(upload, status=200):
+    response = JsonResponse(upload_payload(upload), status=status)
+    response['Upload-Offset'] = str(upload.received)
+    return response
+
+class AttachmentUploadView(View):
+    """Starts a resumable attachment upload: JSON ``{"file_name", "size"}`` in, upload session out."""
+
+    def post(self, request):
+        try:
+            data = json.loads(request.body)
+            file_name = str(data['file_name']).strip()
+            size = int(data['size'])
+        except (ValueError, KeyError, TypeError):
+            return JsonResponse({'error': 'file_name and size are required'}, status=400)
+        if not file_name or size <= 0:
+            return JsonResponse({'error': 'file_name and size are required'}, status=400)
+        if size > attachment_size_limit(file_name):
+            return JsonResponse({'error': size_limit_message(file_name)}, status=413)
+
+        upload = create_upload_session(file_name, size, request.user)
+        if not upload.created_by_id:
+            remember_upload(request.session, upload)
+        return upload_response(upload, status=201)
+
+class AttachmentUploadChunkView(View):
+    """Resumable upload session: GET/HEAD report the offset, PATCH appends a chunk written at ``Upload-Offset``."""
+
+    def get_upload(self, request, upload_uuid):
+        upload = get_object_or_404(UploadSession, uuid=upload_uuid)
+        if not owns_upload(upload, request.user, request.session):
+            # Same answer as an unknown id, so other people's uploads can't be probed.
+            raise Http404("Upload not found")
+        return upload
+
+    def get(self, request, upload_uuid):
+        return upload_response(self.get_upload(request, upload_uuid))
+
+    def patch(self, request, upload_uuid):
+        upload = self.get_upload(request, upload_uuid)
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except (KeyError, ValueError):
+            return JsonResponse({'error': 'Upload-Offset and Content-Length headers are required'}, status=400)
+        if offset != upload.received:
+            # The client is out of step (e.g. a retried chunk that did arrive); tell it where to resume.
+            return upload_response(upload, status=409)
+        if length > UPLOAD_CHUNK_MAX_SIZE:
+            return JsonResponse({'error': f'Chunks may be at most {UPLOAD_CHUNK_MAX_SIZE} bytes'}, status=413)
+        if offset + length > upload.size:
+            return JsonResponse({'error': 'Chunk runs past the declared file size'}, status=400)
+
+        write_upload_chunk(upload, offset, request, length)
+        return upload_response(upload)
+
+    def delete(self, request, upload_uuid):
+        delete_upload_session(self.get_upload(request, upload_uuid))
+        return HttpResponse(status=204)
+
+class FeedbackImportView(LoginRequiredMixin, UserPassesTestMixin, View):
+    template_name = 'invoices/feedback_import.html'
+
+    def test_func(self):
+        return self.request.user.user_type == UserType.ADMIN
+
+    def get(self, request):
+        imports = FeedbackImport.objects.select_related('created_by')[:20]
+        has_active = any(feedback_import.status in [FeedbackImport.QUEUED, FeedbackImport.RUNNING] for feedback_import in imports)
+        return render(request, self.template_name, {'imports': imports, 'has_active': has_active})
+
+    def post(self, request):
+        uploaded_file = request.FILES.get('file')
+        if not uploaded_file or os.path.splitext(uploaded_file.name)[1].lower() not in IMPORT_EXTENSIONS:
+            messages.error(request, "Please choose an .xlsx or .csv file.")
+            return redirect('invoices:import_feedbacks')
+
+        path, sha256 = save_upload(uploaded_file)
+        feedback_import = resumable_import(sha256)
+        if feedback_import:
+            # Same file as an interrupted import: continue it instead of importing the rows twice.
+            os.remove(path)
+            FeedbackImport.objects.filter(pk=feedback_import.pk).update(status=FeedbackImport.QUEUED)
+        else:
+            feedback_import = FeedbackImport.objects.create(
+                file_name=uploaded_file.name,
+                path=path,
+                sha256=sha256,
+                batch_size=IMPORT_BATCH_SIZE,
+                created_by=request.user,
+            )
 
-        response = HttpResponse(pdf_data, content_type='application/pdf')
-        response['Content-Disposition'] = f'inline; filename="feedback_{feedback.serial_number}.pdf"'
+        try:
+            enqueue_job('feedback_import', {'import': str(feedback_import.uuid)}, result_key=str(feedback_import.uuid), user=request.user)
+        except JobQueueFull:
+            messages.error(request, "Too many imports are queued, please try again later.")
+            return redirect('invoices:import_feedbacks')
+        messages.success(request, f"{uploaded_file.name} has been queued for import.")
+        return redirect('invoices:import_feedbacks')
+
+class FeedbackImportErrorsView(LoginRequiredMixin, UserPassesTestMixin, View):
+    def test_func(self):
+        return self.request.user.user_type == UserType.ADMIN
+
+    def get(self, request, import_uuid):
+        feedback_import = get_object_or_404(FeedbackImport, uuid=import_uuid)
+        response = StreamingHttpResponse(import_error_csv(feedback_import), content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="import_errors_{feedback_import.uuid}.csv"'
         return response
-    except Exception as e:
-        logger.error(f"Exception in download_feedback_pdf: {str(e)}")
-        return HttpResponse(f'Exception occurred: {str(e)}')
 
 @login_required
 @require_POST
@@ -446,26 +637,71 @@ def update_status(request, feedback_uuid):
     if request.user.user_type == UserType.ADMIN:
         feedback = get_object_or_404(Feedback, uuid=feedback_uuid)
     else:
-        feedback = get_object_or_404(
-            Feedback.objects.filter(
-                Q(uuid=feedback_uuid) & (
-                    Q(email=request.user.email) |
-                    Q(mobile=request.user.mobile) |
-                    Q(created_by=request.user) |
-                    Q(uuid__in=request.user.feedbacks.values_list('uuid', flat=True))
-                )
-            )
-        )
+        feedback = get_object_or_404(visible_feedbacks(request.user), uuid=feedback_uuid)
 
     new_status = request.POST.get('status')
     if new_status in ['pending', 'solved', 'closed']:
         feedback.status = new_status
-        feedback.save()
+        feedback.save(update_fields=['status', 'updated_at'])
         messages.success(request, f"Feedback status updated to {new_status.title()}.")
     else:
         messages.error(request, "Invalid status.")
     return redirect('invoices:view_feedbacks')
 
+async def feedback_events(request):
+    """Server-sent events for the manage-feedbacks page; only served through asgi.py."""
+    user = await request.auser()
+    if not user.is_authenticated or user.user_type != UserType.ADMIN:
+        raise PermissionDenied
+    if live_updates_mode(request) != 'stream':
+        # Under WSGI the whole stream would be consumed before sending anything, holding a worker
+        # thread. 204 tells EventSource not to reconnect; the page polls feedback_event_poll instead.
+        return HttpResponse(status=204)
+    response = StreamingHttpResponse(feedback_event_stream(request), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream.
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+@login_required
+def feedback_event_poll(request):
+    """Events since ``?after=<cursor>`` for pages that can't hold a stream open."""
+    if request.user.user_type != UserType.ADMIN:
+        raise PermissionDenied
+    try:
+        after = int(request.GET['after'])
+    except (KeyError, ValueError):
+        after = None
+    response = JsonResponse(feedback_event_updates(request, after))
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+class FeedbackTrendsView(LoginRequiredMixin, UserPassesTestMixin, View):
+    def test_func(self):
+        return self.request.user.user_type == UserType.ADMIN
+
+    def get(self, request):
+        interval = request.GET.get('interval', 'month')
+        group = request.GET.get('group', 'status')
+        if interval not in TREND_INTERVALS or group not in TREND_GROUPS:
+            return JsonResponse({'error': 'Invalid interval or group'}, status=400)
+
+        try:
+            end = date.fromisoformat(request.GET['end']) if request.GET.get('end') else timezone.localdate()
+            if request.GET.get('start'):
+                start = date.fromisoformat(request.GET['start'])
+            else:
+                # Default to the last 12 calendar months, including the current one
+                months = end.year * 12 + end.month - 12
+                start = date(months // 12, months % 12 + 1, 1)
+            created_by = uuid.UUID(request.GET['created_by']) if request.GET.get('created_by') else None
+        except ValueError:
+            return JsonResponse({'error': 'Invalid date or user'}, status=400)
+
+        if start > end or (end - start).days > 366 * 5:
+            return JsonResponse({'error': 'Invalid date range'}, status=400)
+        return JsonResponse(feedback_trends(start, end, group=group, interval=interval, created_by=created_by))
+
 class DeleteFeedbackView(LoginRequiredMixin, UserPassesTestMixin, View):
     def test_func(self):
         return self.request.user.user_type == UserType.ADMIN
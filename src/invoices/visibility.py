@@ -0,0 +1,115 @@
+import logging
+from collections import Counter, defaultdict
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q
+from .models import Feedback, FeedbackVisibility
+from .statistics import apply_statistic_deltas
+
+logger = logging.getLogger(__name__)
+
+
+def visible_feedbacks(user):
+    # One indexed join through FeedbackVisibility; rows are unique per (user, feedback), so no DISTINCT.
+    return Feedback.objects.filter(visibilities__user=user)
+
+
+def _feedback_match(user):
+    match = Q(created_by=user) | Q(email=user.email)
+    if user.mobile:
+        match |= Q(mobile=user.mobile)
+    return match
+
+
+def _user_match(feedback):
+    match = Q(pk__in=[])
+    if feedback.created_by_id:
+        match |= Q(pk=feedback.created_by_id)
+    if feedback.email:
+        match |= Q(email=feedback.email)
+    if feedback.mobile:
+        match |= Q(mobile=feedback.mobile)
+    return match
+
+
+@transaction.atomic
+def sync_feedback_visibility(feedback):
+    User = get_user_model()
+    wanted = set(User.objects.filter(_user_match(feedback)).values_list('pk', flat=True))
+    existing = set(FeedbackVisibility.objects.filter(feedback=feedback).values_list('user_id', flat=True))
+    stale = existing - wanted
+    missing = wanted - existing
+    if stale:
+        FeedbackVisibility.objects.filter(feedback=feedback, user_id__in=stale).delete()
+    if missing:
+        FeedbackVisibility.objects.bulk_create(
+            [FeedbackVisibility(user_id=user_id, feedback=feedback) for user_id in missing],
+            ignore_conflicts=True,
+        )
+
+    deltas = Counter()
+    for user_id in stale:
+        deltas[(user_id, feedback.status, feedback.rating)] -= 1
+    for user_id in missing:
+        deltas[(user_id, feedback.status, feedback.rating)] += 1
+    apply_statistic_deltas(deltas)
+
+
+@transaction.atomic
+def sync_user_visibility(user):
+    wanted = {
+        pk: (status, rating)
+        for pk, status, rating in Feedback.objects.filter(_feedback_match(user)).values_list('pk', 'status', 'rating')
+    }
+    existing = {
+        pk: (status, rating)
+        for pk, status, rating in FeedbackVisibility.objects.filter(user=user)
+        .values_list('feedback_id', 'feedback__status', 'feedback__rating')
+    }
+    stale = existing.keys() - wanted.keys()
+    missing = wanted.keys() - existing.keys()
+    if stale:
+        FeedbackVisibility.objects.filter(user=user, feedback_id__in=stale).delete()
+    if missing:
+        FeedbackVisibility.objects.bulk_create(
+            [FeedbackVisibility(user=user, feedback_id=feedback_id) for feedback_id in missing],
+            ignore_conflicts=True,
+        )
+
+    deltas = Counter()
+    for feedback_id in stale:
+        deltas[(user.pk, *existing[feedback_id])] -= 1
+    for feedback_id in missing:
+        deltas[(user.pk, *wanted[feedback_id])] += 1
+    apply_statistic_deltas(deltas)
+    logger.debug(f"Synced feedback visibility for {user}: +{len(missing)} -{len(stale)}")
+
+
+def add_feedback_visibility(feedbacks, batch_size=1000):
+    """Visibility rows for freshly bulk-created feedbacks; returns their per-user statistic deltas."""
+    creators = {feedback.created_by_id for feedback in feedbacks if feedback.created_by_id}
+    emails = {feedback.email for feedback in feedbacks if feedback.email}
+    mobiles = {feedback.mobile for feedback in feedbacks if feedback.mobile}
+    User = get_user_model()
+    by_email = defaultdict(set)
+    by_mobile = defaultdict(set)
+    for pk, email, mobile in User.objects.filter(
+        Q(pk__in=creators) | Q(email__in=emails) | Q(mobile__in=mobiles)
+    ).values_list('pk', 'email', 'mobile'):
+        by_email[email].add(pk)
+        if mobile:
+            by_mobile[mobile].add(pk)
+
+    rows = []
+    deltas = Counter()
+    for feedback in feedbacks:
+        user_ids = set(by_email[feedback.email]) if feedback.email else set()
+        if feedback.mobile:
+            user_ids |= by_mobile[feedback.mobile]
+        if feedback.created_by_id:
+            user_ids.add(feedback.created_by_id)
+        for user_id in user_ids:
+            rows.append(FeedbackVisibility(user_id=user_id, feedback_id=feedback.pk))
+            deltas[(user_id, feedback.status, feedback.rating)] += 1
+    FeedbackVisibility.objects.bulk_create(rows, batch_size=batch_size, ignore_conflicts=True)
+    return deltas
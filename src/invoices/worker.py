@@ -0,0 +1,13 @@
+import django
+
+# Entry points for job pool processes. Spawned processes unpickle these by importing this module,
+# which must therefore not touch models before django.setup() has run.
+
+
+def init_process():
+    django.setup()
+
+
+def execute_job(job_id):
+    from .jobs import run_job
+    return run_job(job_id)
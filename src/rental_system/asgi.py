@@ -5,6 +5,10 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
+
+Served through this application, e.g. ``uvicorn rental_system.asgi:application``, the admin
+console follows feedback changes over a server-sent event stream (invoices.views.feedback_events),
+each open stream being a coroutine on the event loop. Under WSGI the page polls instead.
 """
 
 import os
@@ -0,0 +1,165 @@
+import logging
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_http_date_safe
+from invoices.visibility import visible_feedbacks
+from tenants.models import Tenant
+from users.images import variant_source_stem
+from users.models import UserType
+
+logger = logging.getLogger(__name__)
+
+# 'nginx' answers with X-Accel-Redirect to MEDIA_SENDFILE_PREFIX + path (an `internal` location
+# aliased to MEDIA_ROOT); 'sendfile' answers with X-Sendfile (Apache, lighttpd). None serves from Django.
+MEDIA_SENDFILE_BACKEND = getattr(settings, 'MEDIA_SENDFILE_BACKEND', None)
+MEDIA_SENDFILE_PREFIX = getattr(settings, 'MEDIA_SENDFILE_PREFIX', '/protected-media/')
+# Attachments and variants are content-addressed or versioned, so their URLs never change content.
+MEDIA_IMMUTABLE_MAX_AGE = getattr(settings, 'MEDIA_IMMUTABLE_MAX_AGE', 365 * 24 * 60 * 60)
+MEDIA_MAX_AGE = getattr(settings, 'MEDIA_MAX_AGE', 24 * 60 * 60)
+MEDIA_READ_SIZE = 64 * 1024
+
+PUBLIC_MEDIA_DIRS = ['profile_pictures', 'system_logo']
+IMMUTABLE_MEDIA_DIRS = ['feedback_attachments', 'derivatives']
+
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def media_directory(name):
+    """Top-level upload directory of a media file, looking through image variants to their source."""
+    return (variant_source_stem(name) or name).split('/', 1)[0]
+
+
+def can_view_media(user, name):
+    """Whether ``user`` may download the media file ``name`` (a path relative to MEDIA_ROOT)."""
+    stem = variant_source_stem(name)
+    directory = media_directory(name)
+    if directory in PUBLIC_MEDIA_DIRS:
+        return True
+    if not user.is_authenticated:
+        return False
+    if user.user_type == UserType.ADMIN:
+        return True
+
+    if directory == 'feedback_attachments':
+        feedbacks = visible_feedbacks(user)
+        if stem is not None:
+            return feedbacks.filter(attachment__startswith=f'{stem}.').exists()
+        return feedbacks.filter(attachment=name).exists()
+    if directory == 'tenant_photos':
+        tenants = Tenant.objects.filter(user=user)
+        if stem is not None:
+            return tenants.filter(photo__startswith=f'{stem}.').exists()
+        return tenants.filter(photo=name).exists()
+    return False
+
+
+def parse_range(header, size):
+    """``(start, stop)`` for a single byte range, None to serve the whole file, or 'invalid' if unsatisfiable."""
+    match = RANGE_PATTERN.match(header.replace(' ', ''))
+    if not match or match.groups() == ('', ''):
+        # Malformed or multi-range requests get the full file, which RFC 9110 allows.
+        return None
+    first, last = match.groups()
+    if first == '':
+        start, stop = max(0, size - int(last)), size
+    else:
+        start = int(first)
+        stop = min(size, int(last) + 1) if last else size
+    if start >= size or start >= stop:
+        return 'invalid'
+    return start, stop
+
+
+def _read_range(f, start, stop):
+    try:
+        f.seek(start)
+        remaining = stop - start
+        while remaining > 0:
+            block = f.read(min(MEDIA_READ_SIZE, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            yield block
+    finally:
+        f.close()
+
+
+def _cache_headers(response, name, stat, etag):
+    visibility = 'public' if media_directory(name) in PUBLIC_MEDIA_DIRS else 'private'
+    if name.split('/', 1)[0] in IMMUTABLE_MEDIA_DIRS:
+        response['Cache-Control'] = f'{visibility}, max-age={MEDIA_IMMUTABLE_MAX_AGE}, immutable'
+    else:
+        response['Cache-Control'] = f'{visibility}, max-age={MEDIA_MAX_AGE}'
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['ETag'] = etag
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def serve_media(request, path):
+    """Serve MEDIA_ROOT files after an access check, with conditional GET and single byte ranges."""
+    name = os.path.normpath(path).replace(os.sep, '/')
+    try:
+        full_path = safe_join(str(settings.MEDIA_ROOT), name)
+    except SuspiciousFileOperation:
+        raise Http404("Invalid media path")
+    if name.startswith('.') or not os.path.isfile(full_path):
+        raise Http404("Media file not found")
+    if not can_view_media(request.user, name):
+        # Same answer as a missing file, so private file names can't be probed.
+        raise Http404("Media file not found")
+
+    stat = os.stat(full_path)
+    etag = f'"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+
+    if_none_match = request.headers.get('If-None-Match')
+    modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    if (if_none_match and etag in if_none_match) or \
+            (not if_none_match and modified_since and int(stat.st_mtime) <= modified_since):
+        return _cache_headers(HttpResponseNotModified(), name, stat, etag)
+
+    if MEDIA_SENDFILE_BACKEND:
+        # The proxy does the I/O (and range handling) itself once access has been checked here.
+        response = HttpResponse(content_type=content_type)
+        if MEDIA_SENDFILE_BACKEND == 'nginx':
+            response['X-Accel-Redirect'] = MEDIA_SENDFILE_PREFIX + quote(name)
+        else:
+            response['X-Sendfile'] = full_path
+        return _cache_headers(response, name, stat, etag)
+
+    byte_range = None
+    range_header = request.headers.get('Range')
+    if_range = request.headers.get('If-Range')
+    if range_header and (not if_range or if_range in (etag, http_date(stat.st_mtime))):
+        byte_range = parse_range(range_header, stat.st_size)
+    if byte_range == 'invalid':
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{stat.st_size}'
+        return _cache_headers(response, name, stat, etag)
+
+    f = open(full_path, 'rb')
+    if byte_range is None:
+        # FileResponse hands the open file to wsgi.file_wrapper, so servers with sendfile() copy zero bytes in Python.
+        response = FileResponse(f, content_type=content_type)
+    else:
+        start, stop = byte_range
+        if stop == stat.st_size:
+            # Open-ended ranges (resumed downloads, media seeking) keep the file_wrapper path.
+            f.seek(start)
+            response = FileResponse(f, content_type=content_type)
+        else:
+            response = StreamingHttpResponse(_read_range(f, start, stop), content_type=content_type)
+            response['Content-Length'] = str(stop - start)
+        response.status_code = 206
+        response['Content-Range'] = f'bytes {start}-{stop - 1}/{stat.st_size}'
+    if encoding:
+        response['Content-Encoding'] = encoding
+    return _cache_headers(response, name, stat, etag)
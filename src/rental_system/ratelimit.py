@@ -0,0 +1,265 @@
+import logging
+import re
+import threading
+import time
+import zlib
+from collections import Counter
+from django.conf import settings
+from django.contrib.auth.signals import user_login_failed
+from django.core.cache import caches
+from django.dispatch import receiver
+from django.http import Http404, HttpResponse, JsonResponse
+from django.urls import Resolver404, resolve
+from django.utils.module_loading import import_string
+from users.models import UserType
+from users.utils import basic_auth_credentials
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_BACKEND = getattr(settings, 'RATE_LIMIT_BACKEND', 'rental_system.ratelimit.LocalBackend')
+RATE_LIMIT_CACHE = getattr(settings, 'RATE_LIMIT_CACHE', 'default')
+# Number of reverse proxies in front of Django whose X-Forwarded-For entries can be trusted.
+RATE_LIMIT_TRUSTED_PROXIES = getattr(settings, 'RATE_LIMIT_TRUSTED_PROXIES', 0)
+# view name: {'methods': [...], 'ip': '<count>/<s|m|h|d>', 'account': ..., 'account_field': POST field
+#             or BASIC_AUTH_ACCOUNT, 'account_failures_only': bool}
+# The account bucket is keyed on (account, IP), so nobody can use up someone else's allowance, unless
+# account_failures_only is set: then it is shared by all IPs but only failed authentications count.
+RATE_LIMITS = getattr(settings, 'RATE_LIMITS', {})
+
+# account_field value that takes the account from an ``Authorization: Basic`` header instead of the POST.
+BASIC_AUTH_ACCOUNT = 'basic_auth'
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+RATE_PATTERN = re.compile(r'^(\d+)/(\d*)([smhd])$')
+
+
+def parse_rate(rate):
+    """``'10/m'`` -> ``(10, 60)``: a bucket of 10 tokens refilled over 60 seconds."""
+    match = RATE_PATTERN.match(rate)
+    if not match:
+        raise ValueError(f"Invalid rate {rate!r}, expected e.g. '10/m'")
+    count, multiplier, unit = match.groups()
+    return int(count), int(multiplier or 1) * PERIODS[unit]
+
+
+class LocalBackend:
+    """In-process token buckets for single-node deployments.
+
+    Buckets are spread over lock-striped shards so concurrent requests for different keys rarely
+    contend. Idle buckets that would be full again are dropped once a shard grows past ``max_keys``.
+    """
+
+    def __init__(self, shards=64, max_keys=10000):
+        self.shards = [({}, threading.Lock()) for _ in range(shards)]
+        self.max_keys = max_keys
+        self.rejections = Counter()
+        self._rejections_lock = threading.Lock()
+
+    def consume(self, key, capacity, period):
+        """Take one token; returns 0 when allowed, else the seconds until a token is available."""
+        buckets, lock = self.shards[zlib.crc32(key.encode('utf-8')) % len(self.shards)]
+        refill_rate = capacity / period
+        now = time.monotonic()
+        with lock:
+            tokens, updated = buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * refill_rate)
+            if tokens >= 1:
+                buckets[key] = (tokens - 1, now)
+                if len(buckets) > self.max_keys:
+                    self._prune(buckets, now, period)
+                return 0
+            buckets[key] = (tokens, now)
+            return (1 - tokens) / refill_rate
+
+    def available(self, key, capacity, period):
+        """Like ``consume`` without taking the token."""
+        buckets, lock = self.shards[zlib.crc32(key.encode('utf-8')) % len(self.shards)]
+        refill_rate = capacity / period
+        with lock:
+            tokens, updated = buckets.get(key, (capacity, time.monotonic()))
+        tokens = min(capacity, tokens + (time.monotonic() - updated) * refill_rate)
+        return 0 if tokens >= 1 else (1 - tokens) / refill_rate
+
+    def _prune(self, buckets, now, period):
+        for key in [key for key, (_, updated) in buckets.items() if now - updated >= period]:
+            del buckets[key]
+
+    def record_rejection(self, rule, scope):
+        with self._rejections_lock:
+            self.rejections[f'{rule}:{scope}'] += 1
+
+    def rejection_counts(self):
+        with self._rejections_lock:
+            return dict(self.rejections)
+
+
+class CacheBackend:
+    """Shared limits through the Django cache, for several app servers.
+
+    The cache has no compare-and-set, so each bucket is approximated by an atomic counter per
+    refill period: the same sustained rate, with at most one extra burst at a period boundary.
+    """
+
+    def __init__(self, alias=RATE_LIMIT_CACHE):
+        self.cache = caches[alias]
+
+    def consume(self, key, capacity, period):
+        now = time.time()
+        window = int(now // period)
+        cache_key = f'ratelimit:{key}:{window}'
+        self.cache.add(cache_key, 0, period + 1)
+        try:
+            count = self.cache.incr(cache_key)
+        except ValueError:
+            # Evicted between add() and incr().
+            self.cache.add(cache_key, 1, period + 1)
+            count = 1
+        if count <= capacity:
+            return 0
+        return (window + 1) * period - now
+
+    def available(self, key, capacity, period):
+        now = time.time()
+        window = int(now // period)
+        if (self.cache.get(f'ratelimit:{key}:{window}') or 0) < capacity:
+            return 0
+        return (window + 1) * period - now
+
+    def record_rejection(self, rule, scope):
+        cache_key = f'ratelimit:rejected:{rule}:{scope}'
+        self.cache.add(cache_key, 0, None)
+        try:
+            self.cache.incr(cache_key)
+        except ValueError:
+            pass
+        known = self.cache.get('ratelimit:rejected:keys') or []
+        if cache_key not in known:
+            self.cache.set('ratelimit:rejected:keys', known + [cache_key], None)
+
+    def rejection_counts(self):
+        keys = self.cache.get('ratelimit:rejected:keys') or []
+        return {key.split(':', 2)[2]: count for key, count in self.cache.get_many(keys).items()}
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = import_string(RATE_LIMIT_BACKEND)()
+    return _backend
+
+
+def client_ip(request):
+    if RATE_LIMIT_TRUSTED_PROXIES:
+        forwarded = [ip.strip() for ip in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if ip.strip()]
+        if len(forwarded) >= RATE_LIMIT_TRUSTED_PROXIES:
+            return forwarded[-RATE_LIMIT_TRUSTED_PROXIES]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def _compiled_rules():
+    rules = {}
+    for view_name, rule in RATE_LIMITS.items():
+        rules[view_name] = {
+            'methods': {method.upper() for method in rule.get('methods', ['GET', 'POST'])},
+            'ip': parse_rate(rule['ip']) if rule.get('ip') else None,
+            'account': parse_rate(rule['account']) if rule.get('account') else None,
+            'account_field': rule.get('account_field', 'email'),
+            'account_failures_only': rule.get('account_failures_only', False),
+        }
+    return rules
+
+
+def request_account(request, field):
+    if field == BASIC_AUTH_ACCOUNT:
+        credentials = basic_auth_credentials(request)
+        account = credentials[0] if credentials else ''
+    else:
+        account = request.POST.get(field) or ''
+    return account.strip().lower()
+
+
+def too_many_requests(request, retry_after):
+    retry_after = max(1, int(retry_after + 0.999))
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest' or request.content_type == 'application/json':
+        response = JsonResponse({'error': 'Too many requests, please try again later.'}, status=429)
+    else:
+        response = HttpResponse('Too many requests, please try again later.', status=429, content_type='text/plain; charset=utf-8')
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+class RateLimitMiddleware:
+    """Token-bucket throttling for the views named in RATE_LIMITS, per client IP and per submitted account.
+
+    Runs ahead of the session and auth middleware, so a rejected request costs a URL resolve and a
+    bucket update: no session load, no view code, no queries.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.rules = _compiled_rules()
+
+    def __call__(self, request):
+        if self.rules:
+            rejection = self.check(request)
+            if rejection is not None:
+                return rejection
+        return self.get_response(request)
+
+    def check(self, request):
+        try:
+            view_name = resolve(request.path_info).view_name
+        except Resolver404:
+            return None
+        rule = self.rules.get(view_name)
+        if rule is None or request.method not in rule['methods']:
+            return None
+
+        backend = get_backend()
+        limits = []
+        if rule['ip']:
+            limits.append(('ip', f'{view_name}:ip:{client_ip(request)}', rule['ip']))
+        if rule['account'] and request.method == 'POST':
+            account = request_account(request, rule['account_field'])
+            if account and rule['account_failures_only']:
+                key = f'{view_name}:account:{account}'
+                retry_after = backend.available(key, *rule['account'])
+                if retry_after:
+                    return self.reject(request, backend, view_name, 'account', key, retry_after)
+                # Charged by count_failed_authentication if the view's authenticate() call fails.
+                request._rate_limit_failures = (key, rule['account'])
+            elif account:
+                limits.append(('account', f'{view_name}:account:{account}:{client_ip(request)}', rule['account']))
+
+        for scope, key, (capacity, period) in limits:
+            retry_after = backend.consume(key, capacity, period)
+            if retry_after:
+                return self.reject(request, backend, view_name, scope, key, retry_after)
+        return None
+
+    def reject(self, request, backend, view_name, scope, key, retry_after):
+        backend.record_rejection(view_name, scope)
+        logger.warning(f"Rate limited {request.method} {request.path} ({scope} {key.split(':', 3)[-1]})")
+        return too_many_requests(request, retry_after)
+
+
+@receiver(user_login_failed)
+def count_failed_authentication(sender, credentials, request=None, **kwargs):
+    limit = getattr(request, '_rate_limit_failures', None)
+    if limit is not None:
+        key, (capacity, period) = limit
+        get_backend().consume(key, capacity, period)
+
+
+def rejection_counts():
+    """Rejected requests per ``<view name>:<ip|account>`` since start-up (local) or ever (cache)."""
+    return get_backend().rejection_counts()
+
+
+def rate_limit_stats(request):
+    if not request.user.is_authenticated or request.user.user_type != UserType.ADMIN:
+        raise Http404
+    return JsonResponse({'rejections': rejection_counts()})
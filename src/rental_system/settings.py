@@ -1,5 +1,6 @@
 from pathlib import Path
 import os
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -15,8 +16,14 @@ ALLOWED_HOSTS = ['localhost', '127.0.0.1', 'feedboxs.com', 'www.feedboxs.com']
 # Define SITE_URL for production
 SITE_URL = 'https://feedboxs.com'  # Replace with your actual domain
 
-FILE_UPLOAD_MAX_MEMORY_SIZE = 100 * 1024 * 1024  # 100MB
-DATA_UPLOAD_MAX_MEMORY_SIZE = 100 * 1024 * 1024  # 100MB
+# Uploads larger than this are streamed to a temp file instead of being held in memory.
+FILE_UPLOAD_MAX_MEMORY_SIZE = 2 * 1024 * 1024  # 2MB
+DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB, request data other than files
+FILE_UPLOAD_HANDLERS = [
+    'invoices.uploads.AttachmentSizeLimitHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
 
 CSRF_TRUSTED_ORIGINS = [
     'https://feedboxs.com',
@@ -41,6 +48,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Ahead of sessions and auth so throttled requests are rejected before any database work.
+    'rental_system.ratelimit.RateLimitMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -64,6 +73,7 @@ TEMPLATES = [
                 'django.contrib.messages.context_processors.messages',
                 'users.context_processors.feedback_context',  # Custom context processor for feedback
                 'users.context_processors.site_settings',  # Custom context processor for SITE_URL
+                'users.context_processors.branding',  # Cached system logo and contact
             ],
         },
     },
@@ -78,6 +88,8 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # A file (not the default shared in-memory DB) so threaded tests get SQLite's busy timeout.
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
     # Uncomment and configure for PostgreSQL or other databases
      # PostgreSQL (for deployment)
@@ -118,6 +130,33 @@ STATICFILES_FINDERS = [
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Media is served by rental_system.media.serve_media after an access check. Behind nginx set this to
+# 'nginx' and add an `internal` location at MEDIA_SENDFILE_PREFIX aliased to MEDIA_ROOT ('sendfile' for
+# X-Sendfile); MEDIA_ROOT itself must not be exposed by the proxy.
+MEDIA_SENDFILE_BACKEND = None
+MEDIA_SENDFILE_PREFIX = '/protected-media/'
+
+# Rendered feedback PDFs, keyed by a digest of their inputs
+FEEDBACK_PDF_CACHE_DIR = BASE_DIR / 'cache' / 'feedback_pdfs'
+FEEDBACK_PDF_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Background jobs (`python manage.py run_job_worker`). Without a live worker, PDFs render inline.
+FEEDBACK_PDF_RENDER_ASYNC = True
+JOB_WORKER_PROCESSES = 2
+JOB_QUEUE_MAX_DEPTH = 50
+
+# Exports built by the job worker are kept this long (seconds) and reused for identical filters
+FEEDBACK_EXPORT_DIR = BASE_DIR / 'cache' / 'exports'
+FEEDBACK_EXPORT_TTL = 24 * 60 * 60
+
+# Resumable attachment uploads: partial files live here until the feedback is submitted
+FEEDBACK_UPLOAD_DIR = BASE_DIR / 'cache' / 'uploads'
+FEEDBACK_ATTACHMENT_SIZE_LIMITS = {
+    'image': 10 * 1024 * 1024,
+    'document': 20 * 1024 * 1024,
+    'media': 100 * 1024 * 1024,
+    'default': 10 * 1024 * 1024,
+}
 
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -177,6 +216,50 @@ CAPTCHA_NOISE_FUNCTIONS = ('captcha.helpers.noise_null',)
 CAPTCHA_LENGTH = 4
 CAPTCHA_IMAGE_SIZE = (150, 50)
 CAPTCHA_TIMEOUT = 15  # CAPTCHA validity in minutes
+# Challenges come pre-rendered from invoices.captchas' pool, and expired ones are swept by the job
+# worker, so the field no longer deletes expired rows on every submission.
+CAPTCHA_GET_FROM_POOL = True
+CAPTCHA_POOL_SIZE = 500
+
+# reCAPTCHA on registration (users.recaptcha). Set RECAPTCHA_BACKEND to 'users.recaptcha.StubVerifier'
+# to run without network access, e.g. for load tests.
+# Keys come from the environment (src/.env under docker compose). In DEBUG, Google's published test
+# pair is used instead, which accepts every token.
+if DEBUG:
+    RECAPTCHA_SITE_KEY = os.environ.get('RECAPTCHA_SITE_KEY', '6LeIxAcTAAAAAJcZVRqyHh71UMIEGNQ_MXjiZKhI')
+    RECAPTCHA_SECRET_KEY = os.environ.get('RECAPTCHA_SECRET_KEY', '6LeIxAcTAAAAAGG-vFI1TnRWxMZNFuojJ4WifJWe')
+else:
+    try:
+        RECAPTCHA_SITE_KEY = os.environ['RECAPTCHA_SITE_KEY']
+        RECAPTCHA_SECRET_KEY = os.environ['RECAPTCHA_SECRET_KEY']
+    except KeyError as e:
+        raise ImproperlyConfigured(f"Set {e.args[0]} in the environment") from None
+RECAPTCHA_BACKEND = 'users.recaptcha.GoogleVerifier'
+RECAPTCHA_TIMEOUT = (2, 3)  # connect, read seconds
+
+# Rate limits for public endpoints (rental_system.ratelimit). Rates are token buckets: '10/m' allows a
+# burst of 10 and refills 10 per minute. Use 'rental_system.ratelimit.CacheBackend' with a shared cache
+# when running several app servers, and set RATE_LIMIT_TRUSTED_PROXIES behind a reverse proxy.
+RATE_LIMIT_BACKEND = 'rental_system.ratelimit.LocalBackend'
+RATE_LIMIT_TRUSTED_PROXIES = 0
+RATE_LIMITS = {
+    # Only failed logins count against an account, so others can't lock its owner out.
+    'users:login': {'methods': ['POST'], 'ip': '20/m', 'account': '10/h', 'account_field': 'username', 'account_failures_only': True},
+    'users:register': {'methods': ['POST'], 'ip': '10/h', 'account': '5/h'},
+    'users:forgot_password': {'methods': ['POST'], 'ip': '10/h', 'account': '5/h'},
+    'users:verify_otp': {'methods': ['POST'], 'ip': '10/10m'},
+    # Kiosks sign every batch with the account password over HTTP Basic.
+    'invoices:ingest_feedbacks': {
+        'methods': ['POST'], 'ip': '30/m', 'account': '10/h', 'account_field': 'basic_auth', 'account_failures_only': True,
+    },
+    # Every GET of the form hands out a CAPTCHA, so page loads share the bucket with submissions.
+    'invoices:create_feedback': {'methods': ['GET', 'POST'], 'ip': '20/m'},
+    'invoices:create_feedback_with_user': {'methods': ['GET', 'POST'], 'ip': '20/m'},
+    'invoices:attachment_uploads': {'methods': ['POST'], 'ip': '20/m'},
+    # One request per 1MB chunk of a resumable upload.
+    'invoices:attachment_upload': {'methods': ['GET', 'PATCH', 'DELETE'], 'ip': '120/m'},
+    'invoices:captcha-refresh': {'methods': ['GET'], 'ip': '30/m'},
+}
 
 # Jazzmin settings
 JAZZMIN_SETTINGS = {
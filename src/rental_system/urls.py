@@ -1,9 +1,11 @@
 # rental_system/urls.py
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 from invoices.views import custom_404
+from .media import serve_media
+from .ratelimit import rate_limit_stats
 
 admin.site.site_header = 'FeedBox | Digital Feedback Box | Nepal Admin'
 admin.site.site_title = 'FeedBox | Digital Feedback Box | Nepal Admin'
@@ -18,4 +20,7 @@ urlpatterns = [
     path('', include('tenants.urls', namespace='tenants')),
     path('', include('invoices.urls', namespace='invoices')),
     path('captcha/', include('captcha.urls')),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT) + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
\ No newline at end of file
+    path('rate-limits/', rate_limit_stats, name='rate_limit_stats'),
+    # Media goes through an access check in every environment; see MEDIA_SENDFILE_BACKEND for production.
+    re_path(rf'^{settings.MEDIA_URL.lstrip("/")}(?P<path>.+)$', serve_media, name='media'),
+] + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
\ No newline at end of file
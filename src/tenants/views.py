@@ -11,7 +11,7 @@ from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.db.models import Q
 from users.models import UserType
 from .forms import TenantForm
-from users.views import get_system_logo
+from users.cache import get_system_logo
 
 
 # Create your views here.
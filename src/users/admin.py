@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from .forms import CustomUserCreationForm, CustomUserChangeForm
-from .models import User, PasswordResetOTP, SystemLogo, Contact
+from .models import User, PasswordResetOTP, SystemLogo, Contact, OutgoingEmail
 
 # Register your models here.
 
@@ -67,4 +67,11 @@ class SystemLogoAdmin(admin.ModelAdmin):
 
 @admin.register(Contact)
 class ContactAdmin(admin.ModelAdmin):
-    list_display = ('email', 'address', 'phone')
\ No newline at end of file
+    list_display = ('email', 'address', 'phone')
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'status', 'attempts', 'next_attempt_at', 'sent_at', 'created_at')
+    list_filter = ('status',)
+    readonly_fields = ('attempts', 'last_error', 'sent_at')
@@ -0,0 +1,117 @@
+import copy
+import logging
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import cache
+from .models import SystemLogo, Contact, User
+
+logger = logging.getLogger(__name__)
+
+# The in-process copy is trusted for a short time so other workers pick up an invalidation quickly;
+# the shared Django cache entry lives until a save or delete clears it.
+LOCAL_CACHE_TTL = getattr(settings, 'SINGLETON_LOCAL_CACHE_TTL', 30)
+SHARED_CACHE_TIMEOUT = getattr(settings, 'SINGLETON_CACHE_TIMEOUT', 60 * 60 * 24)
+
+_MISSING = object()
+
+
+class LocalLRUCache:
+    """Small thread-safe LRU with per-entry expiry, for values that are read on every request."""
+
+    def __init__(self, maxsize=128, ttl=LOCAL_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=_MISSING):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+local_cache = LocalLRUCache()
+
+
+def _load_system_logo():
+    try:
+        return SystemLogo.objects.latest('-created_at')
+    except SystemLogo.DoesNotExist:
+        return None
+
+
+def _load_contact():
+    return Contact.objects.first()
+
+
+def _load_user_count():
+    return User.objects.count()
+
+
+SINGLETONS = {
+    'system_logo': _load_system_logo,
+    'contact': _load_contact,
+    'user_count': _load_user_count,
+}
+
+
+def _cache_key(name):
+    return f'users:singleton:{name}'
+
+
+def get_singleton(name):
+    key = _cache_key(name)
+    value = local_cache.get(key)
+    if value is _MISSING:
+        # Stored as a 1-tuple so a cached "no row" (None) is distinguishable from a cache miss.
+        cached = cache.get(key)
+        if cached is None:
+            cached = (SINGLETONS[name](),)
+            cache.set(key, cached, SHARED_CACHE_TIMEOUT)
+        value = cached[0]
+        local_cache.set(key, value)
+    # Callers get their own copy so an in-place edit never leaks into other requests.
+    return copy.copy(value)
+
+
+def invalidate_singleton(name):
+    key = _cache_key(name)
+    local_cache.delete(key)
+    cache.delete(key)
+    logger.debug(f"Invalidated cached singleton {name}")
+
+
+def get_system_logo():
+    return get_singleton('system_logo')
+
+
+def get_contact():
+    return get_singleton('contact')
+
+
+def get_user_count():
+    return get_singleton('user_count')
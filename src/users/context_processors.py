@@ -1,18 +1,17 @@
-from invoices.models import Feedback
-from django.db.models import Q
+from django.utils.functional import SimpleLazyObject
+from invoices.statistics import reviewed_feedback_count
+from .cache import get_system_logo, get_contact
 
-def feedback_context(request):
+def _reviewed_feedbacks(request):
     if request.user.is_authenticated and request.user.user_type != 'admin':
-        feedback_queryset = Feedback.objects.filter(
-            Q(email=request.user.email) |
-            Q(mobile=request.user.mobile) |
-            Q(created_by=request.user) |
-            Q(uuid__in=request.user.feedbacks.values_list('uuid', flat=True))
-        ).distinct()
-        return {
-            'reviewed_feedbacks': feedback_queryset.filter(status__in=['solved', 'closed']).count()
-        }
-    return {'reviewed_feedbacks': 0}
+        return reviewed_feedback_count(request.user)
+    return 0
+
+def feedback_context(request):
+    # Only evaluated if a template reads it, and at most once per request.
+    if not hasattr(request, '_reviewed_feedbacks'):
+        request._reviewed_feedbacks = SimpleLazyObject(lambda: _reviewed_feedbacks(request))
+    return {'reviewed_feedbacks': request._reviewed_feedbacks}
 
 from django.conf import settings
 
@@ -20,4 +19,11 @@ def site_settings(request):
     return {
         'SITE_URL': settings.SITE_URL,
         'DEBUG': settings.DEBUG,
-    }
\ No newline at end of file
+    }
+
+def branding(request):
+    # Served from the singleton cache, so pages that do not pass logo/contact themselves cost no queries.
+    return {
+        'logo': get_system_logo(),
+        'contact': get_contact(),
+    }
@@ -0,0 +1,129 @@
+import hashlib
+import logging
+import os
+import posixpath
+import re
+from io import BytesIO
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+# name: (max width, format, quality). Changing a spec or DERIVATIVE_VERSION gives every variant
+# a new file name, so stale copies are never served from browser or disk caches.
+IMAGE_VARIANTS = getattr(settings, 'IMAGE_VARIANTS', {
+    'thumb': (160, 'WEBP', 80),
+    'small': (400, 'WEBP', 80),
+    'medium': (1024, 'WEBP', 82),
+    # WeasyPrint embeds JPEG without re-encoding.
+    'pdf': (400, 'JPEG', 85),
+})
+DERIVATIVE_VERSION = 1
+DERIVATIVE_DIR = 'derivatives'
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp', '.tif', '.tiff'}
+FORMAT_EXTENSIONS = {'WEBP': 'webp', 'JPEG': 'jpg', 'PNG': 'png'}
+VARIANT_NAME_PATTERN = re.compile(rf'^{DERIVATIVE_DIR}/[a-z]+/(?P<stem>.+)-[0-9a-f]{{12}}\.[a-z]+$')
+
+
+def is_image_name(name):
+    return os.path.splitext(name or '')[1].lower() in IMAGE_EXTENSIONS
+
+
+def variant_spec(variant):
+    width, image_format, quality = IMAGE_VARIANTS[variant]
+    return f"v{DERIVATIVE_VERSION}:{variant}:{width}:{image_format}:{quality}"
+
+
+def variant_name(source_name, variant):
+    """Versioned storage name of ``variant`` for the stored file ``source_name``.
+
+    The path mirrors the source's (``derivatives/thumb/profile_pictures/me-<digest>.webp``) so
+    media access checks can map a variant back to the file it was made from.
+    """
+    digest = hashlib.sha256(f"{source_name}|{variant_spec(variant)}".encode('utf-8')).hexdigest()
+    extension = FORMAT_EXTENSIONS[IMAGE_VARIANTS[variant][1]]
+    return posixpath.join(DERIVATIVE_DIR, variant, f"{os.path.splitext(source_name)[0]}-{digest[:12]}.{extension}")
+
+
+def variant_source_stem(name):
+    """Source file name without its extension for a variant name, or None if ``name`` isn't a variant."""
+    match = VARIANT_NAME_PATTERN.match(name)
+    return match.group('stem') if match else None
+
+
+def render_variant(source, variant):
+    """Resize and re-encode an open image file; returns the encoded bytes."""
+    width, image_format, quality = IMAGE_VARIANTS[variant]
+    image = Image.open(source)
+    # JPEG sources decode straight at a reduced scale, which is most of the cost for phone photos.
+    image.draft('RGB', (width, width * 4))
+    image = ImageOps.exif_transpose(image)
+    if image.width > width:
+        image = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    elif image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA')
+
+    output = BytesIO()
+    image.save(output, image_format, quality=quality, optimize=image_format == 'JPEG')
+    return output.getvalue()
+
+
+def get_variant(field_file, variant):
+    """Storage name of the variant, generating it on first use; None if the source isn't a usable image."""
+    if not field_file or not is_image_name(field_file.name):
+        return None
+    name = variant_name(field_file.name, variant)
+    if default_storage.exists(name):
+        return name
+    try:
+        with field_file.storage.open(field_file.name, 'rb') as source:
+            data = render_variant(source, variant)
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError) as e:
+        logger.warning(f"Could not create {variant} variant of {field_file.name}: {str(e)}")
+        return None
+    saved = default_storage.save(name, ContentFile(data))
+    if saved != name:
+        # Generated concurrently by another request.
+        default_storage.delete(saved)
+    logger.debug(f"Created {variant} variant {name} ({len(data)} bytes)")
+    return name
+
+
+def variant_url(field_file, variant):
+    """URL of the variant, falling back to the original file's URL."""
+    name = get_variant(field_file, variant)
+    if name:
+        return default_storage.url(name)
+    return field_file.url if field_file else ''
+
+
+def variant_bytes(field_file, variant):
+    name = get_variant(field_file, variant)
+    if not name:
+        return None
+    with default_storage.open(name, 'rb') as f:
+        return f.read()
+
+
+def generate_variants(field_file, variants=None):
+    for variant in variants or IMAGE_VARIANTS:
+        get_variant(field_file, variant)
+
+
+def delete_variants(source_name, variants=None):
+    """Delete the stored variants of ``source_name``, e.g. once it has been replaced or removed."""
+    if not is_image_name(source_name):
+        return
+    for variant in variants or IMAGE_VARIANTS:
+        name = variant_name(source_name, variant)
+        if default_storage.exists(name):
+            default_storage.delete(name)
+            logger.debug(f"Deleted {variant} variant {name}")
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from users.outbox import EMAIL_OUTBOX_BATCH_SIZE, run_outbox_worker, send_queued_emails
+
+
+class Command(BaseCommand):
+    help = 'Send emails from the outbox over one reused email backend connection.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=EMAIL_OUTBOX_BATCH_SIZE, help='Emails claimed per batch.')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds between outbox polls.')
+        parser.add_argument('--once', action='store_true', help='Send what is due now and exit.')
+
+    def handle(self, *args, **options):
+        if options['once']:
+            sent = send_queued_emails(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f"Processed {sent} queued emails."))
+            return
+        try:
+            run_outbox_worker(batch_size=options['batch_size'], poll_interval=options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS("Email outbox worker stopped."))
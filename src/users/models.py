@@ -157,4 +157,61 @@ class Contact(TimestampMixin):
         
     def save(self, *args, **kwargs):
         self.full_clean()
-        super().save(*args, **kwargs)
\ No newline at end of file
+        super().save(*args, **kwargs)
+
+class OutgoingEmail(TimestampMixin):
+    """A message waiting in the outbox; ``users.outbox`` sends it outside the request."""
+    QUEUED = 'queued'
+    SENDING = 'sending'
+    SENT = 'sent'
+    FAILED = 'failed'
+
+    subject = models.CharField(
+        max_length=255,
+    )
+
+    body = models.TextField()
+
+    from_email = models.CharField(
+        max_length=255,
+    )
+
+    to = models.JSONField(
+        default=list,
+    )
+
+    status = models.CharField(
+        max_length=10,
+        choices=[
+            (QUEUED, 'Queued'),
+            (SENDING, 'Sending'),
+            (SENT, 'Sent'),
+            (FAILED, 'Failed'),
+        ],
+        default=QUEUED
+    )
+
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+    )
+
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now,
+    )
+
+    last_error = models.TextField(
+        blank=True,
+    )
+
+    sent_at = models.DateTimeField(
+        null=True,
+        blank=True,
+    )
+
+    def __str__(self):
+        return f"{self.subject} to {', '.join(self.to)}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
@@ -0,0 +1,155 @@
+import logging
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import F
+from django.utils import timezone
+from .models import OutgoingEmail
+
+logger = logging.getLogger(__name__)
+
+EMAIL_OUTBOX_BATCH_SIZE = getattr(settings, 'EMAIL_OUTBOX_BATCH_SIZE', 50)
+EMAIL_OUTBOX_MAX_ATTEMPTS = getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 6)
+# Retries wait 30s, 1m, 2m, 4m, ... capped at an hour.
+EMAIL_OUTBOX_RETRY_DELAY = getattr(settings, 'EMAIL_OUTBOX_RETRY_DELAY', 30)
+EMAIL_OUTBOX_MAX_RETRY_DELAY = 60 * 60
+# The SMTP session is kept open while mail keeps coming and closed after this many idle seconds.
+EMAIL_OUTBOX_IDLE_DISCONNECT = getattr(settings, 'EMAIL_OUTBOX_IDLE_DISCONNECT', 30)
+# Bounds every SMTP connect and send, so a hung server can't hold a claimed batch indefinitely.
+EMAIL_OUTBOX_TIMEOUT = getattr(settings, 'EMAIL_TIMEOUT', None) or 30
+# Messages still "sending" after this long belong to a worker that died; a live worker touches its
+# claimed messages before each send.
+EMAIL_OUTBOX_STALE_AFTER = timedelta(minutes=10)
+EMAIL_OUTBOX_KEEP_SENT = timedelta(days=getattr(settings, 'EMAIL_OUTBOX_KEEP_SENT_DAYS', 7))
+
+
+def queue_email(subject, body, to, from_email=None):
+    """Store a plain-text email for the outbox worker; costs the request a single INSERT."""
+    if isinstance(to, str):
+        to = [to]
+    return OutgoingEmail.objects.create(
+        subject=subject,
+        body=body,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        to=list(to),
+    )
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=min(EMAIL_OUTBOX_RETRY_DELAY * 2 ** (attempts - 1), EMAIL_OUTBOX_MAX_RETRY_DELAY))
+
+
+def requeue_stale_emails():
+    return OutgoingEmail.objects.filter(
+        status=OutgoingEmail.SENDING, updated_at__lt=timezone.now() - EMAIL_OUTBOX_STALE_AFTER
+    ).update(status=OutgoingEmail.QUEUED, updated_at=timezone.now())
+
+
+def claim_due_emails(batch_size=EMAIL_OUTBOX_BATCH_SIZE):
+    now = timezone.now()
+    due = OutgoingEmail.objects.filter(status=OutgoingEmail.QUEUED, next_attempt_at__lte=now).order_by('next_attempt_at')
+    claimed = []
+    for email in due[:batch_size]:
+        # Conditional update so concurrent workers never send the same message twice.
+        if OutgoingEmail.objects.filter(pk=email.pk, status=OutgoingEmail.QUEUED).update(
+            status=OutgoingEmail.SENDING, attempts=F('attempts') + 1, updated_at=now
+        ):
+            email.status = OutgoingEmail.SENDING
+            email.attempts += 1
+            claimed.append(email)
+    return claimed
+
+
+def _mark_failed(email, error):
+    email.last_error = error
+    if email.attempts >= EMAIL_OUTBOX_MAX_ATTEMPTS:
+        email.status = OutgoingEmail.FAILED
+        logger.error(f"Giving up on email {email.pk} to {email.to} after {email.attempts} attempts: {error}")
+    else:
+        email.status = OutgoingEmail.QUEUED
+        email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+        logger.warning(f"Email {email.pk} to {email.to} failed (attempt {email.attempts}), retrying: {error}")
+    email.save(update_fields=['status', 'next_attempt_at', 'last_error', 'updated_at'])
+
+
+def _release(emails):
+    for email in emails:
+        OutgoingEmail.objects.filter(pk=email.pk).update(
+            status=OutgoingEmail.QUEUED, attempts=F('attempts') - 1, updated_at=timezone.now()
+        )
+
+
+def send_batch(connection, batch_size=EMAIL_OUTBOX_BATCH_SIZE):
+    """Send one batch of due emails over ``connection``; returns the number claimed."""
+    emails = claim_due_emails(batch_size)
+    if not emails:
+        return 0
+    try:
+        # Opened here rather than by send(), which would close a connection it opened itself.
+        connection.open()
+    except Exception as e:
+        for email in emails:
+            _mark_failed(email, f"Could not connect: {str(e) or e.__class__.__name__}")
+        return len(emails)
+
+    for index, email in enumerate(emails):
+        # Keeps the rest of the batch fresh, so a second worker doesn't take it for abandoned and resend it.
+        OutgoingEmail.objects.filter(pk__in=[pending.pk for pending in emails[index:]], status=OutgoingEmail.SENDING).update(
+            updated_at=timezone.now()
+        )
+        message = EmailMessage(email.subject, email.body, email.from_email, email.to, connection=connection)
+        try:
+            message.send()
+        except Exception as e:
+            _mark_failed(email, str(e) or e.__class__.__name__)
+            # The session is probably broken; hand the rest back and reconnect on the next batch.
+            _release(emails[index + 1:])
+            connection.close()
+            break
+        OutgoingEmail.objects.filter(pk=email.pk).update(
+            status=OutgoingEmail.SENT, sent_at=timezone.now(), last_error='', updated_at=timezone.now()
+        )
+    return len(emails)
+
+
+def send_queued_emails(batch_size=EMAIL_OUTBOX_BATCH_SIZE):
+    """Drain everything due now over one connection."""
+    requeue_stale_emails()
+    total = 0
+    connection = get_connection(timeout=EMAIL_OUTBOX_TIMEOUT)
+    try:
+        while True:
+            claimed = send_batch(connection, batch_size)
+            total += claimed
+            if claimed < batch_size:
+                break
+    finally:
+        connection.close()
+    return total
+
+
+def purge_sent_emails():
+    return OutgoingEmail.objects.filter(status=OutgoingEmail.SENT, sent_at__lt=timezone.now() - EMAIL_OUTBOX_KEEP_SENT).delete()[0]
+
+
+def run_outbox_worker(batch_size=EMAIL_OUTBOX_BATCH_SIZE, poll_interval=1.0, once=False):
+    connection = get_connection(timeout=EMAIL_OUTBOX_TIMEOUT)
+    last_sent = None
+    logger.info("Email outbox worker started")
+    try:
+        while True:
+            requeue_stale_emails()
+            claimed = send_batch(connection, batch_size)
+            if claimed:
+                last_sent = time.monotonic()
+                continue
+            if once:
+                break
+            if last_sent is not None and time.monotonic() - last_sent >= EMAIL_OUTBOX_IDLE_DISCONNECT:
+                connection.close()
+                last_sent = None
+            time.sleep(poll_interval)
+    finally:
+        connection.close()
+        logger.info("Email outbox worker stopped")
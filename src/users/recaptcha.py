@@ -0,0 +1,166 @@
+import hashlib
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+RECAPTCHA_BACKEND = getattr(settings, 'RECAPTCHA_BACKEND', 'users.recaptcha.GoogleVerifier')
+RECAPTCHA_SECRET_KEY = getattr(settings, 'RECAPTCHA_SECRET_KEY', '')
+RECAPTCHA_VERIFY_URL = getattr(settings, 'RECAPTCHA_VERIFY_URL', 'https://www.google.com/recaptcha/api/siteverify')
+# (connect, read) seconds; a registration never waits on Google longer than this.
+RECAPTCHA_TIMEOUT = getattr(settings, 'RECAPTCHA_TIMEOUT', (2, 3))
+# Consecutive upstream failures that open the circuit, and how long it stays open.
+RECAPTCHA_FAILURE_THRESHOLD = getattr(settings, 'RECAPTCHA_FAILURE_THRESHOLD', 5)
+RECAPTCHA_RESET_TIMEOUT = getattr(settings, 'RECAPTCHA_RESET_TIMEOUT', 30)
+# Accept registrations while Google can't be reached (the endpoint is still rate limited).
+RECAPTCHA_FAIL_OPEN = getattr(settings, 'RECAPTCHA_FAIL_OPEN', False)
+# Tokens are single use upstream; a verified one is remembered so a resubmitted form still passes.
+RECAPTCHA_VERIFIED_TTL = getattr(settings, 'RECAPTCHA_VERIFIED_TTL', 120)
+RECAPTCHA_WORKERS = getattr(settings, 'RECAPTCHA_WORKERS', 8)
+# Simulated upstream latency (seconds) for StubVerifier load tests.
+RECAPTCHA_STUB_DELAY = getattr(settings, 'RECAPTCHA_STUB_DELAY', 0)
+
+
+class VerificationResult:
+    def __init__(self, success, error=None):
+        self.success = success
+        self.error = error
+
+    def __bool__(self):
+        return self.success
+
+    def __repr__(self):
+        return f"VerificationResult(success={self.success}, error={self.error!r})"
+
+
+class UpstreamError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """Stops calling an upstream after repeated failures, then lets a single trial call through."""
+
+    def __init__(self, threshold=RECAPTCHA_FAILURE_THRESHOLD, reset_timeout=RECAPTCHA_RESET_TIMEOUT):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.reset_timeout or self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.failures >= self.threshold:
+                if self.opened_at is None:
+                    logger.warning(f"reCAPTCHA verification failed {self.failures} times in a row, pausing for {self.reset_timeout}s")
+                self.opened_at = time.monotonic()
+
+
+class GoogleVerifier:
+    def __init__(self):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=RECAPTCHA_WORKERS)
+        self.session.mount('https://', adapter)
+        self.breaker = CircuitBreaker()
+
+    def verify(self, token, remote_ip=None):
+        if not self.breaker.allow():
+            raise UpstreamError("circuit open")
+        data = {'secret': RECAPTCHA_SECRET_KEY, 'response': token}
+        if remote_ip:
+            data['remoteip'] = remote_ip
+        try:
+            response = self.session.post(RECAPTCHA_VERIFY_URL, data=data, timeout=RECAPTCHA_TIMEOUT)
+            response.raise_for_status()
+            payload = response.json()
+        except (requests.RequestException, ValueError) as e:
+            self.breaker.record_failure()
+            raise UpstreamError(str(e)) from e
+        self.breaker.record_success()
+        if payload.get('success'):
+            return VerificationResult(True)
+        return VerificationResult(False, ', '.join(payload.get('error-codes', [])) or 'rejected')
+
+
+class StubVerifier:
+    """Offline verifier for development and load tests: any token passes unless it starts with 'invalid'."""
+
+    def verify(self, token, remote_ip=None):
+        if RECAPTCHA_STUB_DELAY:
+            time.sleep(RECAPTCHA_STUB_DELAY)
+        if token.startswith('invalid'):
+            return VerificationResult(False, 'invalid-input-response')
+        return VerificationResult(True)
+
+
+_verifier = None
+_verifier_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=RECAPTCHA_WORKERS, thread_name_prefix='recaptcha')
+
+
+def get_verifier():
+    global _verifier
+    if _verifier is None:
+        with _verifier_lock:
+            if _verifier is None:
+                _verifier = import_string(RECAPTCHA_BACKEND)()
+    return _verifier
+
+
+def _token_cache_key(token):
+    return f"recaptcha:verified:{hashlib.sha256(token.encode('utf-8')).hexdigest()}"
+
+
+def verify_token(token, remote_ip=None):
+    if not token:
+        return VerificationResult(False, 'missing-input-response')
+    cache_key = _token_cache_key(token)
+    if cache.get(cache_key):
+        return VerificationResult(True)
+    try:
+        result = get_verifier().verify(token, remote_ip)
+    except UpstreamError as e:
+        logger.error(f"reCAPTCHA verification unavailable: {str(e)}")
+        return VerificationResult(RECAPTCHA_FAIL_OPEN, 'unavailable')
+    if result:
+        cache.set(cache_key, True, RECAPTCHA_VERIFIED_TTL)
+    return result
+
+
+def start_verification(token, remote_ip=None):
+    """Verify in the background so the caller can run its own checks meanwhile; returns a future."""
+    return _executor.submit(verify_token, token, remote_ip)
+
+
+def verification_result(future):
+    # The HTTP timeouts already bound the wait; the margin covers a queued task.
+    connect_timeout, read_timeout = RECAPTCHA_TIMEOUT
+    try:
+        return future.result(timeout=connect_timeout + read_timeout + 1)
+    except Exception as e:
+        logger.error(f"reCAPTCHA verification did not complete: {str(e)}")
+        return VerificationResult(RECAPTCHA_FAIL_OPEN, 'unavailable')
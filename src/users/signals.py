@@ -0,0 +1,81 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from .cache import invalidate_singleton
+from .images import delete_variants, generate_variants
+from .models import SystemLogo, Contact, User
+
+# Variants the templates and PDFs use for these images, generated once the upload is committed.
+PROFILE_PICTURE_VARIANTS = ['thumb', 'small', 'pdf']
+LOGO_VARIANTS = ['small', 'pdf']
+
+
+@receiver([post_save, post_delete], sender=SystemLogo)
+def invalidate_system_logo(sender, **kwargs):
+    invalidate_singleton('system_logo')
+
+
+@receiver([post_save, post_delete], sender=Contact)
+def invalidate_contact(sender, **kwargs):
+    invalidate_singleton('contact')
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user_count(sender, created=True, **kwargs):
+    # Edits don't change the count; post_delete sends no ``created`` and always invalidates.
+    if created:
+        invalidate_singleton('user_count')
+
+
+def remember_stored_image(instance, field, update_fields=None):
+    # Read the stored name rather than trusting the instance, so a replaced image's variants can be found.
+    instance._stored_image = None
+    instance._image_uploaded = False
+    if update_fields is not None and field not in update_fields:
+        return
+    field_file = getattr(instance, field)
+    # A new upload may reuse the name of a file that has since been removed from storage.
+    instance._image_uploaded = bool(field_file) and not field_file._committed
+    if not instance._state.adding:
+        instance._stored_image = type(instance).objects.filter(pk=instance.pk).values_list(field, flat=True).first()
+
+
+def update_variants(instance, field_file, variants, deleted=False):
+    """Once committed, delete the variants of the image this save replaced or removed and generate the new ones."""
+    if deleted:
+        stored, field_file = field_file.name, None
+    else:
+        stored = getattr(instance, '_stored_image', None)
+    if stored and field_file and stored == field_file.name and not getattr(instance, '_image_uploaded', False):
+        stored = None
+
+    def replace():
+        # Every variant of the old image goes, including ones generated on demand.
+        if stored:
+            delete_variants(stored)
+        if field_file:
+            generate_variants(field_file, variants)
+
+    if stored or field_file:
+        transaction.on_commit(replace)
+
+
+@receiver(pre_save, sender=User)
+def remember_profile_picture(sender, instance, update_fields=None, **kwargs):
+    remember_stored_image(instance, 'profile_picture', update_fields)
+
+
+@receiver([post_save, post_delete], sender=User)
+def update_profile_picture_variants(sender, instance, signal, update_fields=None, **kwargs):
+    if update_fields is None or 'profile_picture' in update_fields:
+        update_variants(instance, instance.profile_picture, PROFILE_PICTURE_VARIANTS, deleted=signal is post_delete)
+
+
+@receiver(pre_save, sender=SystemLogo)
+def remember_logo(sender, instance, update_fields=None, **kwargs):
+    remember_stored_image(instance, 'logo', update_fields)
+
+
+@receiver([post_save, post_delete], sender=SystemLogo)
+def update_logo_variants(sender, instance, signal, **kwargs):
+    update_variants(instance, instance.logo, LOGO_VARIANTS, deleted=signal is post_delete)
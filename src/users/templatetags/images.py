@@ -0,0 +1,10 @@
+from django import template
+from users.images import variant_url
+
+register = template.Library()
+
+
+@register.filter
+def variant(field_file, name):
+    """``{{ user.profile_picture|variant:'thumb' }}``: URL of a resized copy of an image field."""
+    return variant_url(field_file, name)
@@ -1,11 +1,33 @@
 # utils.py
-from django.core.mail import send_mail
-from django.conf import settings
+import base64
+import binascii
+from django.contrib.auth import authenticate
+from .outbox import queue_email
 
 def send_otp_email(user_email, otp):
     subject = "Your OTP for Password Reset"
     message = f"Dear user,\n\nYour OTP for resetting your password is: {otp}\n\nThis OTP will expire in 10 minutes.\n\nThank you."
-    from_email = settings.DEFAULT_FROM_EMAIL
-    recipient_list = [user_email]
+    # Delivered by `manage.py send_queued_email`; the request only writes the outbox row.
+    queue_email(subject, message, [user_email])
 
-    send_mail(subject, message, from_email, recipient_list, fail_silently=False)
+def basic_auth_credentials(request):
+    """``(email, password)`` from an ``Authorization: Basic`` header, or None."""
+    header = request.headers.get('Authorization', '')
+    if not header.startswith('Basic '):
+        return None
+    try:
+        email, password = base64.b64decode(header[6:]).decode('utf-8').split(':', 1)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    return email, password
+
+def basic_auth_user(request):
+    """Active user from an ``Authorization: Basic`` header (email:password), for API clients without a session."""
+    credentials = basic_auth_credentials(request)
+    if credentials is None:
+        return None
+    email, password = credentials
+    user = authenticate(request, username=email, password=password)
+    if user is None or not user.is_active:
+        return None
+    return user
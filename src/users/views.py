@@ -1,4 +1,5 @@
 import random
+from django.conf import settings
 from django.shortcuts import render, redirect
 from django.views import View
 from django.views.generic import UpdateView, ListView
@@ -10,27 +11,22 @@ from django.contrib.auth.decorators import login_required
 from django.utils.decorators import method_decorator
 from django.contrib.auth import get_user_model
 from django.core.files.storage import default_storage
-from django.db.models import Q, Count
+from django.db.models import Q
 from django.db import transaction
-import requests
 from .forms import (
     UserLoginForm,
     CustomPasswordChangeForm,
     EditUserForm
 )
-from .models import UserType, PasswordResetOTP, SystemLogo, Contact
-from invoices.models import Feedback
+from .models import UserType, PasswordResetOTP, Contact
+from .cache import get_system_logo, get_contact, get_user_count
+from invoices.statistics import feedback_statistics
 from .utils import send_otp_email
+from .recaptcha import start_verification, verification_result
+from rental_system.ratelimit import client_ip
 
 User = get_user_model()
 
-def get_system_logo():
-    try:
-        logo = SystemLogo.objects.latest('-created_at')
-    except SystemLogo.DoesNotExist:
-        logo = None
-    return logo
-
 class ToggleUserActiveView(LoginRequiredMixin, UserPassesTestMixin, View):
     def test_func(self):
         return self.request.user.user_type == UserType.ADMIN
@@ -53,14 +49,17 @@ class UserRegisterView(View):
         if request.user.is_authenticated:
             return redirect("users:dashboard")
         logo = get_system_logo()
-        contact = Contact.objects.first()
+        contact = get_contact()
         context = {
             'logo': logo,
             'contact': contact,
+            'recaptcha_site_key': settings.RECAPTCHA_SITE_KEY,
         }
         return render(request, self.template_name, context)
     
     def post(self, request):
+        # Google is asked while the checks below run; the answer is collected afterwards.
+        recaptcha = start_verification(request.POST.get("g-recaptcha-response"), client_ip(request))
         email = request.POST.get('email')
         full_name = request.POST.get('full_name')
         password = request.POST.get('password')
@@ -79,6 +78,8 @@ class UserRegisterView(View):
             errors.append("Password must be at least 8 characters long.")
         if not terms:
             messages.error(request, "You must accept the terms and conditions.")
+        if not errors and not verification_result(recaptcha):
+            errors.append("CAPTCHA verification failed. Please try again.")
         if errors:
             for error in errors:
                 messages.error(request, error)
@@ -88,14 +89,9 @@ class UserRegisterView(View):
                 "full_address": full_address,
                 "mobile": mobile,
                 'logo': get_system_logo(),
-                'contact': Contact.objects.first(),
+                'contact': get_contact(),
+                'recaptcha_site_key': settings.RECAPTCHA_SITE_KEY,
             })
-        
-        recaptcha_response = request.POST.get("g-recaptcha-response")
-        recaptcha_secret = "6LfVFpUrAAAAAEYafcFU0DAmxaGrKIjaDmXG1_yP"
-        recaptcha_verify_url = "https://www.google.com/recaptcha/api/siteverify"
-        recaptcha_data = {"secret": recaptcha_secret, "response": recaptcha_response}
-        recaptcha_result = requests.post(recaptcha_verify_url, data=recaptcha_data).json()
 
         user = User.objects.create(
             email=email,
@@ -115,7 +111,7 @@ class UserLoginView(View):
             return redirect("users:dashboard")
         form = UserLoginForm()
         logo = get_system_logo()
-        contact = Contact.objects.first()
+        contact = get_contact()
         return render(request, 'users/login.html', {'form': form, 'logo': logo, 'contact': contact})
     
     def post(self, request):
@@ -135,7 +131,7 @@ class UserLoginView(View):
             messages.error(request, "Invalid form submission.")
         
         logo = get_system_logo()
-        contact = Contact.objects.first()
+        contact = get_contact()
         return render(request, 'users/login.html', {'form': form, 'logo': logo, 'contact': contact})
 
 class UserLogoutView(View):
@@ -154,7 +150,7 @@ class PasswordChangeView(View):
     def get(self, request):
         form = CustomPasswordChangeForm(user=request.user)
         logo = get_system_logo()
-        contact = Contact.objects.first()
+        contact = get_contact()
         if request.user.user_type == UserType.ADMIN:
             return render(request, 'users/admin_password_change.html', {'form': form, 'logo': logo, 'contact': contact})
         return render(request, 'users/change_password.html', {'form': form, 'logo': logo, 'contact': contact})
@@ -162,7 +158,7 @@ class PasswordChangeView(View):
     def post(self, request):
         form = CustomPasswordChangeForm(user=request.user, data=request.POST)
         logo = get_system_logo()
-        contact = Contact.objects.first()
+        contact = get_contact()
         if form.is_valid():
             user = form.save()
             update_session_auth_hash(request, user)  # Keep user logged in after password change
@@ -177,42 +173,22 @@ class PasswordChangeView(View):
 @method_decorator(login_required, name='dispatch')
 class DashboardView(View):
     def get(self, request):
-        contact = Contact.objects.first()
-        # Get feedback queryset based on user permissions
-        if request.user.user_type == UserType.ADMIN:
-            feedback_queryset = Feedback.objects.all()
-        else:
-            feedback_queryset = Feedback.objects.filter(
-                Q(email=request.user.email) |
-                Q(mobile=request.user.mobile) |
-                Q(created_by=request.user) |
-                Q(uuid__in=request.user.feedbacks.values_list('uuid', flat=True))
-            ).distinct()
-
-        # Calculate feedback statistics
-        feedbacks = feedback_queryset.count()
-        pending_feedbacks = feedback_queryset.filter(status='pending').count()
-        solved_feedbacks = feedback_queryset.filter(status='solved').count()
-        closed_feedbacks = feedback_queryset.filter(status='closed').count()
-        reviewed_feedbacks = feedback_queryset.filter(status__in=['solved', 'closed']).count()
-        
-        # Calculate rating counts
-        rating_counts = feedback_queryset.values('rating').annotate(count=Count('rating')).order_by('rating')
-        rating_dict = {'excellent': 0, 'good': 0, 'poor': 0}
-        for item in rating_counts:
-            if item['rating'] in rating_dict:
-                rating_dict[item['rating']] = item['count']
+        contact = get_contact()
+        # Pre-aggregated counters: global for admins, the user's visible feedbacks otherwise; the user
+        # total is cached until a user is added or deleted
+        is_admin = request.user.user_type == UserType.ADMIN
+        statistics = feedback_statistics(None if is_admin else request.user)
 
         context = {
-            'users': User.objects.all().count() if request.user.user_type == UserType.ADMIN else None,
-            'feedbacks': feedbacks,
-            'pending_feedbacks': pending_feedbacks,
-            'solved_feedbacks': solved_feedbacks,
-            'closed_feedbacks': closed_feedbacks,
-            'reviewed_feedbacks': reviewed_feedbacks,
-            'excellent_feedbacks': rating_dict['excellent'],
-            'good_feedbacks': rating_dict['good'],
-            'poor_feedbacks': rating_dict['poor'],
+            'users': get_user_count() if is_admin else None,
+            'feedbacks': statistics['total'],
+            'pending_feedbacks': statistics['pending'],
+            'solved_feedbacks': statistics['solved'],
+            'closed_feedbacks': statistics['closed'],
+            'reviewed_feedbacks': statistics['reviewed'],
+            'excellent_feedbacks': statistics['excellent'],
+            'good_feedbacks': statistics['good'],
+            'poor_feedbacks': statistics['poor'],
             'logo': get_system_logo(),
             'contact': contact,
         }
@@ -246,7 +222,7 @@ class ViewUsersView(LoginRequiredMixin, UserPassesTestMixin, ListView):
         context = super().get_context_data(**kwargs)
         context['search_query'] = self.request.GET.get('search', '')
         context['logo'] = get_system_logo()
-        context['contact'] = Contact.objects.first()
+        context['contact'] = get_contact()
         return context
 
 @method_decorator(login_required, name='dispatch')
@@ -256,7 +232,7 @@ class ProfileView(View):
     def get(self, request):
         user = request.user
         logo = get_system_logo()
-        contact = Contact.objects.first()
+        contact = get_contact()
         if request.user.user_type == UserType.ADMIN:
             return render(request, 'users/admin_profile.html', {'user': user, 'logo': logo, 'contact': contact})
         return render(request, self.template_name, {'user': user, 'logo': logo, 'contact': contact})
@@ -271,14 +247,14 @@ class UpdateProfileView(View):
     def get(self, request):
         user = request.user
         logo = get_system_logo()
-        contact = Contact.objects.first()
+        contact = get_contact()
         return render(request, self.get_template_names(), {'user': user, 'logo': logo, 'contact': contact})
     
     def post(self, request):
         user = request.user
         profile_picture = request.FILES.get('profile_picture')
         logo = get_system_logo()
-        contact = Contact.objects.first()
+        contact = get_contact()
         if profile_picture:
             if user.profile_picture:
                 default_storage.delete(user.profile_picture.path)
@@ -311,7 +287,7 @@ class AddUserView(View):
             messages.error(request, "You do not have permission to access this page.")
             return redirect("users:dashboard")
         logo = get_system_logo()
-        contact = Contact.objects.first()
+        contact = get_contact()
         return render(request, self.template_name, {"logo": logo, 'contact': contact})
     
     def post(self, request):
@@ -342,7 +318,7 @@ class AddUserView(View):
                 "full_address": full_address,
                 "mobile": mobile,
                 'logo': get_system_logo(),
-                'contact': Contact.objects.first(),
+                'contact': get_contact(),
             })
         
         user = User.objects.create(
@@ -380,7 +356,7 @@ class ManageUsersView(LoginRequiredMixin, UserPassesTestMixin, ListView):
         context = super().get_context_data(**kwargs)
         context['search_query'] = self.request.GET.get('search', '')
         context['logo'] = get_system_logo()
-        context['contact'] = Contact.objects.first()
+        context['contact'] = get_contact()
         return context
 
 class UserUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
@@ -406,7 +382,7 @@ class UserUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['logo'] = get_system_logo()
-        context['contact'] = Contact.objects.first()
+        context['contact'] = get_contact()
         return context
 
 class ForgotPasswordView(View):
@@ -414,7 +390,7 @@ class ForgotPasswordView(View):
         if request.user.is_authenticated:
             return redirect("users:dashboard")
         logo = get_system_logo()
-        contact = Contact.objects.first()
+        contact = get_contact()
         context = {
             'logo': logo,
             'contact': contact,
@@ -446,7 +422,7 @@ class VerifyOTPView(View):
         if request.user.is_authenticated:
             return redirect("users:dashboard")
         logo = get_system_logo()
-        contact = Contact.objects.first()
+        contact = get_contact()
         context = {
             'logo': logo,
             'contact': contact,
@@ -476,7 +452,7 @@ class ResetPasswordView(View):
             return redirect("users:forgot_password")
         
         logo = get_system_logo()
-        contact = Contact.objects.first()
+        contact = get_contact()
         context = {
             'logo': logo,
             'contact': contact,
@@ -508,7 +484,7 @@ class ResetPasswordView(View):
 class ContactView(View):
     def get(self, request):
         logo = get_system_logo()
-        contact = Contact.objects.first()
+        contact = get_contact()
         context = {
             'logo': logo,
             'contact': contact,
@@ -521,7 +497,7 @@ class UpdateContactView(View):
         return self.request.user.user_type == UserType.ADMIN
 
     def get(self, request):
-        contact = Contact.objects.first()
+        contact = get_contact()
         logo = get_system_logo()
         return render(request, 'users/update_contact.html', {'contact': contact, 'logo': logo})
 
@@ -530,7 +506,7 @@ class UpdateContactView(View):
             messages.error(request, "You do not have permission to update contact information.")
             return redirect("users:dashboard")
         
-        contact = Contact.objects.first()
+        contact = Contact.objects.first()  # fresh row: this instance is edited and saved below
         email = request.POST.get('email')
         phone = request.POST.get('phone')
         address = request.POST.get('address')